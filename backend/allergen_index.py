@@ -0,0 +1,73 @@
+import argparse
+import logging
+from typing import Dict, Optional
+
+from backend.allergens import ALLERGEN_FLAGS, CLASSIFIER_VERSION, title_allergen_mask
+from backend.recipe_db import RecipeDatabase, resolve_db_path
+
+logger = logging.getLogger(__name__)
+
+
+class TitleAllergenIndex:
+    """Allergen and diet flags for every recipes.db title, stored as one bitset per title.
+
+    Built offline (``python -m backend.allergen_index``) next to the titles,
+    so the title sampler can filter by a restriction mask without
+    classifying titles on every start. Rows carry the classifier version and
+    are rebuilt when the keyword tables change.
+    """
+
+    def __init__(self, db: RecipeDatabase):
+        self.db = db
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        with self.db.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS recipe_allergens (
+                    recipe_id INTEGER PRIMARY KEY,
+                    flags INTEGER NOT NULL,
+                    version INTEGER NOT NULL
+                )
+            ''')
+
+    def build(self, rebuild: bool = False) -> int:
+        """Classify titles that have no current flags (or all titles with rebuild); returns how many were written"""
+        sql = "SELECT r.id, r.title FROM recipes r"
+        params = ()
+        if not rebuild:
+            sql += " LEFT JOIN recipe_allergens a ON a.recipe_id = r.id WHERE a.version IS NOT ?"
+            params = (CLASSIFIER_VERSION,)
+        rows = [(recipe_id, title_allergen_mask(title), CLASSIFIER_VERSION) for recipe_id, title in self.db.query(sql, params)]
+
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM recipe_allergens WHERE recipe_id NOT IN (SELECT id FROM recipes)")
+            conn.executemany("INSERT OR REPLACE INTO recipe_allergens (recipe_id, flags, version) VALUES (?, ?, ?)", rows)
+        logger.info(f"Classified {len(rows)} recipe titles")
+        return len(rows)
+
+    def counts(self) -> Dict[str, int]:
+        """Current titles carrying each flag"""
+        return {
+            name: self.db.query_one(
+                "SELECT COUNT(*) FROM recipe_allergens WHERE version = ? AND flags & ? != 0", (CLASSIFIER_VERSION, flag)
+            )[0]
+            for name, flag in ALLERGEN_FLAGS.items()
+        }
+
+
+def main(db_path: Optional[str] = None, rebuild: bool = False):
+    # An offline build step on the titles database: keep its journal mode as shipped
+    index = TitleAllergenIndex(RecipeDatabase(resolve_db_path(db_path), wal=False))
+    index.build(rebuild)
+    print(f"Titles per flag: {index.counts()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify recipes.db titles by allergen and diet flags")
+    parser.add_argument("--db", help="Path to recipes.db (defaults to the generator's lookup)")
+    parser.add_argument("--rebuild", action="store_true", help="Reclassify every title, not only new or stale ones")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    main(args.db, args.rebuild)
@@ -0,0 +1,173 @@
+import re
+import zlib
+from typing import Dict, Iterable, Optional
+
+# One bit per allergen or ingredient group that users commonly need to avoid
+DAIRY = 1 << 0
+EGG = 1 << 1
+GLUTEN = 1 << 2
+PEANUT = 1 << 3
+TREE_NUT = 1 << 4
+SOY = 1 << 5
+FISH = 1 << 6
+SHELLFISH = 1 << 7
+SESAME = 1 << 8
+MEAT = 1 << 9
+HONEY = 1 << 10
+
+ALLERGEN_FLAGS = {
+    "dairy": DAIRY,
+    "egg": EGG,
+    "gluten": GLUTEN,
+    "peanut": PEANUT,
+    "tree_nut": TREE_NUT,
+    "soy": SOY,
+    "fish": FISH,
+    "shellfish": SHELLFISH,
+    "sesame": SESAME,
+    "meat": MEAT,
+    "honey": HONEY,
+}
+
+# Ingredient words that indicate each flag (matched as whole words, plural forms included)
+ALLERGEN_KEYWORDS = {
+    DAIRY: ["milk", "butter", "cheese", "cream", "yogurt", "yoghurt", "ghee", "whey", "casein", "parmesan",
+            "mozzarella", "cheddar", "feta", "ricotta", "mascarpone", "buttermilk", "custard", "paneer", "brie"],
+    EGG: ["egg", "eggs", "mayonnaise", "mayo", "meringue", "aioli", "frittata", "omelet", "omelette"],
+    GLUTEN: ["flour", "wheat", "bread", "pasta", "spaghetti", "noodle", "barley", "rye", "couscous", "bulgur",
+             "tortilla", "breadcrumb", "panko", "cracker", "pita", "bagel", "croissant", "farro", "seitan",
+             "semolina", "orzo", "baguette", "bun", "roll", "pancake", "waffle", "muffin", "biscuit", "pie crust"],
+    PEANUT: ["peanut", "peanut butter"],
+    TREE_NUT: ["almond", "walnut", "pecan", "cashew", "pistachio", "hazelnut", "macadamia", "pine nut",
+               "brazil nut", "nut", "praline", "marzipan"],
+    SOY: ["soy", "soya", "tofu", "tempeh", "edamame", "miso", "soy sauce", "tamari"],
+    FISH: ["fish", "salmon", "tuna", "cod", "tilapia", "halibut", "trout", "sardine", "anchovy", "mackerel",
+           "haddock", "snapper", "bass", "mahi", "swordfish", "fish sauce"],
+    SHELLFISH: ["shrimp", "prawn", "crab", "lobster", "scallop", "clam", "mussel", "oyster", "crawfish", "shellfish"],
+    SESAME: ["sesame", "tahini"],
+    MEAT: ["chicken", "beef", "pork", "bacon", "ham", "turkey", "lamb", "sausage", "steak", "veal", "duck",
+           "prosciutto", "salami", "pepperoni", "chorizo", "gelatin", "meatball", "brisket", "ground meat"],
+    HONEY: ["honey"],
+}
+
+# Dishes whose usual recipe contains allergens the name doesn't mention; used when only a title is known
+DISH_ALLERGENS = {
+    "cake": DAIRY | EGG | GLUTEN, "cupcake": DAIRY | EGG | GLUTEN, "shortcake": DAIRY | GLUTEN,
+    "pancake": DAIRY | EGG | GLUTEN, "waffle": DAIRY | EGG | GLUTEN, "cheesecake": DAIRY | EGG | GLUTEN,
+    "cookie": DAIRY | EGG | GLUTEN, "brownie": DAIRY | EGG | GLUTEN, "blondie": DAIRY | EGG | GLUTEN,
+    "scone": DAIRY | EGG | GLUTEN, "french toast": DAIRY | EGG | GLUTEN, "crepe": DAIRY | EGG | GLUTEN,
+    "donut": DAIRY | EGG | GLUTEN, "doughnut": DAIRY | EGG | GLUTEN, "brioche": DAIRY | EGG | GLUTEN,
+    "tiramisu": DAIRY | EGG | GLUTEN, "biscotti": EGG | GLUTEN | TREE_NUT, "bread pudding": DAIRY | EGG | GLUTEN,
+    "cornbread": DAIRY | EGG | GLUTEN, "dutch baby": DAIRY | EGG | GLUTEN, "eclair": DAIRY | EGG | GLUTEN,
+    "tart": DAIRY | EGG | GLUTEN, "pie": DAIRY | GLUTEN, "galette": DAIRY | GLUTEN, "cobbler": DAIRY | GLUTEN,
+    "crisp": DAIRY | GLUTEN, "crumble": DAIRY | GLUTEN, "shortbread": DAIRY | GLUTEN, "cannoli": DAIRY | GLUTEN,
+    "baklava": DAIRY | GLUTEN | TREE_NUT | HONEY, "frangipane": DAIRY | EGG | GLUTEN | TREE_NUT,
+    "macaron": EGG | TREE_NUT, "macaroon": EGG, "meringue": EGG, "pavlova": EGG, "souffle": DAIRY | EGG,
+    "quiche": DAIRY | EGG | GLUTEN, "strata": DAIRY | EGG | GLUTEN, "shakshuka": EGG, "benedict": DAIRY | EGG | GLUTEN,
+    "hollandaise": DAIRY | EGG, "carbonara": DAIRY | EGG | MEAT, "caesar": DAIRY | EGG | FISH,
+    "creamy": DAIRY, "cheesy": DAIRY, "buttery": DAIRY, "caprese": DAIRY, "stroganoff": DAIRY | GLUTEN,
+    "pudding": DAIRY, "panna cotta": DAIRY, "creme anglaise": DAIRY | EGG, "creme brulee": DAIRY | EGG,
+    "mousse": DAIRY | EGG, "gelato": DAIRY, "fudge": DAIRY, "truffle": DAIRY, "caramel": DAIRY,
+    "white chocolate": DAIRY, "parfait": DAIRY, "smoothie": DAIRY, "lassi": DAIRY, "risotto": DAIRY,
+    "alfredo": DAIRY, "gratin": DAIRY, "queso": DAIRY, "quesadilla": DAIRY | GLUTEN, "enchilada": DAIRY,
+    "nacho": DAIRY, "tzatziki": DAIRY, "raita": DAIRY, "korma": DAIRY | TREE_NUT, "tikka masala": DAIRY,
+    "pesto": DAIRY | TREE_NUT, "lasagna": DAIRY | EGG | GLUTEN, "ravioli": DAIRY | EGG | GLUTEN,
+    "tortellini": DAIRY | EGG | GLUTEN, "pizza": DAIRY | GLUTEN, "calzone": DAIRY | GLUTEN,
+    "gnocchi": EGG | GLUTEN, "fettuccine": EGG | GLUTEN, "linguine": GLUTEN, "ziti": DAIRY | GLUTEN, "rigatoni": GLUTEN,
+    "tagliatelle": EGG | GLUTEN, "pappardelle": EGG | GLUTEN, "orecchiette": GLUTEN, "penne": GLUTEN, "macaroni": GLUTEN,
+    "lo mein": GLUTEN | SOY, "ramen": GLUTEN | SOY, "udon": GLUTEN, "dumpling": GLUTEN, "wonton": EGG | GLUTEN,
+    "gyoza": GLUTEN | SOY, "spring roll": GLUTEN, "sandwich": GLUTEN, "panini": GLUTEN, "burger": GLUTEN,
+    "wrap": GLUTEN, "burrito": GLUTEN, "banh mi": GLUTEN, "fig newton": GLUTEN, "oat": GLUTEN, "granola": GLUTEN | TREE_NUT,
+    "okonomiyaki": EGG | GLUTEN, "tempura": EGG | GLUTEN, "katsu": EGG | GLUTEN, "schnitzel": EGG | GLUTEN,
+    "meatloaf": EGG | GLUTEN | MEAT, "fried rice": EGG | SOY, "pad thai": EGG | FISH | PEANUT | SOY,
+    "satay": PEANUT | SOY, "stir fry": SOY, "stir-fry": SOY, "teriyaki": GLUTEN | SOY, "hoisin": SOY,
+    "sushi": FISH | SOY, "poke": FISH | SOY, "paella": MEAT | SHELLFISH, "gumbo": GLUTEN | MEAT | SHELLFISH,
+    "jambalaya": MEAT | SHELLFISH, "kielbasa": MEAT, "bolognese": DAIRY | MEAT, "shepherd's pie": DAIRY | MEAT,
+    "club sandwich": MEAT, "hummus": SESAME, "falafel": GLUTEN | SESAME, "baba ganoush": SESAME, "halva": SESAME,
+    "nougat": EGG | HONEY | TREE_NUT, "cheeseburger": DAIRY | GLUTEN | MEAT, "melt": DAIRY | GLUTEN,
+    "wellington": EGG | GLUTEN | DAIRY, "chicken fried": EGG | GLUTEN | DAIRY, "fried chicken": EGG | GLUTEN,
+    "tenders": EGG | GLUTEN, "crust": GLUTEN, "flatbread": GLUTEN, "focaccia": GLUTEN, "naan": DAIRY | GLUTEN,
+    "sub": GLUTEN, "hoagie": GLUTEN, "slider": GLUTEN, "gyro": DAIRY | GLUTEN, "po' boy": GLUTEN, "club": GLUTEN,
+    "empanada": GLUTEN, "bruschetta": GLUTEN, "panzanella": GLUTEN, "french onion soup": DAIRY | GLUTEN,
+    "chili mac": DAIRY | GLUTEN, "loaded": DAIRY, "halloumi": DAIRY, "moussaka": DAIRY | EGG, "casserole": DAIRY,
+    "chowder": DAIRY, "grits": DAIRY, "gravy": DAIRY | GLUTEN, "rollatini": DAIRY | EGG, "florentine": DAIRY,
+    "spinach artichoke": DAIRY, "waldorf": EGG | TREE_NUT, "marsala": GLUTEN, "margherita": DAIRY | GLUTEN,
+}
+
+# User-facing restriction names mapped to the flags a recipe must not have
+RESTRICTION_FLAGS = {
+    "dairy": DAIRY, "dairy free": DAIRY, "dairy-free": DAIRY, "lactose": DAIRY, "lactose intolerant": DAIRY, "milk": DAIRY,
+    "egg": EGG, "eggs": EGG,
+    "gluten": GLUTEN, "gluten free": GLUTEN, "gluten-free": GLUTEN, "wheat": GLUTEN, "celiac": GLUTEN,
+    "peanut": PEANUT, "peanuts": PEANUT,
+    "tree nut": TREE_NUT, "tree nuts": TREE_NUT,
+    "nuts": PEANUT | TREE_NUT, "nut": PEANUT | TREE_NUT, "nut free": PEANUT | TREE_NUT,
+    "soy": SOY, "soya": SOY,
+    "fish": FISH, "shellfish": SHELLFISH, "seafood": FISH | SHELLFISH,
+    "sesame": SESAME,
+    "vegetarian": MEAT | FISH | SHELLFISH,
+    "pescatarian": MEAT,
+    "vegan": MEAT | FISH | SHELLFISH | DAIRY | EGG | HONEY,
+}
+
+_KEYWORD_PATTERNS = {
+    flag: re.compile(r"\b(?:" + "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True)) + r")(?:e?s)?\b")
+    for flag, words in ALLERGEN_KEYWORDS.items()
+}
+
+_DISH_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(dish) for dish in sorted(DISH_ALLERGENS, key=len, reverse=True)) + r")(?:e?s)?\b"
+)
+
+# Phrases that contain an allergen word without containing the allergen; the "keep" group survives
+_NEGATIONS = re.compile(r"\b(?:dairy|gluten|egg|nut|soy|wheat)[- ]free(?:\s+\w+)?\b|\bvegan\s+\w+|\bnutritional yeast\b"
+                        r"|\bcream of tartar\b|\bcoconut (?:milk|cream|yogurt)\b"
+                        r"|\b(?P<keep>almond|oat|soy|rice|cashew|peanut|hazelnut|nut|sunflower|cocoa|apple)"
+                        r"\s+(?:milk|butter|cream|cheese|yogurt)\b")
+
+
+def allergen_mask(texts: Iterable[str]) -> int:
+    """Bit mask of every allergen flag whose keywords appear in the given ingredient lines or title"""
+    mask = 0
+    for text in texts:
+        # Plant milks, nut butters and "x-free" products would otherwise match their dairy/allergen word
+        cleaned = _NEGATIONS.sub(lambda match: f" {match.group('keep') or ''} ", text.lower())
+        for flag, pattern in _KEYWORD_PATTERNS.items():
+            if not mask & flag and pattern.search(cleaned):
+                mask |= flag
+    return mask
+
+
+def title_allergen_mask(title: str) -> int:
+    """Likely allergen flags of a recipe known only by its title: named ingredients plus typical dish contents"""
+    lowered = title.lower()
+    # "gluten-free cookies" or "vegan cheesecake" don't have the usual contents the title rules out
+    ruled_out = 0
+    for free_of in re.findall(r"\b(dairy|gluten|egg|nut|soy|wheat)[- ]free\b", lowered):
+        ruled_out |= RESTRICTION_FLAGS[free_of]
+    if re.search(r"\bvegan\b", lowered):
+        ruled_out |= RESTRICTION_FLAGS["vegan"]
+
+    mask = allergen_mask([title])
+    for dish in _DISH_PATTERN.findall(lowered):
+        mask |= DISH_ALLERGENS[dish] & ~ruled_out
+    return mask
+
+
+def restriction_mask(restrictions: Iterable[str]) -> Optional[int]:
+    """Flags a recipe must not have for these user restrictions, or None if any restriction is unknown"""
+    mask = 0
+    for restriction in restrictions:
+        flag = RESTRICTION_FLAGS.get(restriction.lower().strip())
+        if flag is None:
+            return None
+        mask |= flag
+    return mask
+
+
+def flag_names(mask: int) -> Dict[str, bool]:
+    return {name: bool(mask & flag) for name, flag in ALLERGEN_FLAGS.items()}
+
+
+# Changes whenever the keyword tables do, so stored title flags can be recognised as stale
+CLASSIFIER_VERSION = zlib.crc32(repr((ALLERGEN_KEYWORDS, DISH_ALLERGENS, _NEGATIONS.pattern)).encode())
@@ -1,5 +1,9 @@
-import sqlite3
 import os
+import sys
+
+# Run from backend/data; make the backend package importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.recipe_db import RecipeDatabase
 
 # Path for the database
 db_path = 'recipes.db'
@@ -11,7 +15,7 @@ if os.path.exists(db_path):
 
 # Create a new database
 print(f"Creating new database at {db_path}")
-conn = sqlite3.connect(db_path)
+conn = RecipeDatabase(db_path, wal=False).connection()
 cursor = conn.cursor()
 
 # Create the recipes table
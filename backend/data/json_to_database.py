@@ -1,7 +1,11 @@
-import sqlite3
 import os
+import sys
 import argparse
 
+# Run from backend/data; make the backend package importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.recipe_db import RecipeDatabase
+
 def check_database(db_path=None):
     """
     Check SQLite database files in the current directory
@@ -33,7 +37,7 @@ def check_database(db_path=None):
         print(f"\n=== Checking {db_file} ===")
         
         try:
-            conn = sqlite3.connect(db_file)
+            conn = RecipeDatabase(db_file, read_only=True).connection()
             cursor = conn.cursor()
             
             # Get list of tables
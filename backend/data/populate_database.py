@@ -1,10 +1,13 @@
 import json
-import sqlite3
 import os
 import sys
 import time
 import argparse
 
+# Run from backend/data; make the backend package importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.recipe_db import RecipeDatabase
+
 def populate_database(json_file_path, db_path, batch_size=5000):
     """
     Populate SQLite database from a large JSON file containing recipes.
@@ -29,8 +32,8 @@ def populate_database(json_file_path, db_path, batch_size=5000):
         print(f"Removing existing database: {db_path}")
         os.remove(db_path)
     
-    # Connect to the database
-    conn = sqlite3.connect(db_path)
+    # Connect to the database (rollback journal; the bulk load below picks its own pragmas)
+    conn = RecipeDatabase(db_path, wal=False).connection()
     cursor = conn.cursor()
     
     # Create table for recipes
@@ -156,30 +159,25 @@ def populate_database(json_file_path, db_path, batch_size=5000):
 def verify_database(db_path):
     """Verify database was created properly and contains data"""
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        db = RecipeDatabase(db_path, read_only=True)
         
         # Test basic queries
-        cursor.execute("SELECT COUNT(*) FROM recipes")
-        count = cursor.fetchone()[0]
+        count = db.query_one("SELECT COUNT(*) FROM recipes")[0]
         print(f"\nDatabase verification:")
         print(f"Total recipes: {count}")
         
         if count > 0:
-            cursor.execute("SELECT category, COUNT(*) FROM recipes GROUP BY category")
-            for category, cat_count in cursor.fetchall():
+            for category, cat_count in db.query("SELECT category, COUNT(*) FROM recipes GROUP BY category"):
                 print(f"  - {category}: {cat_count}")
             
             # Get sample recipes from each category
-            cursor.execute("SELECT DISTINCT category FROM recipes")
-            categories = [row[0] for row in cursor.fetchall()]
+            categories = [row[0] for row in db.query("SELECT DISTINCT category FROM recipes")]
             
             for category in categories:
-                cursor.execute("SELECT id, title FROM recipes WHERE category = ? LIMIT 1", (category,))
-                sample = cursor.fetchone()
+                sample = db.query_one("SELECT id, title FROM recipes WHERE category = ? LIMIT 1", (category,))
                 print(f"\nSample {category} recipe (ID {sample[0]}): {sample[1]}")
         
-        conn.close()
+        db.close()
         return count > 0
     except Exception as e:
         print(f"Database verification error: {str(e)}")
@@ -7,7 +7,7 @@ import json
 import os
 import tempfile
 import logging
-from backend.openai_handler import RecipeGenerator
+from backend import services
 import openai
 
 # Configure logging
@@ -37,8 +37,8 @@ class FoodLogRequest:
         )
 
 class FoodLogService:
-    def __init__(self):
-        self.recipe_generator = RecipeGenerator()
+    def __init__(self, recipe_generator):
+        self.recipe_generator = recipe_generator
     
     def estimate_nutrition(self, food_description: str) -> Dict[str, Any]:
         """Use OpenAI to estimate nutrition information from food description"""
@@ -74,6 +74,7 @@ class FoodLogService:
         try:
             response = self.recipe_generator.client.chat.completions.create(
                 model="gpt-4",  # Use GPT-4 for better accuracy
+                endpoint="food_log.nutrition",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": f"Estimate nutrition for: {food_description}"}
@@ -334,6 +335,7 @@ class FoodLogService:
         try:
             response = self.recipe_generator.client.chat.completions.create(
                 model="gpt-4",
+                endpoint="food_log.suggestions",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": f"Suggest meals for remaining macros: {target_calories} calories, {target_protein}g protein"}
@@ -394,7 +396,7 @@ class FoodLogService:
         ]
 
 # Create service instance
-food_log_service = FoodLogService()
+food_log_service = services.proxy("food_log_service")
 
 @food_log_routes.route('/api/estimate-nutrition', methods=["POST"])
 @cross_origin()
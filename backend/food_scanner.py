@@ -5,6 +5,8 @@ from typing import Dict, List, Optional
 import logging
 import time
 import json
+from backend import services
+from backend.single_flight import SingleFlight
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -936,8 +938,11 @@ class FoodHealthAnalyzer:
         
         return recommendations
 
-# Initialize analyzer
-analyzer = FoodHealthAnalyzer()
+# Shared analyzer, built on first use
+analyzer = services.proxy("food_analyzer")
+
+# Concurrent scans of the same barcode share one upstream lookup
+product_flight = SingleFlight.from_env()
 
 @food_scanner_bp.route('/product/<barcode>', methods=['GET'])
 def get_product_info(barcode):
@@ -950,7 +955,7 @@ def get_product_info(barcode):
         logger.info(f"Processing barcode: {barcode}")
         
         # Try to fetch product data from multiple APIs
-        data = analyzer.fetch_product_data(barcode)
+        data = product_flight.do(SingleFlight.make_key("product", barcode), analyzer.fetch_product_data, barcode)
         
         if not data:
             # All APIs failed - return fallback data so app doesn't crash
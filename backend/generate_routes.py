@@ -1,12 +1,29 @@
-from flask import request, jsonify, Blueprint
+from flask import request, jsonify, Blueprint, Response
 from flask_cors import cross_origin
-from typing import Optional, List
+from typing import Optional, List, Iterable, Tuple
 from dataclasses import dataclass
-from backend.openai_handler import RecipeGenerator
+import json
+import queue
+import threading
+import time
+from backend import services
+from backend.jobs import JobQueueFull
+from backend.plan_checkpoints import new_plan_key, validate_plan_key
+from backend.recipe_schema import render_recipe_text
+from backend.single_flight import SingleFlight
 
 
 # we need to make a seperate route for the meal plans/ different file?
 
+# "text" returns the legacy formatted strings; "json" also returns validated recipe objects
+OUTPUT_FORMATS = ("text", "json")
+
+def _parse_output_format(data: dict) -> str:
+    output_format = str(data.get("format", "text")).lower().strip()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(OUTPUT_FORMATS)}")
+    return output_format
+
 # Create a Blueprint for recipes
 recipe_routes = Blueprint('recipes', __name__)
 
@@ -17,6 +34,7 @@ class MealTypeRecipeRequest:
     healthy: bool = False
     allergies: Optional[List[str]] = None
     count: int = 5
+    output_format: str = "text"
 
     @classmethod
     def from_request(cls, data: dict) -> 'MealTypeRecipeRequest':
@@ -26,7 +44,8 @@ class MealTypeRecipeRequest:
             meal_type=data["meal_type"].lower().strip(),
             healthy=bool(data.get("healthy", False)),
             allergies=list(set(allergy.lower().strip() for allergy in data.get("allergies", []))),
-            count=min(max(int(data.get("count", 10)), 1), 15)
+            count=min(max(int(data.get("count", 10)), 1), 15),
+            output_format=_parse_output_format(data)
         )
 
 @dataclass
@@ -35,6 +54,7 @@ class IngredientsRecipeRequest:
     ingredients: List[str]
     allergies: Optional[List[str]] = None
     count: int = 10
+    output_format: str = "text"
 
     @classmethod
     def from_request(cls, data: dict) -> 'IngredientsRecipeRequest':
@@ -43,11 +63,93 @@ class IngredientsRecipeRequest:
         return cls(
             ingredients=list(set(ingredient.lower().strip() for ingredient in data.get("ingredients", []))),
             allergies=list(set(allergy.lower().strip() for allergy in data.get("allergies", []))),
-            count=min(max(int(data.get("count", 10)), 1), 15)
+            count=min(max(int(data.get("count", 10)), 1), 15),
+            output_format=_parse_output_format(data)
         )
 
-# Create a global recipe generator instance
-recipe_generator = RecipeGenerator()
+# Shared recipe generator, built on first use (or by the gunicorn post_fork warm-up)
+recipe_generator = services.proxy("recipe_generator")
+
+# Background runner for meal plan jobs; job state lives in SQLite shared by all workers
+meal_plan_jobs = services.proxy("meal_plan_jobs")
+
+# Prices the grocery changes when a single meal of a plan is replaced
+grocery_generator = services.proxy("grocery_generator")
+
+# Longest a job status request may be held open waiting for a change
+JOB_LONG_POLL_MAX_SECONDS = 30
+
+# Identical concurrent generation requests share one computation
+generation_flight = SingleFlight.from_env()
+
+# Seconds of silence before a heartbeat event is sent on a stream
+SSE_HEARTBEAT_INTERVAL = 15
+
+def _wants_event_stream() -> bool:
+    """True when the client asked for Server-Sent Events"""
+    return request.accept_mimetypes.best == "text/event-stream"
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _event_stream_response(events: Iterable[Tuple[str, dict]]) -> Response:
+    """Relay (event, data) pairs from a worker thread as SSE, with heartbeats while waiting"""
+    event_queue = queue.Queue()
+    cancelled = threading.Event()
+    finished = object()
+
+    def produce():
+        try:
+            for item in events:
+                if cancelled.is_set():
+                    break
+                event_queue.put(item)
+        except Exception as e:
+            print(f"Error while streaming: {str(e)}")
+            event_queue.put(("error", {"error": "An unexpected error occurred while streaming", "details": str(e)}))
+        finally:
+            event_queue.put(finished)
+
+    def relay():
+        threading.Thread(target=produce, daemon=True).start()
+        try:
+            while True:
+                try:
+                    item = event_queue.get(timeout=SSE_HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    yield _sse_event("heartbeat", {"timestamp": time.time()})
+                    continue
+                if item is finished:
+                    break
+                yield _sse_event(*item)
+        finally:
+            # Client went away or stream ended; stop generating further items
+            cancelled.set()
+
+    return Response(relay(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+def _recipes_payload(recipes: list, structured: bool) -> dict:
+    """Response body for a recipe list; structured recipes are also rendered as legacy text"""
+    payload = {
+        "success": True,
+        "recipes": [render_recipe_text(recipe) for recipe in recipes] if structured else recipes,
+        "count": len(recipes)
+    }
+    if structured:
+        payload["recipes_json"] = recipes
+    return payload
+
+def _recipe_events(recipes: Iterable[str]):
+    """Turn streamed recipes into recipe events followed by a done event"""
+    count = 0
+    for recipe in recipes:
+        count += 1
+        yield "recipe", {"index": count, "recipe": recipe}
+    yield "done", {"count": count}
 
 @recipe_routes.route('/api/recipes', methods=["POST"])
 @cross_origin()
@@ -61,7 +163,23 @@ def get_recipes():
         except (ValueError, TypeError) as e:
             return jsonify({"error": f"Invalid request data: {str(e)}"}), 400
 
-        recipes = recipe_generator.get_recipe_ideas(
+        # Push each recipe as soon as it is complete when the client accepts SSE
+        if _wants_event_stream():
+            return _event_stream_response(_recipe_events(recipe_generator.stream_recipe_ideas(
+                meal_type=recipe_request.meal_type,
+                healthy=recipe_request.healthy,
+                allergies=recipe_request.allergies,
+                count=recipe_request.count
+            )))
+
+        structured = recipe_request.output_format == "json"
+        flight_key = SingleFlight.make_key(
+            "recipes", recipe_request.meal_type, recipe_request.healthy,
+            sorted(recipe_request.allergies), recipe_request.count, recipe_request.output_format
+        )
+        recipes = generation_flight.do(
+            flight_key,
+            recipe_generator.get_recipe_ideas_structured if structured else recipe_generator.get_recipe_ideas,
             meal_type=recipe_request.meal_type,
             healthy=recipe_request.healthy,
             allergies=recipe_request.allergies,
@@ -71,11 +189,7 @@ def get_recipes():
         if not recipes:
             return jsonify({"error": "No recipes could be generated. Please try again."}), 404
 
-        return jsonify({
-            "success": True,
-            "recipes": recipes,
-            "count": len(recipes)
-        })
+        return jsonify(_recipes_payload(recipes, structured))
 
     except Exception as e:
         print(f"Error generating recipes: {str(e)}")
@@ -97,7 +211,21 @@ def get_recipes_ingredients():
         except (ValueError, TypeError) as e:
             return jsonify({"error": f"Invalid request data: {str(e)}"}), 400
 
-        recipes = recipe_generator.get_recipe_ingredients(
+        if _wants_event_stream():
+            return _event_stream_response(_recipe_events(recipe_generator.stream_recipe_ingredients(
+                ingredients=recipe_request.ingredients,
+                allergies=recipe_request.allergies,
+                count=recipe_request.count
+            )))
+
+        structured = recipe_request.output_format == "json"
+        flight_key = SingleFlight.make_key(
+            "ingredients", sorted(recipe_request.ingredients),
+            sorted(recipe_request.allergies), recipe_request.count, recipe_request.output_format
+        )
+        recipes = generation_flight.do(
+            flight_key,
+            recipe_generator.get_recipe_ingredients_structured if structured else recipe_generator.get_recipe_ingredients,
             ingredients=recipe_request.ingredients,
             allergies=recipe_request.allergies,
             count=recipe_request.count
@@ -106,11 +234,7 @@ def get_recipes_ingredients():
         if not recipes:
             return jsonify({"error": "No recipes could be generated. Please try again."}), 404
 
-        return jsonify({
-            "success": True,
-            "recipes": recipes,
-            "count": len(recipes)
-        })
+        return jsonify(_recipes_payload(recipes, structured))
 
     except Exception as e:
         print(f"Error generating recipes: {str(e)}")
@@ -131,16 +255,51 @@ def get_meal_plan():
             }), 400
         data = request.json
         
-        
-       
-        
-        # Existing parameter validation
-        days = min(max(int(data.get("days", 7)), 1), 14)
-        meals_per_day = min(max(int(data.get("meals_per_day", 3)), 1), 5)
-        healthy = bool(data.get("healthy", False))
-        allergies = list(set(allergy.lower().strip() for allergy in data.get("allergies", [])))
-        preferences = list(set(preference.lower().strip() for preference in data.get("preferences", [])))
-        calories_per_day = min(max(int(data.get("calories_per_day", 2000)), 1000), 5000)
+        try:
+            params = _parse_meal_plan_request(data)
+        except ValueError as e:
+            return jsonify({"Error": str(e)}), 400
+        days = params["days"]
+        meals_per_day = params["meals_per_day"]
+        healthy = params["healthy"]
+        allergies = params["allergies"]
+        preferences = params["preferences"]
+        calories_per_day = params["calories_per_day"]
+        parallel = params["parallel"]
+        output_format = params["output_format"]
+        plan_key = params["plan_key"]
+
+        # Stream each day as it is generated when the client accepts SSE
+        if _wants_event_stream():
+            events = recipe_generator.generate_meal_plan_stream(
+                days=days,
+                meals_per_day=meals_per_day,
+                healthy=healthy,
+                allergies=allergies,
+                preferences=preferences,
+                calories_per_day=calories_per_day,
+                plan_key=plan_key
+            )
+            return _event_stream_response(_with_plan_key(events, plan_key))
+
+        if output_format == "json":
+            plan = recipe_generator.generate_meal_plan_structured(
+                days=days,
+                meals_per_day=meals_per_day,
+                healthy=healthy,
+                allergies=allergies,
+                preferences=preferences,
+                calories_per_day=calories_per_day
+            )
+            return jsonify({
+                "success": True,
+                "meal_plan": recipe_generator.render_meal_plan_text(plan),
+                "meal_plan_json": plan,
+                "days": days,
+                "meals_per_day": meals_per_day,
+                "calories_per_day": calories_per_day
+            })
+
         # Generate meal plan with user_id for duplicate prevention
         meal_plan = recipe_generator.generate_meal_plan(
             days=days,
@@ -149,7 +308,8 @@ def get_meal_plan():
             allergies=allergies,
             preferences=preferences,
             calories_per_day=calories_per_day,
-            
+            parallel=parallel,
+            plan_key=plan_key
         )
         if not meal_plan:
             return jsonify({
@@ -158,16 +318,241 @@ def get_meal_plan():
         return jsonify({
             "success": True,
             "meal_plan": meal_plan,
+            "plan_key": plan_key,
             "days": days,
             "meals_per_day": meals_per_day,
             "calories_per_day": calories_per_day
         })
+    except ValueError as e:
+        # e.g. a plan_key reused with different parameters
+        return jsonify({"Error": str(e)}), 400
     except Exception as e:
         print(f"Error generating meal plans: {str(e)}")
         return jsonify({
             "Error": "An unexpected error occurred while generating meal plans",
             "details": str(e)
         }), 500
+
+def _parse_meal_plan_request(data: dict) -> dict:
+    """Validated /api/mealplans parameters (shared by the synchronous and job endpoints)"""
+    return {
+        "days": min(max(int(data.get("days", 7)), 1), 14),
+        "meals_per_day": min(max(int(data.get("meals_per_day", 3)), 1), 5),
+        "healthy": bool(data.get("healthy", False)),
+        "allergies": list(set(allergy.lower().strip() for allergy in data.get("allergies", []))),
+        "preferences": list(set(preference.lower().strip() for preference in data.get("preferences", []))),
+        "calories_per_day": min(max(int(data.get("calories_per_day", 2000)), 1000), 5000),
+        "parallel": bool(data["parallel"]) if "parallel" in data else None,
+        "output_format": _parse_output_format(data),
+        # Clients resend the same plan_key on retry to resume from the checkpointed days
+        "plan_key": validate_plan_key(data["plan_key"]) if data.get("plan_key") else new_plan_key()
+    }
+
+def _with_plan_key(events, plan_key):
+    """Add the plan key to the final event so a client can resume or regenerate days later"""
+    for event, data in events:
+        yield event, (dict(data, plan_key=plan_key) if event == "done" else data)
+
+def _meal_plan_job(days, meals_per_day, healthy, allergies, preferences, calories_per_day, parallel, output_format, plan_key):
+    """Job body: progress events while the plan is generated, then the same payload /api/mealplans returns"""
+    payload = {"success": True, "days": days, "meals_per_day": meals_per_day, "calories_per_day": calories_per_day}
+    if output_format == "json":
+        yield "progress", {"completed_days": 0, "total_days": days}
+        plan = recipe_generator.generate_meal_plan_structured(
+            days=days, meals_per_day=meals_per_day, healthy=healthy, allergies=allergies,
+            preferences=preferences, calories_per_day=calories_per_day
+        )
+        yield "progress", {"completed_days": days, "total_days": days}
+        yield "done", dict(payload, meal_plan=recipe_generator.render_meal_plan_text(plan), meal_plan_json=plan)
+        return
+    
+    # Day-by-day generation reports progress after every validated day
+    for event, data in recipe_generator.generate_meal_plan_stream(
+        days=days, meals_per_day=meals_per_day, healthy=healthy, allergies=allergies,
+        preferences=preferences, calories_per_day=calories_per_day, plan_key=plan_key
+    ):
+        if event == "progress":
+            yield "progress", data
+        elif event == "done":
+            yield "done", dict(payload, meal_plan=data["meal_plan"], plan_key=plan_key)
+
+def _job_payload(job: dict) -> dict:
+    payload = {
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "version": job["version"],
+        "progress": job["progress"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+    if job["result"] is not None:
+        payload["result"] = job["result"]
+    if job["error"]:
+        payload["error"] = job["error"]
+    return payload
+
+# Meal plan jobs: POST returns a job id immediately; clients poll (or long-poll) the status route
+@recipe_routes.route('/api/mealplans/jobs', methods=["POST"])
+@cross_origin()
+def create_meal_plan_job():
+    try:
+        if not request.is_json:
+            return jsonify({
+                "Error": "Response Content-Type must be application/json"
+            }), 400
+        try:
+            params = _parse_meal_plan_request(request.json)
+        except ValueError as e:
+            return jsonify({"Error": str(e)}), 400
+        
+        try:
+            job_id = meal_plan_jobs.submit("mealplan", params, _meal_plan_job)
+        except JobQueueFull:
+            return jsonify({
+                "Error": "Too many meal plans are being generated right now. Please try again shortly."
+            }), 503, {"Retry-After": "30"}
+        
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/mealplans/jobs/{job_id}"
+        }), 202
+    except Exception as e:
+        print(f"Error creating meal plan job: {str(e)}")
+        return jsonify({
+            "Error": "An unexpected error occurred while creating the meal plan job",
+            "details": str(e)
+        }), 500
+
+@recipe_routes.route('/api/mealplans/jobs/<job_id>', methods=["GET"])
+@cross_origin()
+def get_meal_plan_job(job_id):
+    """Job status; with ?wait=N the request is held until the job changes past ?since=<version>"""
+    try:
+        wait_seconds = min(max(float(request.args.get("wait", 0)), 0), JOB_LONG_POLL_MAX_SECONDS)
+        since_version = int(request.args.get("since", -1))
+    except ValueError:
+        return jsonify({"Error": "wait and since must be numbers"}), 400
+    
+    job = meal_plan_jobs.store.wait(job_id, since_version, wait_seconds)
+    if job is None:
+        return jsonify({"Error": "Job not found"}), 404
+    return jsonify(_job_payload(job))
+
+@recipe_routes.route('/api/mealplans/<plan_key>', methods=["GET"])
+@cross_origin()
+def get_meal_plan_checkpoint(plan_key):
+    """Days checkpointed so far for a plan key, and which of them are placeholder days"""
+    try:
+        # Reserved words (e.g. a GET on /api/mealplans/jobs) never name a plan
+        validate_plan_key(plan_key)
+    except ValueError:
+        return jsonify({"Error": "Meal plan not found"}), 404
+    checkpoints = recipe_generator.plan_checkpoints
+    params = checkpoints.params(plan_key) if checkpoints else None
+    if params is None:
+        return jsonify({"Error": "Meal plan not found"}), 404
+    
+    saved_days = checkpoints.days(plan_key)
+    return jsonify({
+        "success": True,
+        "plan_key": plan_key,
+        "params": params,
+        "completed_days": sorted(day_num for day_num, day in saved_days.items() if not day["fallback"]),
+        "fallback_days": sorted(day_num for day_num, day in saved_days.items() if day["fallback"]),
+        "meal_plan": "\n\n".join(saved_days[day_num]["text"] for day_num in sorted(saved_days))
+    })
+
+@recipe_routes.route('/api/mealplans/<plan_key>/days/<int:day_num>/regenerate', methods=["POST"])
+@cross_origin()
+def regenerate_meal_plan_day(plan_key, day_num):
+    """Generate a single checkpointed day again, leaving the rest of the plan as it is"""
+    try:
+        meal_plan = recipe_generator.regenerate_plan_day(plan_key, day_num)
+    except KeyError:
+        return jsonify({"Error": "Meal plan not found"}), 404
+    except ValueError as e:
+        return jsonify({"Error": str(e)}), 400
+    except Exception as e:
+        print(f"Error regenerating day {day_num} of {plan_key}: {str(e)}")
+        return jsonify({
+            "Error": "An unexpected error occurred while regenerating the day",
+            "details": str(e)
+        }), 500
+    return jsonify({"success": True, "plan_key": plan_key, "day": day_num, "meal_plan": meal_plan})
+
+@recipe_routes.route('/api/mealplans/meals/regenerate', methods=["POST"])
+@cross_origin()
+def regenerate_meal_plan_meal():
+    """Replace one meal of an existing plan and return the patched plan with its grocery list changes.
+    
+    The plan is sent as "meal_plan" text (with the parameters it was generated
+    with) or referenced by a checkpointed "plan_key"; "day" is 1-based and
+    "meal" is the 1-based slot or its meal type.
+    """
+    try:
+        if not request.is_json:
+            return jsonify({
+                "Error": "Response Content-Type must be application/json"
+            }), 400
+        data = request.json
+        if not data.get("meal_plan") and not data.get("plan_key"):
+            return jsonify({"Error": "meal_plan or plan_key is required"}), 400
+        if not data.get("day") or not data.get("meal"):
+            return jsonify({"Error": "day and meal are required"}), 400
+        
+        try:
+            day_num = int(data["day"])
+            if data.get("meal_plan"):
+                params = _parse_meal_plan_request(data)
+                meal_plan, previous_plan, replacement = recipe_generator.regenerate_plan_meal(
+                    day_num, data["meal"], meal_plan=data["meal_plan"],
+                    calories_per_day=params["calories_per_day"],
+                    healthy=params["healthy"],
+                    allergies=params["allergies"],
+                    preferences=params["preferences"]
+                )
+            else:
+                meal_plan, previous_plan, replacement = recipe_generator.regenerate_plan_meal(
+                    day_num, data["meal"], plan_key=validate_plan_key(data["plan_key"])
+                )
+        except KeyError:
+            return jsonify({"Error": "Meal plan not found"}), 404
+        except ValueError as e:
+            return jsonify({"Error": str(e)}), 400
+        
+        return jsonify({
+            "success": True,
+            "plan_key": data.get("plan_key"),
+            "day": day_num,
+            "meal_plan": meal_plan,
+            "meal": replacement,
+            "grocery_delta": grocery_generator.grocery_list_delta(previous_plan, meal_plan)
+        })
+    except Exception as e:
+        print(f"Error regenerating meal: {str(e)}")
+        return jsonify({
+            "Error": "An unexpected error occurred while regenerating the meal",
+            "details": str(e)
+        }), 500
+
+@recipe_routes.route('/api/llm/stats', methods=["GET"])
+@cross_origin()
+def get_llm_stats():
+    """Completion cache and call statistics for the shared recipe generator"""
+    return jsonify({
+        "success": True,
+        "stats": recipe_generator.client.stats(),
+        "token_planner": recipe_generator.token_planner.stats(),
+        "single_flight": generation_flight.stats(),
+        "recipe_corpus": recipe_generator.recipe_corpus.stats() if recipe_generator.recipe_corpus else None,
+        "ingredient_index": recipe_generator.ingredient_index.stats() if recipe_generator.ingredient_index else None,
+        "meal_plan_jobs": meal_plan_jobs.stats(),
+        "services": services.registry.stats()
+    })
+
 def init_recipe_routes(app):
     """Initialize recipe routes"""
     app.register_blueprint(recipe_routes)
@@ -9,6 +9,60 @@ from flask_cors import cross_origin
 import hashlib
 import time
 
+def parse_quantity(q_str: str, default: Optional[float] = 1.0) -> Optional[float]:
+    """Numeric value of a quantity like "2", "1.5", "1/2", "1 1/2" or a "2-3" range (its midpoint)"""
+    q_str = q_str.strip()
+    
+    # Handle ranges
+    if '-' in q_str:
+        parts = q_str.split('-')
+        try:
+            return (float(parts[0]) + float(parts[1])) / 2
+        except ValueError:
+            return default
+    
+    # Handle fractions
+    if '/' in q_str:
+        try:
+            if ' ' in q_str:  # Mixed number
+                whole, fraction = q_str.split(' ', 1)
+                whole_val = float(whole)
+                num, den = fraction.split('/')
+                frac_val = float(num) / float(den)
+                return whole_val + frac_val
+            else:  # Simple fraction
+                num, den = q_str.split('/')
+                return float(num) / float(den)
+        except (ValueError, ZeroDivisionError):
+            return default
+    
+    # Handle regular numbers
+    try:
+        return float(q_str)
+    except ValueError:
+        return default
+
+QUARTER_FRACTIONS = {0.25: "1/4", 0.5: "1/2", 0.75: "3/4"}
+
+def format_quantity(total: float) -> str:
+    """Display a quantity with common fractions ("1/2", "2 1/2") and sensible rounding"""
+    if total < 1:
+        if abs(total - 0.5) < 0.1:
+            return "1/2"
+        elif abs(total - 0.25) < 0.1:
+            return "1/4"
+        elif abs(total - 0.75) < 0.1:
+            return "3/4"
+        return f"{total:.2f}".rstrip('0').rstrip('.')
+    elif total < 10:
+        if abs(total - round(total) - 0.5) < 0.1:
+            return f"{int(total)} 1/2"
+        # Exact quarters and halves (e.g. rescaled recipe amounts) keep their fraction
+        if total * 4 == int(total * 4) and total != int(total):
+            return f"{int(total)} {QUARTER_FRACTIONS[total % 1]}"
+        return f"{total:.1f}".rstrip('0').rstrip('.')
+    return str(int(round(total)))
+
 @dataclass
 class GroceryItem:
     name: str
@@ -258,6 +312,48 @@ class EnhancedGroceryListGenerator:
             print(f"Error updating check state: {e}")
             return grocery_list
 
+    def grocery_list_delta(self, old_meal_plan_text: str, new_meal_plan_text: str) -> Dict:
+        """Changes to the consolidated grocery list when a meal plan is edited.
+        
+        Both plans are parsed and consolidated locally, so an ingredient the
+        edited meal shared with other meals shows up as a quantity change
+        rather than as removed.
+        """
+        def consolidated(meal_plan_text):
+            items = self.extract_and_consolidate_ingredients(self.parse_meal_plan_with_better_matching(meal_plan_text))
+            return {item.name: item for item in items}
+        
+        def item_data(item):
+            return {
+                'name': item.name,
+                'quantity': item.quantity,
+                'unit': item.unit,
+                'category': item.category.replace('_', ' ').title(),
+                'estimated_cost': item.estimated_cost,
+                'excluded_from_cost': item.category in self.cost_excluded_categories
+            }
+        
+        old_items = consolidated(old_meal_plan_text)
+        new_items = consolidated(new_meal_plan_text)
+        
+        added = [item_data(new_items[name]) for name in sorted(new_items.keys() - old_items.keys())]
+        removed = [item_data(old_items[name]) for name in sorted(old_items.keys() - new_items.keys())]
+        changed = []
+        for name in sorted(old_items.keys() & new_items.keys()):
+            old, new = old_items[name], new_items[name]
+            if (old.quantity, old.unit) != (new.quantity, new.unit):
+                changed.append(dict(item_data(new), previous_quantity=old.quantity, previous_unit=old.unit))
+        
+        def total_cost(items):
+            return sum(item.estimated_cost for item in items.values() if item.category not in self.cost_excluded_categories)
+        
+        return {
+            'added': added,
+            'removed': removed,
+            'changed': changed,
+            'cost_change': round(total_cost(new_items) - total_cost(old_items), 2)
+        }
+
     def _generate_grocery_list_id(self, meal_plan_text: str) -> str:
         """Generate a consistent ID for a meal plan's grocery list"""
         content_hash = hashlib.md5(meal_plan_text.encode()).hexdigest()[:8]
@@ -584,60 +680,11 @@ class EnhancedGroceryListGenerator:
         if not quantities:
             return {'display': '1', 'unit': 'item'}
         
-        def parse_quantity_enhanced(q_str):
-            q_str = q_str.strip()
-            
-            # Handle ranges
-            if '-' in q_str:
-                parts = q_str.split('-')
-                try:
-                    return (float(parts[0]) + float(parts[1])) / 2
-                except ValueError:
-                    return 1.0
-            
-            # Handle fractions
-            if '/' in q_str:
-                try:
-                    if ' ' in q_str:  # Mixed number
-                        whole, fraction = q_str.split(' ', 1)
-                        whole_val = float(whole)
-                        num, den = fraction.split('/')
-                        frac_val = float(num) / float(den)
-                        return whole_val + frac_val
-                    else:  # Simple fraction
-                        num, den = q_str.split('/')
-                        return float(num) / float(den)
-                except (ValueError, ZeroDivisionError):
-                    return 1.0
-            
-            # Handle regular numbers
-            try:
-                return float(q_str)
-            except ValueError:
-                return 1.0
-        
-        numeric_quantities = [parse_quantity_enhanced(q) for q in quantities]
+        numeric_quantities = [parse_quantity(q) for q in quantities]
         
         if numeric_quantities:
             total = sum(numeric_quantities)
-            
-            # Format display with common fractions
-            if total < 1:
-                if abs(total - 0.5) < 0.1:
-                    display = "1/2"
-                elif abs(total - 0.25) < 0.1:
-                    display = "1/4"
-                elif abs(total - 0.75) < 0.1:
-                    display = "3/4"
-                else:
-                    display = f"{total:.2f}".rstrip('0').rstrip('.')
-            elif total < 10:
-                if abs(total - round(total) - 0.5) < 0.1:
-                    display = f"{int(total)} 1/2"
-                else:
-                    display = f"{total:.1f}".rstrip('0').rstrip('.')
-            else:
-                display = str(int(round(total)))
+            display = format_quantity(total)
             
             # Choose most appropriate unit
             if units:
@@ -2,7 +2,7 @@ from flask import request, jsonify, Blueprint
 from flask_cors import cross_origin
 from typing import Dict,Optional
 from dataclasses import dataclass
-from backend.grocery_generator import EnhancedGroceryListGenerator
+from backend import services
 
 # Enhanced Flask routes
 grocery_routes = Blueprint('grocery', __name__)
@@ -33,7 +33,7 @@ class EnhancedGroceryListRequest:
         )
 
 # Global enhanced grocery list generator
-enhanced_generator = EnhancedGroceryListGenerator()
+enhanced_generator = services.proxy("grocery_generator")
 
 @grocery_routes.route('/api/grocery-list', methods=["POST"])
 @cross_origin()
@@ -0,0 +1,21 @@
+# Run from the repository root: gunicorn -c backend/gunicorn.conf.py backend.app:app
+import os
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+
+# Meal plans and SSE streams can run for minutes
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 300))
+
+# Import the app once in the master; importing is cheap because services are built lazily
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Build the generator (OpenAI client, title index, recipe pool) in each worker before it takes requests.
+    # Doing this in the master instead would share sockets and SQLite handles across forks.
+    from backend import services
+    timings = services.warm_up()
+    server.log.info(f"Worker {worker.pid} warmed up services: {timings}")
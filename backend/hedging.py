@@ -0,0 +1,66 @@
+import math
+import os
+import threading
+from collections import deque
+from typing import Optional
+
+
+class LatencyHistory:
+    """Sliding window of recent request latencies for one endpoint"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Nearest-rank percentile of the window, or None when empty"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, math.ceil(percentile / 100.0 * len(samples)))
+        return samples[rank - 1]
+
+
+class HedgePolicy:
+    """Decides when a slow request gets a duplicate.
+
+    A hedge fires once a request has gone longer than ``percentile`` of the
+    endpoint's recent latencies without finishing (or, for streams, without
+    its first token). Until ``min_samples`` latencies are known nothing is
+    hedged, and hedges never fire sooner than ``min_delay`` seconds.
+    """
+
+    def __init__(self, percentile: float = 95, min_samples: int = 20, min_delay: float = 2.0, window: int = 200):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.window = window
+
+    @classmethod
+    def from_env(cls) -> Optional["HedgePolicy"]:
+        """Build a policy from LLM_HEDGE_* environment variables, or None unless hedging is enabled"""
+        if os.getenv("LLM_HEDGING_ENABLED", "false").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", 95)),
+            min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20)),
+            min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", 2.0)),
+        )
+
+    def new_history(self) -> LatencyHistory:
+        return LatencyHistory(self.window)
+
+    def delay(self, history: LatencyHistory) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little history"""
+        if len(history) < self.min_samples:
+            return None
+        return max(self.min_delay, history.percentile(self.percentile))
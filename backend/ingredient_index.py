@@ -0,0 +1,182 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from backend.recipe_corpus import normalize_title
+from backend.recipe_db import RecipeDatabase
+
+logger = logging.getLogger(__name__)
+
+_QUANTITY = re.compile(r'^[\d\s/.,¼½¾⅓⅔⅛-]+(?:to\s+[\d\s/.]+)?')
+_UNITS = re.compile(
+    r'^(?:cups?|c\.|tablespoons?|tbsps?|tsps?|teaspoons?|ounces?|oz|pounds?|lbs?|grams?|g|kg|ml|liters?|l|'
+    r'cloves?|cans?|jars?|packages?|pkgs?|bunch(?:es)?|heads?|stalks?|sprigs?|slices?|pieces?|pinch(?:es)?|'
+    r'dash(?:es)?|handfuls?|fillets?|sticks?|scoops?|whole|of)\b\.?\s*'
+)
+_DESCRIPTORS = re.compile(
+    r'\b(?:fresh|freshly|dried|chopped|diced|minced|sliced|grated|shredded|crushed|ground|cubed|halved|peeled|'
+    r'organic|raw|cooked|frozen|canned|large|medium|small|extra|virgin|boneless|skinless|lean|low|fat|'
+    r'reduced|sodium|ripe|finely|roughly|coarsely|thinly|optional|plus|more|about|divided|packed|'
+    r'softened|melted|room|temperature|uncooked|rinsed|drained)\b'
+)
+
+# Seasonings and basics the ingredient prompt lets recipes use freely; they never count as missing
+PANTRY_STAPLES = frozenset({
+    "salt", "pepper", "black pepper", "salt and pepper", "water", "ice", "oil", "olive oil", "vegetable oil",
+    "canola oil", "cooking spray", "sugar", "brown sugar", "flour", "all purpose flour", "baking soda",
+    "baking powder", "vinegar", "garlic powder", "onion powder", "paprika", "smoked paprika", "cumin",
+    "chili powder", "oregano", "thyme", "rosemary", "cinnamon", "nutmeg", "red pepper flake", "cayenne",
+    "cayenne pepper", "italian seasoning", "bay leaf", "vanilla", "vanilla extract", "turmeric",
+})
+
+
+def _singular(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("oes", "ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def canonical_ingredient(text: str) -> Optional[str]:
+    """Core name of an ingredient line or pantry item ("2 cups chopped fresh tomatoes" -> "tomato")"""
+    text = text.lower().strip().lstrip("•-* ")
+    text = re.sub(r'\([^)]*\)', ' ', text)
+    text = re.split(r',|\bfor\b|\bto taste\b|\bor\b', text, 1)[0]
+    text = _QUANTITY.sub('', text).strip()
+    for _ in range(3):
+        # "1 (14 oz) can of" style amounts stack several units
+        text = _QUANTITY.sub('', _UNITS.sub('', text)).strip()
+    text = _DESCRIPTORS.sub(' ', text)
+    words = [_singular(word) for word in re.findall(r"[a-z]+", text)]
+    return " ".join(words) or None
+
+
+@dataclass
+class PantryMatch:
+    recipe_id: int
+    covered: int
+    missing: List[str]
+
+
+class IngredientIndex:
+    """In-memory inverted index from canonical ingredient to stored recipe ids.
+
+    Built from the generated-recipe corpus and topped up incrementally (rows
+    are append-only, so only ids above the last one seen are read), at most
+    every ``check_interval`` seconds. A pantry search ranks recipes by how
+    many of the user's ingredients they use, then by how few other
+    ingredients they need; pantry staples never count as missing.
+    """
+
+    def __init__(self, db: RecipeDatabase, check_interval: float = 30.0):
+        self.db = db
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._recipe_ingredients: Dict[int, FrozenSet[str]] = {}
+        self._recipe_flags: Dict[int, int] = {}
+        self._by_ingredient: Dict[str, Set[int]] = defaultdict(set)
+        self._by_token: Dict[str, Set[str]] = defaultdict(set)
+        self._titles: Set[str] = set()
+        self._max_id = 0
+        self._checked_at = 0.0
+        self._counters = {"searches": 0, "matches": 0, "search_ms": 0.0}
+        self.refresh()
+
+    def refresh(self):
+        """Index corpus rows added since the last refresh"""
+        rows = self.db.query(
+            "SELECT id, title, ingredients, allergen_flags FROM generated_recipes WHERE id > ? ORDER BY id",
+            (self._max_id,)
+        )
+        with self._lock:
+            for recipe_id, title, ingredients, flags in rows:
+                self._max_id = max(self._max_id, recipe_id)
+                title_key = normalize_title(title)
+                # The same dish stored at several calorie levels is one candidate
+                if title_key in self._titles:
+                    continue
+                names = {canonical_ingredient(line) for line in json.loads(ingredients)}
+                names = frozenset(name for name in names if name and name not in PANTRY_STAPLES)
+                if not names:
+                    continue
+                self._titles.add(title_key)
+                self._recipe_ingredients[recipe_id] = names
+                self._recipe_flags[recipe_id] = flags or 0
+                for name in names:
+                    self._by_ingredient[name].add(recipe_id)
+                    for token in name.split():
+                        self._by_token[token].add(name)
+            self._checked_at = time.monotonic()
+        if rows:
+            logger.info(f"Indexed ingredients of {len(rows)} stored recipe(s), {len(self._recipe_ingredients)} total")
+
+    def _refresh_if_due(self):
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return
+            self._checked_at = time.monotonic()
+        self.refresh()
+
+    def _matching_names(self, term: str) -> Set[str]:
+        """Indexed ingredient names a pantry item stands for: "chicken" covers "chicken breast" and vice versa"""
+        tokens = term.split()
+        candidates = set()
+        for token in tokens:
+            candidates |= self._by_token.get(token, set())
+        term_tokens = set(tokens)
+        return {name for name in candidates if term_tokens <= set(name.split()) or set(name.split()) <= term_tokens}
+
+    def search(self, ingredients: Iterable[str], count: int, exclude_flags: int = 0,
+               max_missing: int = 1) -> List[PantryMatch]:
+        """Best stored recipes for a pantry: most of its ingredients used, fewest others needed"""
+        started = time.perf_counter()
+        self._refresh_if_due()
+        terms = {canonical_ingredient(item) for item in ingredients}
+        terms.discard(None)
+
+        with self._lock:
+            covered: Dict[int, int] = defaultdict(int)
+            matched: Dict[int, Set[str]] = defaultdict(set)
+            for term in terms:
+                names = self._matching_names(term)
+                recipe_ids = set()
+                for name in names:
+                    for recipe_id in self._by_ingredient[name]:
+                        recipe_ids.add(recipe_id)
+                        matched[recipe_id].add(name)
+                for recipe_id in recipe_ids:
+                    covered[recipe_id] += 1
+
+            ranked: List[Tuple[int, int, float, int]] = []
+            for recipe_id, coverage in covered.items():
+                if self._recipe_flags[recipe_id] & exclude_flags:
+                    continue
+                missing = len(self._recipe_ingredients[recipe_id] - matched[recipe_id])
+                if missing <= max_missing:
+                    # Equally good matches are shuffled so repeated searches vary
+                    ranked.append((-coverage, missing, random.random(), recipe_id))
+            ranked.sort()
+            matches = [
+                PantryMatch(recipe_id, -neg_coverage, sorted(self._recipe_ingredients[recipe_id] - matched[recipe_id]))
+                for neg_coverage, _, _, recipe_id in ranked[:count]
+            ]
+            self._counters["searches"] += 1
+            self._counters["matches"] += len(matches)
+            self._counters["search_ms"] += (time.perf_counter() - started) * 1000
+        return matches
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._counters, recipes=len(self._recipe_ingredients), ingredients=len(self._by_ingredient))
+        stats["avg_search_ms"] = round(stats["search_ms"] / stats["searches"], 3) if stats["searches"] else 0.0
+        stats["search_ms"] = round(stats["search_ms"], 3)
+        return stats
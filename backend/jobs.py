@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from backend.recipe_db import RecipeDatabase
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "jobs.db")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+# A job function yields (event, data) pairs: "progress" updates, then one "done" with the result
+JobEvents = Iterable[Tuple[str, Dict[str, Any]]]
+
+
+class JobQueueFull(Exception):
+    """Raised when the runner already has as many queued and running jobs as it accepts"""
+
+
+class JobStore:
+    """Job state in SQLite, so any gunicorn worker can answer status requests.
+
+    Every update bumps the job's version; long-polling clients pass the
+    version they last saw and get the job back as soon as it changes.
+    Jobs whose worker stopped updating them for ``stale_after`` seconds
+    are reported as failed, and finished jobs are dropped after
+    ``retention`` seconds.
+    """
+
+    def __init__(self, db: RecipeDatabase, stale_after: float = 1800, retention: float = 24 * 3600,
+                 poll_interval: float = 0.5):
+        self.db = db
+        self.stale_after = stale_after
+        self.retention = retention
+        self.poll_interval = poll_interval
+        # Wakes long-polls in this process immediately; other processes notice on their next poll
+        self._changed = threading.Condition()
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        with self.db.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs (status, updated_at)")
+
+    def create(self, kind: str, params: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self.db.transaction() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (SUCCEEDED, FAILED, now - self.retention)
+            )
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, version, created_at, updated_at) VALUES (?, ?, ?, ?, 0, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(params), now, now)
+            )
+        return job_id
+
+    def update(self, job_id: str, status: Optional[str] = None, progress: Optional[Dict[str, Any]] = None,
+               result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        fields = {"updated_at": time.time()}
+        if status is not None:
+            fields["status"] = status
+        if progress is not None:
+            fields["progress"] = json.dumps(progress)
+        if result is not None:
+            fields["result"] = json.dumps(result)
+        if error is not None:
+            fields["error"] = error
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self.db.write(f"UPDATE jobs SET {assignments}, version = version + 1 WHERE id = ?", (*fields.values(), job_id))
+        with self._changed:
+            self._changed.notify_all()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self.db.query_one(
+            "SELECT id, kind, status, params, progress, result, error, version, created_at, updated_at FROM jobs WHERE id = ?",
+            (job_id,)
+        )
+        if row is None:
+            return None
+        job = dict(zip(("id", "kind", "status", "params", "progress", "result", "error", "version", "created_at", "updated_at"), row))
+        for field in ("params", "progress", "result"):
+            job[field] = json.loads(job[field]) if job[field] else None
+
+        if job["status"] not in FINISHED_STATUSES and time.time() - job["updated_at"] > self.stale_after:
+            # The worker running it died or was restarted
+            self.update(job_id, status=FAILED, error="Job stopped reporting progress")
+            return self.get(job_id)
+        return job
+
+    def wait(self, job_id: str, since_version: int = -1, timeout: float = 0) -> Optional[Dict[str, Any]]:
+        """The job once its version passes since_version or it finishes, or as it is when timeout runs out"""
+        deadline = time.monotonic() + max(0.0, timeout)
+        while True:
+            job = self.get(job_id)
+            if job is None or job["version"] > since_version or job["status"] in FINISHED_STATUSES:
+                return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return job
+            with self._changed:
+                self._changed.wait(min(self.poll_interval, remaining))
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.db.query("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+
+class JobRunner:
+    """Runs jobs on a bounded thread pool and records their progress in a JobStore"""
+
+    def __init__(self, store: JobStore, max_workers: int = 2, max_pending: int = 20):
+        self.store = store
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._counters = {"submitted": 0, "rejected": 0, "succeeded": 0, "failed": 0}
+
+    @classmethod
+    def from_env(cls) -> "JobRunner":
+        store = JobStore(
+            RecipeDatabase(os.getenv("JOBS_DB_PATH", DEFAULT_JOBS_DB)),
+            stale_after=float(os.getenv("JOB_STALE_SECONDS", 1800)),
+            retention=float(os.getenv("JOB_RETENTION_SECONDS", 24 * 3600)),
+        )
+        return cls(
+            store,
+            max_workers=int(os.getenv("JOB_WORKERS", 2)),
+            max_pending=int(os.getenv("JOB_MAX_PENDING", 20)),
+        )
+
+    def submit(self, kind: str, params: Dict[str, Any], fn: Callable[..., JobEvents]) -> str:
+        """Record a job and queue fn(**params) to run; raises JobQueueFull when at capacity"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._counters["rejected"] += 1
+                raise JobQueueFull(f"{self._pending} jobs already pending")
+            self._pending += 1
+            self._counters["submitted"] += 1
+
+        try:
+            job_id = self.store.create(kind, params)
+            self._executor.submit(self._run, job_id, fn, params)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job_id
+
+    def _run(self, job_id: str, fn: Callable[..., JobEvents], params: Dict[str, Any]):
+        outcome = "failed"
+        try:
+            job = self.store.get(job_id)
+            if job is None or job["status"] != QUEUED:
+                # Expired or already marked lost while it waited in the queue
+                return
+            self.store.update(job_id, status=RUNNING)
+            result = None
+            for event, data in fn(**params):
+                if event == "done":
+                    result = data
+                elif event == "progress":
+                    self.store.update(job_id, progress=data)
+            if result is None:
+                raise RuntimeError("Job finished without a result")
+            self.store.update(job_id, status=SUCCEEDED, result=result)
+            outcome = "succeeded"
+        except Exception as e:
+            logger.warning(f"Job {job_id} failed: {e}")
+            try:
+                self.store.update(job_id, status=FAILED, error=str(e))
+            except Exception as store_error:
+                logger.warning(f"Could not record failure of job {job_id}: {store_error}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._counters[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters, pending=self._pending, max_pending=self.max_pending, workers=self.max_workers)
+        return stats
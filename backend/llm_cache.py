@@ -0,0 +1,229 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Request fields that change transport behaviour but not the completion itself
+NON_CACHE_KEY_FIELDS = {"timeout", "stream", "extra_headers"}
+
+DEFAULT_CACHE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "llm_cache.db")
+
+# Full expiry/size sweeps of the disk tier run at least this often (in writes from this process)
+SWEEP_EVERY_WRITES = 64
+# A sweep over the size cap evicts down to this share of it, so the next writes don't sweep again
+EVICT_TO_FRACTION = 0.9
+
+
+class CompletionCache:
+    """Two-tier (in-process LRU + SQLite) cache for chat completion responses.
+
+    The disk tier's size is tracked as a running estimate (resynced from
+    the table on every sweep), so writes only scan the table when the
+    estimate passes ``max_disk_bytes`` or every ``SWEEP_EVERY_WRITES``
+    writes, which also picks up rows other processes added.
+    """
+
+    def __init__(self, db_path: Optional[str] = DEFAULT_CACHE_DB, max_memory_entries: int = 512,
+                 max_disk_bytes: int = 50 * 1024 * 1024, default_ttl: int = 7 * 24 * 3600):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.default_ttl = default_ttl
+
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None  # None until the first sweep
+        self._writes_since_sweep = 0
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+        if self.db_path:
+            try:
+                self._init_disk()
+            except sqlite3.Error as e:
+                logger.warning(f"Disabling disk completion cache at {self.db_path}: {e}")
+                self.db_path = None
+
+    @classmethod
+    def from_env(cls) -> Optional["CompletionCache"]:
+        """Build a cache from LLM_CACHE_* environment variables, or None when disabled"""
+        if os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            db_path=os.getenv("LLM_CACHE_DB", DEFAULT_CACHE_DB) or None,
+            max_memory_entries=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", 512)),
+            max_disk_bytes=int(os.getenv("LLM_CACHE_DISK_MB", 50)) * 1024 * 1024,
+            default_ttl=int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _init_disk(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS completion_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_completion_cache_access ON completion_cache (last_access)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(params: Dict[str, Any]) -> str:
+        """Hash model, messages and sampling parameters into a stable cache key"""
+        keyed = {k: v for k, v in params.items() if k not in NON_CACHE_KEY_FIELDS}
+        payload = json.dumps(keyed, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+        entry = self._disk_get(key, now)
+        with self._lock:
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["disk_hits"] += 1
+
+        # Promote disk hits into memory with their original expiry
+        value, expires_at = entry
+        self._memory_set(key, value, expires_at)
+        return value
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None):
+        expires_at = time.time() + (ttl if ttl is not None else self.default_ttl)
+        self._memory_set(key, value, expires_at)
+        self._disk_set(key, value, expires_at)
+        with self._lock:
+            self._counters["stores"] += 1
+
+    def _memory_set(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        if not self.db_path:
+            return None
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM completion_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    conn.execute("DELETE FROM completion_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+                conn.execute("UPDATE completion_cache SET last_access = ? WHERE key = ?", (now, key))
+                conn.commit()
+                return row[0], row[1]
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Completion cache read failed: {e}")
+            return None
+
+    def _disk_set(self, key: str, value: str, expires_at: float):
+        if not self.db_path:
+            return
+        try:
+            conn = self._connect()
+            try:
+                now = time.time()
+                size = len(value.encode("utf-8"))
+                conn.execute(
+                    "INSERT OR REPLACE INTO completion_cache (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, expires_at, now)
+                )
+                with self._lock:
+                    self._writes_since_sweep += 1
+                    if self._disk_bytes is not None:
+                        self._disk_bytes += size
+                    sweep = (self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+                             or self._writes_since_sweep >= SWEEP_EVERY_WRITES)
+                if sweep:
+                    self._evict_disk(conn, now)
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Completion cache write failed: {e}")
+
+    def _evict_disk(self, conn: sqlite3.Connection, now: float):
+        """Drop expired rows, then (when over the size cap) least recently used rows down to EVICT_TO_FRACTION of it"""
+        expired = conn.execute("DELETE FROM completion_cache WHERE expires_at <= ?", (now,)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM completion_cache").fetchone()[0]
+
+        evicted = 0
+        if total > self.max_disk_bytes:
+            target = self.max_disk_bytes * EVICT_TO_FRACTION
+            rows = conn.execute("SELECT key, size FROM completion_cache ORDER BY last_access").fetchall()
+            for key, size in rows:
+                if total <= target:
+                    break
+                conn.execute("DELETE FROM completion_cache WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+
+        with self._lock:
+            self._disk_bytes = total
+            self._writes_since_sweep = 0
+            self._counters["evictions"] += expired + evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> Optional[CompletionCache]:
+    """Process-wide cache shared by every client wrapper"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = CompletionCache.from_env() or False
+        return _shared_cache or None
@@ -0,0 +1,275 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+import openai
+from openai.types.chat import ChatCompletion
+
+from backend.hedging import HedgePolicy, LatencyHistory
+from backend.llm_cache import CompletionCache
+from backend.rate_limiter import AdaptiveRateLimiter, RetryBudget, RetryPolicy, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying: throttling, timeouts, dropped connections and 5xx responses
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class _ChatCompletions:
+    """Stand-in for client.chat.completions that routes calls through LLMClient"""
+
+    def __init__(self, owner: "LLMClient"):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        return self._owner.create_chat_completion(**kwargs)
+
+
+class LLMClient:
+    """Wraps an OpenAI client so every chat completion passes through shared policies.
+
+    Call sites keep using ``client.chat.completions.create(...)``. Extra keyword
+    arguments understood by the wrapper are stripped before the request is sent:
+
+    - ``cache``: set to False for creative calls whose output should vary
+    - ``cache_ttl``: override the cache TTL in seconds for this call
+    - ``endpoint``: label used for per-endpoint retry budgets and metrics
+    - ``hedge``: allow a duplicate request when this one is unusually slow
+      (only when the client has a hedge policy)
+
+    Everything other than chat completions (audio transcriptions, models, ...)
+    is forwarded to ``passthrough_client`` (``client`` when not given). Those
+    calls don't go through the wrapper's retries, so the passthrough client
+    should keep the SDK's own.
+    """
+
+    def __init__(self, client, cache: Optional[CompletionCache] = None,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 hedge_policy: Optional[HedgePolicy] = None,
+                 passthrough_client=None):
+        self._client = client
+        self._passthrough_client = passthrough_client or client
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.hedge_policy = hedge_policy
+        self.chat = SimpleNamespace(completions=_ChatCompletions(self))
+
+        self._lock = threading.Lock()
+        self._retry_budgets: Dict[str, RetryBudget] = {}
+        self._endpoint_counters: Dict[str, Dict[str, int]] = {}
+        self._latencies: Dict[str, LatencyHistory] = {}
+        self._hedge_executor = None
+
+    def __getattr__(self, name):
+        # Everything else (audio, models, ...) goes straight to the real client
+        return getattr(self._passthrough_client, name)
+
+    def create_chat_completion(self, cache: bool = True, cache_ttl: Optional[int] = None,
+                               endpoint: str = "default", hedge: bool = False, **kwargs):
+        send = self._send_hedged if hedge and self.hedge_policy else self._send
+        use_cache = cache and self.cache is not None and not kwargs.get("stream")
+        if not use_cache:
+            return send(endpoint, kwargs)
+
+        key = self.cache.make_key(kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            try:
+                return ChatCompletion.model_validate_json(cached)
+            except ValueError as e:
+                logger.warning(f"Discarding unreadable cached completion: {e}")
+
+        response = send(endpoint, kwargs)
+
+        # Only keep complete answers; truncated or filtered output should be retried next time
+        if response.choices and response.choices[0].finish_reason == "stop":
+            self.cache.set(key, response.model_dump_json(), cache_ttl)
+        return response
+
+    def _send(self, endpoint: str, kwargs: Dict[str, Any]):
+        """Send one logical request through the rate limiter, retrying transient failures"""
+        budget = self._retry_budget(endpoint)
+        budget.record_request()
+        self._count(endpoint, "requests")
+
+        estimated_tokens = self._estimate_tokens(kwargs)
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire(estimated_tokens)
+            try:
+                response = self._client.chat.completions.create(**kwargs)
+            except RETRYABLE_ERRORS as e:
+                retry_after = retry_after_seconds(e)
+                if self.rate_limiter and isinstance(e, openai.RateLimitError):
+                    self.rate_limiter.on_rate_limited(retry_after)
+
+                attempt += 1
+                if attempt >= self.retry_policy.max_attempts:
+                    self._count(endpoint, "failures")
+                    raise
+                if not budget.try_spend():
+                    logger.warning(f"Retry budget exhausted for {endpoint}, giving up: {e}")
+                    self._count(endpoint, "budget_exhausted")
+                    raise
+
+                delay = self.retry_policy.delay(attempt, retry_after)
+                logger.info(f"Retrying {endpoint} in {delay:.1f}s after {type(e).__name__} (attempt {attempt + 1})")
+                self._count(endpoint, "retries")
+                time.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage", None)
+            if getattr(usage, "total_tokens", None):
+                self._count(endpoint, "tokens", usage.total_tokens)
+            if self.rate_limiter:
+                self.rate_limiter.on_success()
+                self.rate_limiter.record_usage(estimated_tokens, getattr(usage, "total_tokens", None))
+            return response
+
+    def _send_hedged(self, endpoint: str, kwargs: Dict[str, Any]):
+        """Send a request, firing one duplicate if it runs past the endpoint's usual latency.
+
+        Whichever copy finishes first (for streams: delivers its first token
+        first) is returned; the other is closed, or discarded when it can't be.
+        """
+        delay = self.hedge_policy.delay(self._latency(endpoint))
+        if delay is None:
+            return self._unwrap(endpoint, kwargs, self._timed_send(endpoint, kwargs))
+
+        primary = self._executor().submit(self._timed_send, endpoint, kwargs)
+        try:
+            return self._unwrap(endpoint, kwargs, primary.result(timeout=delay))
+        except FutureTimeout:
+            pass
+
+        logger.info(f"Hedging {endpoint} after {delay:.1f}s without a response")
+        self._count(endpoint, "hedged")
+        hedge = self._executor().submit(self._timed_send, endpoint, kwargs)
+
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((future for future in done if future.exception() is None), None)
+            if winner is None:
+                error = next(iter(done)).exception()
+                continue
+
+            if winner is hedge:
+                self._count(endpoint, "hedge_wins")
+            for loser in (done | pending) - {winner}:
+                loser.add_done_callback(lambda future: self._discard(endpoint, kwargs, future))
+            return self._unwrap(endpoint, kwargs, winner.result())
+        raise error
+
+    def _timed_send(self, endpoint: str, kwargs: Dict[str, Any]):
+        """_send that records latency; streams are timed to their first chunk, which is returned alongside"""
+        started = time.monotonic()
+        response = self._send(endpoint, kwargs)
+        first_chunk = next(iter(response), None) if kwargs.get("stream") else None
+        self._latency(endpoint).record(time.monotonic() - started)
+        return response, first_chunk
+
+    def _unwrap(self, endpoint: str, kwargs: Dict[str, Any], result):
+        response, first_chunk = result
+        if not kwargs.get("stream"):
+            return response
+        return _resume_stream(first_chunk, response, lambda tokens: self._count(endpoint, "tokens", tokens))
+
+    def _discard(self, endpoint: str, kwargs: Dict[str, Any], future):
+        """Close a losing copy and charge what it cost to the endpoint's hedge overhead"""
+        if future.exception() is not None:
+            return
+        response, _ = future.result()
+        if kwargs.get("stream"):
+            # Closing cancels generation; the prompt was still paid for
+            if hasattr(response, "close"):
+                response.close()
+            wasted = self._estimate_tokens(dict(kwargs, max_tokens=0))
+        else:
+            wasted = getattr(getattr(response, "usage", None), "total_tokens", 0) or 0
+        self._count(endpoint, "hedge_overhead_tokens", wasted)
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+            return self._hedge_executor
+
+    def _latency(self, endpoint: str) -> LatencyHistory:
+        with self._lock:
+            if endpoint not in self._latencies:
+                self._latencies[endpoint] = self.hedge_policy.new_history()
+            return self._latencies[endpoint]
+
+    @staticmethod
+    def _estimate_tokens(kwargs: Dict[str, Any]) -> int:
+        """Rough prompt size (4 characters per token) plus the completion allowance"""
+        prompt_chars = len(json.dumps(kwargs.get("messages", []), ensure_ascii=False))
+        return prompt_chars // 4 + int(kwargs.get("max_tokens") or 1000)
+
+    def _retry_budget(self, endpoint: str) -> RetryBudget:
+        with self._lock:
+            if endpoint not in self._retry_budgets:
+                self._retry_budgets[endpoint] = RetryBudget()
+            return self._retry_budgets[endpoint]
+
+    def _count(self, endpoint: str, name: str, amount: int = 1):
+        with self._lock:
+            counters = self._endpoint_counters.setdefault(endpoint, {})
+            counters[name] = counters.get(name, 0) + amount
+
+    def record_event(self, endpoint: str, name: str):
+        """Count a caller-side event (e.g. an aborted stream) in the endpoint's metrics"""
+        self._count(endpoint, name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {name: dict(counters) for name, counters in self._endpoint_counters.items()}
+            latencies = dict(self._latencies)
+
+        for name, counters in endpoints.items():
+            if "hedged" in counters:
+                original_requests = counters["requests"] - counters["hedged"]
+                counters["hedge_rate"] = round(counters["hedged"] / original_requests, 3) if original_requests else 0.0
+                tokens = counters.get("tokens", 0)
+                overhead = counters.get("hedge_overhead_tokens", 0)
+                counters["hedge_cost_overhead"] = round(overhead / tokens, 3) if tokens else None
+        for name, history in latencies.items():
+            counters = endpoints.setdefault(name, {})
+            counters["latency_p50"] = history.percentile(50)
+            counters["latency_p95"] = history.percentile(95)
+
+        return {
+            "cache": self.cache.stats() if self.cache else None,
+            "rate_limiter": self.rate_limiter.stats() if self.rate_limiter else None,
+            "endpoints": endpoints,
+        }
+
+
+def _resume_stream(first_chunk, stream, on_usage):
+    """Yield a stream's already-read first chunk followed by the rest; closing it closes the stream"""
+    try:
+        if first_chunk is not None:
+            yield first_chunk
+        for chunk in stream:
+            # Streams only report usage in their final chunk (with include_usage)
+            usage = getattr(chunk, "usage", None)
+            if getattr(usage, "total_tokens", None):
+                on_usage(usage.total_tokens)
+            yield chunk
+    finally:
+        if hasattr(stream, "close"):
+            stream.close()
@@ -0,0 +1,121 @@
+import logging
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from backend.recipe_corpus import RecipeCorpus, normalize_title
+
+logger = logging.getLogger(__name__)
+
+Recipe = Dict[str, Any]
+
+# Cost of leaving a slot to the LLM; higher than any in-tolerance candidate, so stored recipes win
+UNFILLED_SLOT_COST = 1.0
+
+
+class MealPlanSolver:
+    """Assembles meal plans from the generated-recipe corpus without calling the LLM.
+
+    Each (meal type, calorie target) slot gets a list of stored candidates
+    within the calorie tolerance. Every day is then solved with a small
+    depth-first search over the best few unused candidates per slot,
+    minimizing each meal's calorie miss plus the day's total miss, with
+    unmatched preferences as a penalty. Titles never repeat across the plan;
+    slots without a usable candidate come back as None for the LLM to fill.
+    """
+
+    def __init__(self, corpus: RecipeCorpus, tolerance: float = 0.1, beam_width: int = 4):
+        self.corpus = corpus
+        self.tolerance = tolerance
+        self.beam_width = beam_width
+
+    @classmethod
+    def from_env(cls, corpus: RecipeCorpus) -> "MealPlanSolver":
+        return cls(
+            corpus,
+            tolerance=float(os.getenv("MEAL_PLAN_CALORIE_TOLERANCE", 0.1)),
+            beam_width=int(os.getenv("MEAL_PLAN_SOLVER_BEAM", 4)),
+        )
+
+    def solve(self, days: int, meal_types: Sequence[str], calorie_targets: Sequence[int],
+              exclude_flags: int = 0, healthy: bool = False, preferences: Optional[Iterable[str]] = None,
+              exclude_titles: Iterable[str] = ()) -> List[List[Optional[Recipe]]]:
+        """Pick a stored recipe for every slot of every day (None where the corpus has nothing that fits)"""
+        keywords = self._preference_keywords(preferences)
+        used = {normalize_title(title) for title in exclude_titles}
+
+        # Enough candidates per slot for every day plus room to trade off the day totals
+        candidates = []
+        for meal_type, target in zip(meal_types, calorie_targets):
+            found = self.corpus.find(
+                meal_type, days + self.beam_width * 2, calories=target, tolerance=self.tolerance,
+                exclude_flags=exclude_flags, healthy=healthy
+            )
+            candidates.append(sorted(found, key=lambda recipe: self._slot_cost(recipe, target, keywords)))
+
+        plan = []
+        for _ in range(days):
+            day = self._solve_day(candidates, calorie_targets, keywords, used)
+            used.update(normalize_title(recipe["title"]) for recipe in day if recipe)
+            plan.append(day)
+
+        covered = sum(recipe is not None for day in plan for recipe in day)
+        logger.info(f"Assembled {covered}/{days * len(meal_types)} meal slots from stored recipes")
+        return plan
+
+    def _solve_day(self, candidates: List[List[Recipe]], calorie_targets: Sequence[int],
+                   keywords: List[str], used: set) -> List[Optional[Recipe]]:
+        # Most constrained slots first, each limited to its best few unused candidates
+        options = [
+            [recipe for recipe in slot_candidates if normalize_title(recipe["title"]) not in used][:self.beam_width]
+            for slot_candidates in candidates
+        ]
+        order = sorted(range(len(options)), key=lambda i: len(options[i]))
+        day_target = sum(calorie_targets[:len(options)])
+        best: Dict[str, Any] = {"cost": None, "day": [None] * len(options)}
+
+        def search(position, chosen, total, titles, cost):
+            if best["cost"] is not None and cost >= best["cost"]:
+                return
+            if position == len(order):
+                cost += abs(total - day_target) / day_target
+                if best["cost"] is None or cost < best["cost"]:
+                    best["cost"], best["day"] = cost, list(chosen)
+                return
+
+            slot = order[position]
+            target = calorie_targets[slot]
+            for recipe in options[slot]:
+                title = normalize_title(recipe["title"])
+                if title in titles:
+                    continue
+                chosen[slot] = recipe
+                search(position + 1, chosen, total + (recipe["nutrition"]["calories"] or target),
+                       titles | {title}, cost + self._slot_cost(recipe, target, keywords))
+            # Left for the LLM, which is asked for the exact target
+            chosen[slot] = None
+            search(position + 1, chosen, total + target, titles, cost + UNFILLED_SLOT_COST)
+
+        search(0, [None] * len(options), 0, frozenset(), 0.0)
+        return best["day"]
+
+    @staticmethod
+    def _slot_cost(recipe: Recipe, target: int, keywords: List[str]) -> float:
+        calories = recipe["nutrition"]["calories"] or target
+        cost = abs(calories - target) / target
+        if keywords:
+            text = " ".join([recipe["title"], *recipe["ingredients"]]).lower()
+            # A penalty per missed preference keyword keeps costs non-negative, so the search can prune
+            cost += 0.05 * sum(keyword not in text for keyword in keywords)
+        return cost
+
+    @staticmethod
+    def _preference_keywords(preferences: Optional[Iterable[str]]) -> List[str]:
+        if not preferences:
+            return []
+        if isinstance(preferences, str):
+            preferences = [preferences]
+        words = []
+        for preference in preferences:
+            words += [word for word in re.findall(r'[a-z]+', preference.lower()) if len(word) > 3]
+        return words
@@ -2,63 +2,154 @@ from openai import OpenAI
 import os
 import sqlite3
 import random
-from time import sleep
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
 import re
+from dataclasses import dataclass
+from typing import Optional
+from collections import Counter
+from backend.llm_cache import get_shared_cache
+from backend.hedging import HedgePolicy
+from backend.llm_client import LLMClient
+from backend.rate_limiter import get_shared_rate_limiter
+from backend.token_planner import TokenBudgetPlanner
+from backend.recipe_db import RecipeDatabase, resolve_db_path, resolve_state_db_path
+from backend.recipe_pool import RecipePool
+from backend.recipe_corpus import RecipeCorpus, StoredRecipeText, normalize_title
+from backend.meal_plan_solver import MealPlanSolver
+from backend.ingredient_index import IngredientIndex
+from backend.portion_scaler import MIN_SCALE_FACTOR, scale_to_calories
+from backend.plan_checkpoints import PlanCheckpointStore
+from backend.allergens import allergen_mask, restriction_mask
+from backend.title_sampler import TitleSampler
+from backend.title_classifier import category_classifier
+from backend.stream_validator import MealPlanStreamValidator, StreamRejected, extract_titles, plan_counts, plan_structure_problem, validate_day_text, validate_plan_text
+from backend.recipe_schema import RECIPE_JSON_FORMAT, parse_items, parse_recipe_text, repair_recipe, render_meal_text, render_recipe_text
 import random
 
 # Load environment variables
 load_dotenv()
 
+@dataclass(frozen=True)
+class GenerationContext:
+    """Per-request generation settings, passed explicitly so one generator can serve concurrent requests"""
+    calories_per_day: Optional[int] = None
+    meals_per_day: Optional[int] = None
+    default_recipe_calories: int = 500
+
+    @property
+    def has_daily_target(self):
+        return bool(self.calories_per_day and self.meals_per_day)
+
+DEFAULT_CONTEXT = GenerationContext()
+
 class RecipeGenerator:
-    def __init__(self, api_key=None, db_path=None):
+    # Categories stored in the recipes database
+    MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack", "dessert"]
+    
+    # Cuisine themes used to vary day-by-day meal plans
+    DAY_THEMES = [
+        "Mediterranean flavors", "Asian fusion", "Mexican cuisine",
+        "Italian classics", "American comfort", "Indian spices",
+        "Middle Eastern", "Thai flavors", "French bistro", "Greek healthy"
+    ]
+    
+    def __init__(self, api_key=None, db_path=None, max_concurrent_batches=None, parallel_days=None, max_concurrent_days=None, state_db_path=None):
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         
+        # Cap on how many title batches may be in flight against the API at once
+        if max_concurrent_batches is None:
+            max_concurrent_batches = int(os.getenv('RECIPE_BATCH_CONCURRENCY', 4))
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        # One pool per generator (one generator per process), so the cap holds across concurrent requests.
+        # Batch tasks only call the API and never submit to this pool themselves, so waiting on it can't deadlock
+        self.batch_executor = ThreadPoolExecutor(max_workers=self.max_concurrent_batches, thread_name_prefix="recipe-batch")
+        
+        # Parallel day generation for long meal plans (off unless enabled)
+        if parallel_days is None:
+            parallel_days = os.getenv('MEAL_PLAN_PARALLEL_DAYS', 'false').lower() in ('1', 'true', 'yes')
+        self.parallel_days = parallel_days
+        if max_concurrent_days is None:
+            max_concurrent_days = int(os.getenv('MEAL_PLAN_DAY_CONCURRENCY', 4))
+        self.max_concurrent_days = max(1, max_concurrent_days)
+        
+        # Stream meal plan completions and cancel them as soon as they cannot pass validation
+        self.stream_validation = os.getenv('MEAL_PLAN_STREAM_VALIDATION', 'true').lower() in ('1', 'true', 'yes')
+        
+        # Sizes max_tokens per call from observed output and splits oversized requests
+        self.token_planner = TokenBudgetPlanner.from_env()
+        
         if not self.api_key:
             raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY environment variable or pass the key directly.")
             
-        self.client = OpenAI(api_key=self.api_key)
-        
-        # Try to find the database file in several possible locations
-        if db_path is None:
-            # Try several possible locations
-            possible_paths = [
-                'recipes.db',              # Current directory
-                'data/recipes.db',         # Data subdirectory
-                'backend/data/recipes.db', # Backend/data subdirectory
-                '../data/recipes.db',      # Parent's data subdirectory
-            ]
-            
-            for path in possible_paths:
-                if os.path.exists(path):
-                    db_path = path
-                    break
-            else:
-                # Default if none found
-                db_path = 'recipes.db'
+        # Chat retries are handled by the wrapper's shared rate limiter and backoff, not the SDK;
+        # passthrough calls (audio transcriptions) keep the SDK's default retries
+        openai_client = OpenAI(api_key=self.api_key)
+        self.client = LLMClient(
+            openai_client.with_options(max_retries=0),
+            cache=get_shared_cache(),
+            rate_limiter=get_shared_rate_limiter(),
+            hedge_policy=HedgePolicy.from_env(),
+            passthrough_client=openai_client
+        )
+        
+        self.db_path = resolve_db_path(db_path)
+        self.state_db_path = resolve_state_db_path(state_db_path, self.db_path)
+        print(f"Using database at: {os.path.abspath(self.db_path)}")
+        print(f"Storing generated recipes at: {os.path.abspath(self.state_db_path)}")
         
-        self.db_path = db_path
-        print(f"Using database at: {os.path.abspath(db_path)}")
+        # Reused per-thread connections. recipes.db (the titles) is only ever read; everything written at
+        # runtime goes to the state database through WAL, and corpus reads use a read-only handle on it
+        self.titles_db = RecipeDatabase(self.db_path, read_only=True)
+        self.recipe_db = RecipeDatabase(self.state_db_path)
+        self.corpus_db = RecipeDatabase(self.state_db_path, read_only=True)
         
-        # Test database connection
+        # Pre-generated full recipes for the titles
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get recipe count
-            cursor.execute("SELECT COUNT(*) FROM recipes")
-            count = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT category, COUNT(*) FROM recipes GROUP BY category")
-            categories = cursor.fetchall()
-            conn.close()
+            self.recipe_pool = RecipePool(self.recipe_db, self.titles_db)
+        except sqlite3.Error as e:
+            print(f"Recipe pool unavailable: {str(e)}")
+            self.recipe_pool = None
+        
+        # Every generated recipe is kept for reuse, and requests are answered from it first
+        self.corpus_serving = os.getenv('RECIPE_CORPUS_SERVE', 'true').lower() in ('1', 'true', 'yes')
+        try:
+            self.recipe_corpus = RecipeCorpus(self.recipe_db)
+        except sqlite3.Error as e:
+            print(f"Recipe corpus unavailable: {str(e)}")
+            self.recipe_corpus = None
+        
+        # Pantry searches are answered from stored recipes before asking the LLM
+        self.pantry_max_missing = int(os.getenv('PANTRY_MATCH_MAX_MISSING', 1))
+        try:
+            self.ingredient_index = IngredientIndex(self.corpus_db) if self.recipe_corpus and self.corpus_serving else None
+        except sqlite3.Error as e:
+            print(f"Ingredient index unavailable: {str(e)}")
+            self.ingredient_index = None
+        
+        # Finished meal plan days are saved under a plan key so retries resume instead of starting over
+        try:
+            self.plan_checkpoints = PlanCheckpointStore(self.recipe_db)
+        except sqlite3.Error as e:
+            print(f"Meal plan checkpoints unavailable: {str(e)}")
+            self.plan_checkpoints = None
+        
+        # Meal plans are assembled from the corpus when it covers enough of the slots
+        self.meal_plan_solver = MealPlanSolver.from_env(self.recipe_corpus) if self.recipe_corpus else None
+        self.max_generated_share = float(os.getenv('MEAL_PLAN_MAX_GENERATED_SHARE', 0.25))
+        
+        # Load every title once; requests sample from memory and reload when the file changes
+        try:
+            self.title_sampler = TitleSampler(self.titles_db)
+            categories = self.title_sampler.counts()
             
-            print(f"Connected to database with {count} recipes")
-            for category, cat_count in categories:
+            print(f"Connected to database with {sum(categories.values())} recipes")
+            for category, cat_count in categories.items():
                 print(f"  - {category}: {cat_count} recipes")
                 
         except Exception as e:
             print(f"Database error: {str(e)}")
+            self.title_sampler = None
     
     def _get_realistic_calorie_distribution(self, total_calories, meals_per_day):
         """Calculate realistic calorie distribution for different meals"""
@@ -92,18 +183,108 @@ class RecipeGenerator:
                 calories[i] += 1
             return calories
             
-    def get_recipe_ideas(self, meal_type, healthy, allergies, count=5):
-        # If there are allergies, use the original method to generate recipes
-        meal_type_valid = ["breakfast","lunch","dinner","snack","dessert"]
-        if allergies:
-            print(f"Using original method due to allergies: {allergies}")
-            return self._generate_recipes_with_openai(meal_type, healthy, allergies, count)
-        if meal_type not in meal_type_valid:
+    def _meal_category(self, meal_type):
+        """recipes.db category for a meal type; free-form ones ("brunch", "late night") are classified, None if nothing fits"""
+        if meal_type in self.MEAL_TYPES:
+            return meal_type
+        category = category_classifier().classify_meal_type(meal_type)
+        if self.title_sampler is None or not self.title_sampler.counts().get(category):
+            # Titles from another category would ignore what was asked for
+            return None
+        return category
+
+    def _uses_open_generation(self, meal_type, allergies):
+        """True when get_recipe_ideas would skip the database and generate open-ended recipes"""
+        # Allergies the title index can't filter by still need the open-ended prompt
+        return self._meal_category(meal_type) is None or restriction_mask(allergies or []) is None
+
+    def get_recipe_ideas(self, meal_type, healthy, allergies, count=5, context=DEFAULT_CONTEXT):
+        category = self._meal_category(meal_type)
+        if category is not None and category != meal_type:
+            print(f"Custom meal type '{meal_type}' maps to {category}")
+            meal_type = category
+
+        # Serve pre-generated recipes first (pool, then the generated corpus), then generate the rest
+        # Pooled recipes carry no allergen flags, so allergy requests skip the pool
+        served = [] if allergies or self._uses_open_generation(meal_type, allergies) else self._sample_recipe_pool(meal_type, healthy, count, context)
+        if len(served) < count:
+            served += self._sample_recipe_corpus(meal_type, healthy, allergies, count - len(served), context, served)
+        if len(served) >= count:
+            print(f"Served {count} {meal_type} recipes from stored recipes")
+            return served[:count]
+        
+        remaining = count - len(served)
+        if category is None:
             print(f"meal type is custom, default to original method: {meal_type}")
-            return self._generate_recipes_with_openai(meal_type,healthy,allergies,count)
-        # Otherwise, use recipes from the database
-        print(f"Using titles from database for meal type: {meal_type}")
-        return self._generate_recipes_from_database(meal_type, healthy, count)
+            generated = self._generate_recipes_with_openai(meal_type, healthy, allergies, remaining, context)
+        elif self._uses_open_generation(meal_type, allergies):
+            # Restrictions the allergen flags don't cover use the original method
+            print(f"Using original method due to allergies: {allergies}")
+            generated = self._generate_recipes_with_openai(meal_type, healthy, allergies, remaining, context)
+        else:
+            print(f"Using titles from database for meal type: {meal_type}")
+            generated = self._generate_recipes_from_database(meal_type, healthy, remaining, context, allergies)
+        
+        self._remember_recipes(generated, "recipes.ideas", meal_type, healthy, allergies=allergies, calories_per_day=context.calories_per_day)
+        return served + generated
+    
+    def _sample_recipe_pool(self, meal_type, healthy, count, context=DEFAULT_CONTEXT):
+        """Pull ready-made recipes from the pool when the default calorie target applies"""
+        if self.recipe_pool is None or context.has_daily_target:
+            return []
+        try:
+            return self.recipe_pool.sample(meal_type, count, calories=context.default_recipe_calories, healthy=healthy)
+        except sqlite3.Error as e:
+            print(f"Recipe pool read error: {str(e)}")
+            return []
+    
+    def _sample_recipe_corpus(self, meal_type, healthy, allergies, count, context=DEFAULT_CONTEXT, already_served=()):
+        """Stored generated recipes near each calorie target, free of the requested allergens"""
+        if self.recipe_corpus is None or not self.corpus_serving or count <= 0:
+            return []
+        # Only restrictions the allergen flags understand can be filtered safely
+        exclude_flags = restriction_mask(allergies or [])
+        if exclude_flags is None:
+            return []
+        
+        exclude_titles = [recipe.split('\n', 1)[0] for recipe in already_served]
+        recipes = []
+        try:
+            for calories, target_count in Counter(self._calorie_targets(count, context)).items():
+                found = self.recipe_corpus.find(
+                    meal_type, target_count, calories=calories, exclude_flags=exclude_flags,
+                    healthy=healthy, exclude_titles=exclude_titles
+                )
+                exclude_titles += [recipe["title"] for recipe in found]
+                if len(found) < target_count:
+                    # Recipes at other calorie levels are rescaled to the target instead of generating new ones
+                    wider = self.recipe_corpus.find(
+                        meal_type, target_count - len(found), calories=calories, tolerance=1 - MIN_SCALE_FACTOR,
+                        exclude_flags=exclude_flags, healthy=healthy, exclude_titles=exclude_titles
+                    )
+                    exclude_titles += [recipe["title"] for recipe in wider]
+                    found += [scaled for scaled in (scale_to_calories(recipe, calories) for recipe in wider) if scaled]
+                recipes += [StoredRecipeText(render_recipe_text(recipe)) for recipe in found]
+        except sqlite3.Error as e:
+            print(f"Recipe corpus read error: {str(e)}")
+        return recipes
+    
+    def _remember_recipes(self, recipes, source, category=None, healthy=False, **params):
+        """Queue generated recipes (text or structured) for the corpus; meal blocks default to their meal type"""
+        if self.recipe_corpus is None:
+            return
+        try:
+            for recipe in recipes:
+                # Stored recipes served back (e.g. rescaled to a new target) are not new content
+                if isinstance(recipe, StoredRecipeText):
+                    continue
+                if isinstance(recipe, str):
+                    recipe = parse_recipe_text(recipe)
+                recipe_category = category or (recipe or {}).get("meal_type")
+                if recipe and recipe_category:
+                    self.recipe_corpus.add(recipe, recipe_category, healthy, {k: v for k, v in params.items() if v}, source)
+        except Exception as e:
+            print(f"Could not record generated recipes: {str(e)}")
     
     def _ensure_recipe_formatting(self, recipe_text):
         """Process a recipe to ensure consistent formatting, especially for instructions"""
@@ -170,10 +351,16 @@ class RecipeGenerator:
         # Final cleanup to ensure one blank line between sections
         return re.sub(r'\n{3,}', '\n\n', result)
         
-    def _generate_multiple_recipes_from_titles(self, titles, healthy, calorie_targets):
+    def _generate_multiple_recipes_from_titles(self, titles, healthy, calorie_targets, allergies=None):
         """Generate multiple recipes with specific calorie targets"""
         if len(titles) != len(calorie_targets):
             raise ValueError("Number of titles must match number of calorie targets")
+        exclude_flags = restriction_mask(allergies or []) or 0
+        
+        # Titles already in the corpus at another calorie level are rescaled instead of regenerated
+        scaled_recipes, titles, calorie_targets = self._scale_stored_titles(titles, healthy, calorie_targets, exclude_flags)
+        if not titles:
+            return scaled_recipes
             
         selected_titles = titles[:len(calorie_targets)]
         titles_and_calories = [(title, cal) for title, cal in zip(selected_titles, calorie_targets)]
@@ -237,16 +424,19 @@ class RecipeGenerator:
         
         if healthy:
             prompt += " Make all recipes healthy and nutritious while maintaining the exact calorie targets."
+        if allergies:
+            prompt += f" Every recipe must be completely free of: {', '.join(allergies)}. Substitute ingredients where the usual version of a dish contains them."
         
         try:
             response = self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
+                endpoint="recipes.batch",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.7,
-                max_tokens=2500,
+                max_tokens=self.token_planner.max_tokens_for("recipe", len(selected_titles)),
                 top_p=0.8
             )
             
@@ -263,7 +453,11 @@ class RecipeGenerator:
                     processed = self._ensure_recipe_formatting(cleaned)
                     processed_recipes.append(processed)
             
-            return processed_recipes[:len(calorie_targets)]
+            self._observe_usage("recipe", response, len(processed_recipes))
+            if response.choices[0].finish_reason == "length" and processed_recipes:
+                processed_recipes = processed_recipes[:-1]
+            
+            return scaled_recipes + self._without_allergens(processed_recipes[:len(calorie_targets)], exclude_flags)
                 
         except Exception as e:
             print(f"Error generating multiple recipes: {str(e)}")
@@ -271,86 +465,88 @@ class RecipeGenerator:
             processed_recipes = []
             for title, target_calories in titles_and_calories:
                 try:
-                    recipe = self._generate_single_recipe_from_title(title, healthy, target_calories)
+                    recipe = self._generate_single_recipe_from_title(title, healthy, target_calories, allergies=allergies)
                     if recipe:
                         processed_recipes.append(recipe)
                 except Exception as inner_e:
                     print(f"Error in fallback generation for '{title}': {str(inner_e)}")
             
-            return processed_recipes
+            return scaled_recipes + processed_recipes
+    
+    def _without_allergens(self, recipes, exclude_flags):
+        """Drop generated recipes whose ingredients still contain a restricted allergen (title flags are only a guess)"""
+        if not exclude_flags:
+            return recipes
+        safe = []
+        for recipe_text in recipes:
+            recipe = parse_recipe_text(recipe_text)
+            if recipe and not allergen_mask([recipe["title"], *recipe["ingredients"]]) & exclude_flags:
+                safe.append(recipe_text)
+            else:
+                print(f"Dropping recipe that doesn't meet the allergy restrictions: {recipe_text.split(chr(10), 1)[0]}")
+        return safe
+        
+    def _scale_stored_titles(self, titles, healthy, calorie_targets, exclude_flags=0):
+        """Rescale stored recipes for these titles to their targets.
+
+        Returns (scaled recipe texts, titles still to generate, their calorie targets).
+        """
+        if self.recipe_corpus is None or not self.corpus_serving:
+            return [], titles, calorie_targets
+        try:
+            stored = self.recipe_corpus.find_by_titles(titles, healthy, exclude_flags)
+        except sqlite3.Error as e:
+            print(f"Recipe corpus read error: {str(e)}")
+            return [], titles, calorie_targets
         
-    def _generate_recipes_from_database(self, meal_type, healthy, count=10):
+        scaled_recipes, remaining_titles, remaining_targets = [], [], []
+        for title, target in zip(titles, calorie_targets):
+            recipe = stored.get(normalize_title(title))
+            scaled = scale_to_calories(recipe, target) if recipe else None
+            if scaled:
+                scaled_recipes.append(StoredRecipeText(render_recipe_text(scaled)))
+            else:
+                remaining_titles.append(title)
+                remaining_targets.append(target)
+        if scaled_recipes:
+            print(f"Rescaled {len(scaled_recipes)} stored recipe(s) instead of generating them")
+        return scaled_recipes, remaining_titles, remaining_targets
+    
+    def _calorie_targets(self, count, context=DEFAULT_CONTEXT):
+        """Per-recipe calorie targets for a batch of count recipes"""
+        if context.has_daily_target:
+            return self._get_realistic_calorie_distribution(context.calories_per_day, count)
+        return [context.default_recipe_calories] * count
+
+    def _generate_recipes_from_database(self, meal_type, healthy, count=10, context=DEFAULT_CONTEXT, allergies=None):
         """Generate recipes based on titles from the database using batch processing"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            if self.title_sampler is None:
+                raise RuntimeError("recipe titles are not loaded")
             
-            # Query the database for recipe titles
-            if meal_type.lower() == "any":
-                cursor.execute("SELECT title FROM recipes ORDER BY RANDOM() LIMIT ?", (count*3,))
-            else:
-                cursor.execute(
-                    "SELECT title FROM recipes WHERE category = ? ORDER BY RANDOM() LIMIT ?",
-                    (meal_type.lower(), count*3)
-                )
-                
-            # Fetch all matching titles
-            titles = [row[0] for row in cursor.fetchall()]
-            conn.close()
+            # Sample recipe titles from the in-memory category index, skipping titles flagged for the allergies
+            exclude_flags = restriction_mask(allergies or []) or 0
+            titles = self.title_sampler.sample(meal_type.lower(), count*3, exclude_flags)
             
             print(f"Found {len(titles)} titles for {meal_type}")
             
-            # If we don't have enough titles, query again for more from any category
+            # If we don't have enough titles, sample more from any category
             if len(titles) < count and meal_type.lower() != "any":
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                
-                # Get more random titles to make up the difference
-                cursor.execute(
-                    "SELECT title FROM recipes ORDER BY RANDOM() LIMIT ?",
-                    (count*2 - len(titles),)
-                )
-                additional_titles = [row[0] for row in cursor.fetchall()]
-                titles.extend(additional_titles)
-                conn.close()
+                titles.extend(self.title_sampler.sample("any", count*2 - len(titles), exclude_flags))
             
             # We get more titles than needed to account for potential failures
             random.shuffle(titles)
             
             # Use realistic calorie distribution for the requested count
-            if hasattr(self, 'calories_per_day') and hasattr(self, 'target_meals_per_day'):
-                calorie_distribution = self._get_realistic_calorie_distribution(self.calories_per_day, count)
-            else:
-                # Default distribution if not set
-                default_calories = 500
-                calorie_distribution = [default_calories] * count
-            
-            # Generate recipes in batches with specific calorie targets
-            batch_size = min(5, count)
-            all_recipes = []
+            calorie_distribution = self._calorie_targets(count, context)
             
-            for i in range(0, len(titles), batch_size):
-                batch_titles = titles[i:i+batch_size]
-                batch_calories = calorie_distribution[i:i+batch_size]
-                
-                if not batch_titles:
-                    break
-                    
-                # Add rate limiting to avoid API limits
-                if i > 0:
-                    sleep(1)
-                    
-                batch_recipes = self._generate_multiple_recipes_from_titles(batch_titles, healthy, batch_calories)
-                all_recipes.extend(batch_recipes)
-                
-                # If we have enough recipes, stop
-                if len(all_recipes) >= count:
-                    break
+            # Generate all batches concurrently with specific calorie targets
+            all_recipes = self._run_title_batches(titles, healthy, calorie_distribution, count, allergies)
             
             # If we couldn't generate enough recipes from titles, fall back to the original method
             if len(all_recipes) < count:
                 print(f"Only generated {len(all_recipes)} recipes from titles, falling back to OpenAI for the remaining {count - len(all_recipes)}")
-                remaining_recipes = self._generate_recipes_with_openai(meal_type, healthy, None, count - len(all_recipes))
+                remaining_recipes = self._generate_recipes_with_openai(meal_type, healthy, allergies, count - len(all_recipes), context)
                 all_recipes.extend(remaining_recipes)
             
             return all_recipes[:count]
@@ -358,14 +554,60 @@ class RecipeGenerator:
         except Exception as e:
             print(f"Database error in batch processing: {str(e)}")
             # Fall back to OpenAI if database access fails
-            return self._generate_recipes_with_openai(meal_type, healthy, None, count)
+            return self._generate_recipes_with_openai(meal_type, healthy, allergies, count, context)
+    
+    def _run_title_batches(self, titles, healthy, calorie_distribution, count, allergies=None):
+        """Send title batches concurrently and collect recipes until count is reached"""
+        batch_size = min(5, self.token_planner.max_items_per_call("recipe"), count)
+        primary_titles = titles[:count]
+        spare_titles = titles[count:]
+        
+        pending = {}
+        
+        def submit(batch_titles, batch_calories):
+            future = self.batch_executor.submit(self._generate_multiple_recipes_from_titles, batch_titles, healthy, batch_calories, allergies)
+            pending[future] = batch_calories
+        
+        for i in range(0, len(primary_titles), batch_size):
+            batch_titles = primary_titles[i:i+batch_size]
+            submit(batch_titles, calorie_distribution[i:i+len(batch_titles)])
+        
+        all_recipes = []
+        try:
+            while pending and len(all_recipes) < count:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch_calories = pending.pop(future)
+                    try:
+                        batch_recipes = future.result()
+                    except Exception as e:
+                        print(f"Batch generation error: {str(e)}")
+                        batch_recipes = []
+                    all_recipes.extend(batch_recipes)
+                    
+                    # Retry a short batch's missing slots with unused titles
+                    shortfall = batch_calories[len(batch_recipes):]
+                    if shortfall and len(spare_titles) >= len(shortfall) and len(all_recipes) < count:
+                        submit(spare_titles[:len(shortfall)], shortfall)
+                        spare_titles = spare_titles[len(shortfall):]
+        finally:
+            # Drop queued batches once we have enough; in-flight calls finish in the background
+            for future in pending:
+                future.cancel()
+        
+        return all_recipes[:count]
     
-    def _generate_single_recipe_from_title(self, title, healthy, target_calories=None):
+    def _generate_single_recipe_from_title(self, title, healthy, target_calories=None, context=DEFAULT_CONTEXT, allergies=None):
         """Generate a single recipe based on a title with specific calorie target"""
         
         # Use provided target or default
         if target_calories is None:
-            target_calories = getattr(self, 'target_calories_per_recipe', 500)
+            target_calories = context.default_recipe_calories
+        exclude_flags = restriction_mask(allergies or []) or 0
+        
+        scaled_recipes, _, _ = self._scale_stored_titles([title], healthy, [target_calories], exclude_flags)
+        if scaled_recipes:
+            return scaled_recipes[0]
         
         system_prompt = f"""You are a culinary expert that creates detailed recipes based on titles. Format requirements:
         1. Generate a detailed recipe for the given title.
@@ -394,16 +636,19 @@ class RecipeGenerator:
         prompt = f"Create a detailed recipe for: {title}. Must be exactly {target_calories} calories per serving. Adjust ingredient amounts and serving size to achieve this exact calorie count."
         if healthy:
             prompt += " Make it healthy and nutritious while maintaining the exact target calorie count."
+        if allergies:
+            prompt += f" It must be completely free of: {', '.join(allergies)}. Substitute ingredients where the usual version of the dish contains them."
         
         try:
             response = self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
+                endpoint="recipes.single",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.7,
-                max_tokens=1500,
+                max_tokens=self.token_planner.max_tokens_for("recipe", 1),
                 top_p=0.8
             )
             
@@ -433,21 +678,21 @@ class RecipeGenerator:
             # Join sections with a double newline
             final_recipe = "\n\n".join(sections)
             
-            return final_recipe
+            safe = self._without_allergens([final_recipe], exclude_flags)
+            return safe[0] if safe else None
                 
         except Exception as e:
             print(f"Error generating recipe for '{title}': {str(e)}")
             return None
     
-    def _generate_recipes_with_openai(self, meal_type, healthy, allergies, count=5):
-        """Original method to generate recipes using OpenAI without predefined titles"""
+    def _build_recipe_prompts(self, meal_type, healthy, allergies, count, context=DEFAULT_CONTEXT):
+        """Build the system and user prompts for open-ended recipe generation"""
         # Get realistic calorie distribution if available
-        if hasattr(self, 'calories_per_day') and hasattr(self, 'target_meals_per_day'):
-            calorie_distribution = self._get_realistic_calorie_distribution(self.calories_per_day, count)
+        if context.has_daily_target:
+            calorie_distribution = self._calorie_targets(count, context)
             calorie_targets_text = "\n".join([f"Recipe {i+1}: {cal} calories" for i, cal in enumerate(calorie_distribution)])
         else:
-            calorie_distribution = [500] * count  # Default
-            calorie_targets_text = f"Each recipe: 500 calories"
+            calorie_targets_text = f"Each recipe: {context.default_recipe_calories} calories"
         
         system_prompt = f"""You are a culinary expert that creates diverse recipes quickly. These recipes should be very unique and outside the box for the most part. Format requirements:
         1. Generate exactly {count} different recipes with SPECIFIC calorie targets as provided
@@ -478,16 +723,61 @@ class RecipeGenerator:
             if "vegan" in allergies:
                 prompt += f" Ensure the meal is completely vegan and free these allergens or restrictions: {', '.join(allergies)}."
             prompt += f" Ensure they are completely free of these allergens or restrictions (example: vegan, vegetarian): {', '.join(allergies)}."
+        
+        return system_prompt, prompt
+
+    def _generate_recipes_with_openai(self, meal_type, healthy, allergies, count=5, context=DEFAULT_CONTEXT):
+        """Original method to generate recipes using OpenAI without predefined titles"""
+        chunks = self.token_planner.split("recipe", count)
+        themes = random.sample(self.DAY_THEMES, len(self.DAY_THEMES))
+        
+        def build_messages(chunk_index, chunk_count, exclude_titles=()):
+            system_prompt, prompt = self._build_recipe_prompts(meal_type, healthy, allergies, chunk_count, context)
+            if len(chunks) > 1:
+                # Chunks run in parallel and can't see each other, so steer each to its own cuisine
+                prompt += f" Lean toward {themes[chunk_index % len(themes)]} for this set."
+            if exclude_titles:
+                prompt += f" Make them different from: {', '.join(exclude_titles)}."
+            return [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ]
+        
+        return self._generate_recipe_chunks("recipes.open", chunks, build_messages)
 
+    def _generate_recipe_chunks(self, endpoint, chunks, build_messages):
+        """Run planner-sized recipe calls concurrently and concatenate their recipes, topping up any shortfall"""
+        count = sum(chunks)
+        if len(chunks) == 1:
+            recipes = self._generate_recipe_chunk(endpoint, build_messages(0, count), count)
+        else:
+            print(f"Splitting {count} recipes into {len(chunks)} parallel calls: {chunks}")
+            futures = [
+                self.batch_executor.submit(self._generate_recipe_chunk, endpoint, build_messages(i, chunk_count), chunk_count)
+                for i, chunk_count in enumerate(chunks)
+            ]
+            recipes = []
+            for future in futures:
+                recipes.extend(future.result())
+        
+        # Short or truncated completions: ask again for only the missing recipes
+        missing = count - len(recipes)
+        if missing > 0:
+            print(f"Got {len(recipes)}/{count} recipes, requesting {missing} more")
+            titles = [recipe.split('\n')[0] for recipe in recipes]
+            recipes.extend(self._generate_recipe_chunk(endpoint, build_messages(0, missing, titles), missing))
+        return recipes[:count]
+
+    def _generate_recipe_chunk(self, endpoint, messages, count):
+        """Generate one chunk of open-ended recipes with max_tokens sized by the planner"""
         try:
             response = self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
+                endpoint=endpoint,
+                messages=messages,
                 temperature=0.95,
-                max_tokens=2500,
+                cache=False,
+                max_tokens=self.token_planner.max_tokens_for("recipe", count),
                 top_p=0.85
             )
             
@@ -496,34 +786,26 @@ class RecipeGenerator:
             recipes = recipe_text.split("=====")
             recipes = [r.strip() for r in recipes if r.strip()]
             
-            # If we didn't get enough recipes, make a second call for the remainder
-            if len(recipes) < count:
-                remaining = count - len(recipes)
-                recipes_list = ', '.join([r.split('\n')[0] for r in recipes])
-                second_prompt = f"Create {remaining} more unique {meal_type} recipes, different from: {recipes_list}"
-                
-                second_response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": second_prompt}
-                    ],
-                    temperature=0.95,
-                    max_tokens=2000,
-                    top_p=0.85
-                )
-                
-                additional_recipes = second_response.choices[0].message.content.strip().split("=====")
-                recipes.extend([r.strip() for r in additional_recipes if r.strip()])
+            self._observe_usage("recipe", response, len(recipes))
+            if response.choices[0].finish_reason == "length" and recipes:
+                # The last recipe was cut off; the planner has now learned a larger size
+                print(f"Recipe chunk truncated at {len(recipes)}/{count} recipes, dropping the partial one")
+                recipes = recipes[:-1]
 
             return recipes[:count]
             
         except Exception as e:
             print(f"Error generating recipes: {str(e)}")
             return []
+
+    def _observe_usage(self, kind, response, items):
+        """Feed a response's completion token count into the token planner"""
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.token_planner.observe(kind, items, usage.completion_tokens)
         
-    def get_recipe_ingredients(self, ingredients, allergies, count=5):
-        # This method remains unchanged from the original
+    def _build_ingredient_prompts(self, ingredients, allergies, count):
+        """Build the system prompt template and user prompt for pantry-based recipes"""
         system_prompt = """You are a culinary expert that creates diverse recipes quickly. Format requirements:
         1. Generate exactly {count} different recipes
         . only generate recipes based on users available ingredients
@@ -551,56 +833,276 @@ class RecipeGenerator:
             if "vegan" in allergies:
                 prompt += f" Ensure the meal is completely vegan and free these allergens or restrictions: {', '.join(allergies)}."
             prompt += f" Ensure they are completely free of these allergens or restrctions(example:vegan, vegitarian): {', '.join(allergies)}."
+        
+        return system_prompt, prompt
 
+    def _match_pantry_recipes(self, ingredients, allergies, count):
+        """Stored recipes that best use the user's ingredients (structured), from the in-memory ingredient index"""
+        if self.ingredient_index is None or count <= 0:
+            return []
+        exclude_flags = restriction_mask(allergies or [])
+        if exclude_flags is None:
+            return []
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt.format(count=count)},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.95,
-                max_tokens=2500,
-                top_p = 0.85
-            )
-            
-            # Split response into individual recipes
-            recipe_text = response.choices[0].message.content.strip()
-            recipes = recipe_text.split("=====")
-            recipes = [r.strip() for r in recipes if r.strip()]
-            
-            # If we didn't get enough recipes, make a second call for the remainder
-            if len(recipes) < count:
-                remaining = count - len(recipes)
-                recipes_list = ', '.join([r.split('\n')[0] for r in recipes])
-                second_prompt = f"Create {remaining} more unique  recipes, based on available {ingredients} different from: {recipes_list}"
-                
-                second_response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": system_prompt.format(count=remaining)},
-                        {"role": "user", "content": second_prompt}
-                    ],
-                    temperature=0.95,
-                    max_tokens=2000,
-                    top_p = 0.85
+            matches = self.ingredient_index.search(ingredients, count, exclude_flags, self.pantry_max_missing)
+            recipes = self.recipe_corpus.find_by_ids([match.recipe_id for match in matches])
+        except sqlite3.Error as e:
+            print(f"Ingredient index read error: {str(e)}")
+            return []
+        if recipes:
+            print(f"Matched {len(recipes)} stored recipe(s) to the pantry")
+        return recipes
+
+    def get_recipe_ingredients(self, ingredients, allergies, count=5):
+        # Best stored matches first; the LLM only invents the rest
+        matched = self._match_pantry_recipes(ingredients, allergies, count)
+        served = [StoredRecipeText(render_recipe_text(recipe)) for recipe in matched]
+        if len(served) >= count:
+            return served
+        
+        chunks = self.token_planner.split("recipe", count - len(served))
+        
+        def build_messages(chunk_index, chunk_count, exclude_titles=()):
+            system_prompt, prompt = self._build_ingredient_prompts(ingredients, allergies, chunk_count)
+            if len(chunks) > 1:
+                prompt += f" This is set {chunk_index + 1} of {len(chunks)}; give it a distinct cooking style from the other sets."
+            exclude_titles = [recipe['title'] for recipe in matched] + list(exclude_titles)
+            if exclude_titles:
+                prompt += f" Do not reuse these titles: {', '.join(exclude_titles)}."
+            return [
+                {"role": "system", "content": system_prompt.format(count=chunk_count)},
+                {"role": "user", "content": prompt}
+            ]
+        
+        recipes = self._generate_recipe_chunks("recipes.ingredients", chunks, build_messages)
+        self._remember_recipes(recipes, "recipes.ingredients", "pantry", ingredients=ingredients, allergies=allergies)
+        return served + recipes
+    
+    def get_recipe_ideas_structured(self, meal_type, healthy, allergies, count=5, context=DEFAULT_CONTEXT):
+        """Generate recipes as validated JSON objects (see recipe_schema) instead of "=====" separated text"""
+        if context.has_daily_target:
+            calorie_targets = self._calorie_targets(count, context)
+        else:
+            calorie_targets = [context.default_recipe_calories] * count
+        
+        def build_prompt(chunk_targets, exclude_titles):
+            _, prompt = self._build_recipe_prompts(meal_type, healthy, allergies, len(chunk_targets), context)
+            targets_text = ", ".join(f"recipe {i + 1}: {cal} calories" for i, cal in enumerate(chunk_targets))
+            prompt += f" Calorie targets: {targets_text}."
+            if exclude_titles:
+                prompt += f" Do not reuse these titles: {', '.join(exclude_titles)}."
+            return prompt
+        
+        recipes = self._generate_structured_recipes("recipes.json", calorie_targets, build_prompt)
+        self._remember_recipes(recipes, "recipes.json", meal_type, healthy, allergies=allergies, calories_per_day=context.calories_per_day)
+        return recipes
+
+    def get_recipe_ingredients_structured(self, ingredients, allergies, count=5):
+        """Pantry-based recipes as validated JSON objects"""
+        matched = self._match_pantry_recipes(ingredients, allergies, count)
+        if len(matched) >= count:
+            return matched
+        
+        def build_prompt(chunk_targets, exclude_titles):
+            _, prompt = self._build_ingredient_prompts(ingredients, allergies, len(chunk_targets))
+            exclude_titles = [recipe["title"] for recipe in matched] + list(exclude_titles)
+            if exclude_titles:
+                prompt += f" Do not reuse these titles: {', '.join(exclude_titles)}."
+            return prompt
+        
+        recipes = self._generate_structured_recipes("recipes.ingredients.json", [None] * (count - len(matched)), build_prompt)
+        self._remember_recipes(recipes, "recipes.ingredients.json", "pantry", ingredients=ingredients, allergies=allergies)
+        return matched + recipes
+
+    def _generate_structured_recipes(self, endpoint, calorie_targets, build_prompt):
+        """Generate one JSON recipe per calorie target, regenerating only the items that fail validation"""
+        count = len(calorie_targets)
+        chunks = self.token_planner.split("recipe_json", count)
+        chunk_targets = []
+        offset = 0
+        for chunk_count in chunks:
+            chunk_targets.append(calorie_targets[offset:offset + chunk_count])
+            offset += chunk_count
+        
+        def generate_chunk(targets, exclude_titles=()):
+            system_prompt = self._structured_system_prompt("recipes", len(targets))
+            try:
+                items = self._request_structured_items(
+                    endpoint, system_prompt, build_prompt(targets, exclude_titles),
+                    "recipes", "recipe_json", len(targets), temperature=0.95
                 )
-                
-                additional_recipes = second_response.choices[0].message.content.strip().split("=====")
-                recipes.extend([r.strip() for r in additional_recipes if r.strip()])
+            except Exception as e:
+                print(f"Error generating structured recipes: {str(e)}")
+                return []
+            repaired = [repair_recipe(item, target) for item, target in zip(items, targets)]
+            if len(repaired) < len(targets) or None in repaired:
+                print(f"Structured recipes: {sum(r is not None for r in repaired)}/{len(targets)} usable, rest will be regenerated")
+            return [recipe for recipe in repaired if recipe is not None]
+        
+        results = list(self.batch_executor.map(generate_chunk, chunk_targets))
+        recipes = [recipe for chunk in results for recipe in chunk]
+        
+        # Only the missing items are asked for again, never the whole batch
+        missing = count - len(recipes)
+        if missing > 0:
+            print(f"Regenerating {missing} invalid structured recipe(s)")
+            recipes.extend(generate_chunk(calorie_targets[len(recipes):], [r["title"] for r in recipes]))
+        
+        return recipes[:count]
+
+    def _structured_system_prompt(self, key, count, extra=""):
+        """System prompt asking for a JSON object holding count recipe items under key"""
+        return f"""You are a culinary expert that creates diverse, creative recipes.
+        Respond with a JSON object of the form {{"{key}": [...]}} containing EXACTLY {count} items.
+        Every item must follow this schema:
+        {RECIPE_JSON_FORMAT}
+        {extra}
+        Rules:
+        - Titles are unique and descriptive, without the word "recipe" or any symbols
+        - Ingredients include precise amounts; instructions are specific and leave nothing out
+        - Instructions are plain sentences without numbering
+        - Nutrition is per serving using United States standards
+        - Never repeat recipe ideas, cuisines or cooking methods within the response
+        - Output only the JSON object"""
+
+    def _request_structured_items(self, endpoint, system_prompt, prompt, key, kind, count, temperature=0.8, cache=False):
+        """Make one JSON-mode completion and return the raw item objects stored under key"""
+        response = self.client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            endpoint=endpoint,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"},
+            temperature=temperature,
+            cache=cache,
+            max_tokens=self.token_planner.max_tokens_for(kind, count),
+            timeout=90
+        )
+        
+        # Damaged JSON (e.g. a truncated last item) still yields the complete items before it
+        items = parse_items(response.choices[0].message.content, key)
+        self._observe_usage(kind, response, len(items))
+        return items
+
+    def stream_recipe_ideas(self, meal_type, healthy, allergies, count=5, context=DEFAULT_CONTEXT):
+        """Yield finished recipes one at a time for the /api/recipes stream"""
+        if not self._uses_open_generation(meal_type, allergies):
+            # Database path already runs its batches concurrently; hand back the result as it is
+            for recipe in self.get_recipe_ideas(meal_type, healthy, allergies, count, context):
+                yield recipe
+            return
+        
+        system_prompt, prompt = self._build_recipe_prompts(meal_type, healthy, allergies, count, context)
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        for recipe in self._stream_recipes_with_top_up(
+            messages, count,
+            lambda remaining, previous: [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"Create {remaining} more unique {meal_type} recipes, different from: {previous}"}
+            ]
+        ):
+            self._remember_recipes([recipe], "recipes.stream", meal_type, healthy, allergies=allergies, calories_per_day=context.calories_per_day)
+            yield recipe
+
+    def stream_recipe_ingredients(self, ingredients, allergies, count=5):
+        """Yield finished pantry-based recipes one at a time (stored matches first)"""
+        matched = self._match_pantry_recipes(ingredients, allergies, count)
+        for recipe in matched:
+            yield StoredRecipeText(render_recipe_text(recipe))
+        count -= len(matched)
+        if count <= 0:
+            return
+        
+        system_prompt, prompt = self._build_ingredient_prompts(ingredients, allergies, count)
+        if matched:
+            prompt += f" Do not reuse these titles: {', '.join(recipe['title'] for recipe in matched)}."
+        messages = [
+            {"role": "system", "content": system_prompt.format(count=count)},
+            {"role": "user", "content": prompt}
+        ]
+        for recipe in self._stream_recipes_with_top_up(
+            messages, count,
+            lambda remaining, previous: [
+                {"role": "system", "content": system_prompt.format(count=remaining)},
+                {"role": "user", "content": f"Create {remaining} more unique  recipes, based on available {ingredients} different from: {previous}"}
+            ]
+        ):
+            self._remember_recipes([recipe], "recipes.stream", "pantry", ingredients=ingredients, allergies=allergies)
+            yield recipe
 
-            return recipes[:count]
+    def _stream_recipes_with_top_up(self, messages, count, top_up_messages):
+        """Stream recipes from one completion and, if it comes up short, from a second one"""
+        titles = []
+        try:
+            for recipe in self._stream_recipe_completion(messages, max_tokens=self.token_planner.max_tokens_for("recipe", count)):
+                titles.append(recipe.split('\n')[0])
+                yield recipe
+                if len(titles) >= count:
+                    return
             
+            if len(titles) < count:
+                remaining = count - len(titles)
+                top_up = top_up_messages(remaining, ', '.join(titles))
+                for recipe in self._stream_recipe_completion(top_up, max_tokens=self.token_planner.max_tokens_for("recipe", remaining)):
+                    titles.append(recipe.split('\n')[0])
+                    yield recipe
+                    if len(titles) >= count:
+                        return
+                        
         except Exception as e:
-            print(f"Error generating recipes: {str(e)}")
-            return []
-    
-    def generate_meal_plan(self, days, meals_per_day, healthy=False, allergies=None, preferences=None, calories_per_day=2000):
-        """Simple, reliable meal plan generation with realistic calorie distribution"""
+            print(f"Error streaming recipes: {str(e)}")
+
+    def _stream_recipe_completion(self, messages, max_tokens):
+        """Stream a completion and yield each recipe as soon as its ===== separator arrives"""
+        stream = self.client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            endpoint="recipes.stream",
+            messages=messages,
+            temperature=0.95,
+            max_tokens=max_tokens,
+            top_p=0.85,
+            stream=True
+        )
+        
+        buffer = ""
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                buffer += chunk.choices[0].delta.content or ""
+                
+                while "=====" in buffer:
+                    recipe, buffer = buffer.split("=====", 1)
+                    buffer = buffer.lstrip("=")
+                    if recipe.strip():
+                        yield self._ensure_recipe_formatting(recipe.strip())
+        finally:
+            # Stop the upstream request if the consumer stops early
+            if hasattr(stream, "close"):
+                stream.close()
         
-        # Store calories for use in recipe generation
-        self.calories_per_day = calories_per_day
-        self.target_meals_per_day = meals_per_day
+        if buffer.strip():
+            yield self._ensure_recipe_formatting(buffer.strip())
+
+    def generate_meal_plan(self, days, meals_per_day, healthy=False, allergies=None, preferences=None, calories_per_day=2000, parallel=None, plan_key=None):
+        """Simple, reliable meal plan generation with realistic calorie distribution.
+        
+        With a plan_key, finished days are checkpointed and a repeated call with
+        the same key resumes from them instead of generating the plan again.
+        """
+        
+        if parallel is None:
+            parallel = self.parallel_days
+        
+        checkpoint = self._open_checkpoint(plan_key, days, meals_per_day, healthy, allergies, preferences, calories_per_day)
+        if checkpoint and len(checkpoint) == days and not any(day["fallback"] for day in checkpoint.values()):
+            print(f"Meal plan {plan_key} already complete, returning checkpointed days")
+            return "\n\n".join(checkpoint[day_num]["text"] for day_num in range(1, days + 1))
         
         # Calculate realistic calorie distribution
         daily_calorie_distribution = self._get_realistic_calorie_distribution(calories_per_day, meals_per_day)
@@ -623,11 +1125,24 @@ class RecipeGenerator:
         ]
 
         inspiration = random.choice(random_themes)
+        
+        # A resumed plan only generates its missing days
+        if checkpoint:
+            print(f"Resuming meal plan {plan_key} with {sum(not day['fallback'] for day in checkpoint.values())}/{days} days done")
+            return self._generate_day_by_day_realistic(days, meals_per_day, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, inspiration, parallel, plan_key)
+        
+        # Stored recipes cover the plan (the LLM only fills the gaps) once the corpus is warm
+        assembled = self._assemble_meal_plan(days, meals_per_day, healthy, allergies, preferences, daily_calorie_distribution)
+        if assembled is not None:
+            plan_text = self.render_meal_plan_text(assembled)
+            self._checkpoint_plan(plan_key, plan_text)
+            return plan_text
+        
         print(f"Meal Plan Inspiration: {inspiration}")
         
-        # For larger plans, generate day by day for reliability
-        if days > 3 or (days * meals_per_day) > 9:
-            return self._generate_day_by_day_realistic(days, meals_per_day, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, inspiration)
+        # Larger plans go day by day for reliability; a token budget with room for more meals can raise the 9-meal limit
+        if days > 3 or days * meals_per_day > max(9, self.token_planner.max_items_per_call("meal")):
+            return self._generate_day_by_day_realistic(days, meals_per_day, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, inspiration, parallel, plan_key)
         
         # For small plans, try full generation with retries
         max_retries = 3
@@ -638,20 +1153,244 @@ class RecipeGenerator:
                 
                 if self._validate_plan_simple(result, days, meals_per_day):
                     print("✅ Full plan generation successful")
+                    self._remember_meal_plan(result, "mealplan.full", healthy, allergies=allergies, preferences=preferences)
+                    self._checkpoint_plan(plan_key, result)
                     return result
                 else:
                     print(f"❌ Attempt {attempt + 1} failed validation")
-                    if attempt < max_retries - 1:
-                        sleep(2)
                         
             except Exception as e:
+                # Transient API errors were already retried with backoff by the client wrapper
                 print(f"❌ Attempt {attempt + 1} error: {str(e)}")
-                if attempt < max_retries - 1:
-                    sleep(2)
         
         # If full plan fails, fallback to day-by-day
         print("🔄 Full plan failed, switching to day-by-day generation")
-        return self._generate_day_by_day_realistic(days, meals_per_day, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, inspiration)
+        return self._generate_day_by_day_realistic(days, meals_per_day, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, inspiration, parallel, plan_key)
+
+    def generate_meal_plan_stream(self, days, meals_per_day, healthy=False, allergies=None, preferences=None, calories_per_day=2000, plan_key=None):
+        """Yield (event, data) pairs while a meal plan is generated day by day (resuming plan_key's checkpoint)"""
+        
+        daily_calorie_distribution = self._get_realistic_calorie_distribution(calories_per_day, meals_per_day)
+        print(f"Streaming {days}-day meal plan, daily calorie distribution: {daily_calorie_distribution}")
+        
+        yield "progress", {"completed_days": 0, "total_days": days}
+        
+        checkpoint = self._open_checkpoint(plan_key, days, meals_per_day, healthy, allergies, preferences, calories_per_day)
+        assembled = None if checkpoint else self._assemble_meal_plan(days, meals_per_day, healthy, allergies, preferences, daily_calorie_distribution)
+        if assembled is not None:
+            self._checkpoint_plan(plan_key, self.render_meal_plan_text(assembled))
+            day_texts = ((day["day"], self.render_meal_plan_text({"days": [day]})) for day in assembled["days"])
+        else:
+            day_texts = self._iter_days_realistic(days, meals_per_day, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, plan_key)
+        
+        all_days = []
+        for day_num, day_text in day_texts:
+            all_days.append(day_text)
+            yield "day", {"day": day_num, "content": day_text}
+            yield "progress", {"completed_days": day_num, "total_days": days}
+        
+        yield "done", {"meal_plan": "\n\n".join(all_days)}
+
+    def generate_meal_plan_structured(self, days, meals_per_day, healthy=False, allergies=None, preferences=None, calories_per_day=2000):
+        """Generate a meal plan as JSON days, regenerating individual meals instead of whole plans"""
+        
+        daily_calorie_distribution = self._get_realistic_calorie_distribution(calories_per_day, meals_per_day)
+        meal_types = ['Breakfast', 'Lunch', 'Dinner', 'Snack'][:meals_per_day]
+        
+        assembled = self._assemble_meal_plan(days, meals_per_day, healthy, allergies, preferences, daily_calorie_distribution)
+        if assembled is not None:
+            return assembled
+        
+        themes = random.sample(self.DAY_THEMES, len(self.DAY_THEMES))
+        day_themes = {day_num: themes[(day_num - 1) % len(themes)] for day_num in range(1, days + 1)}
+        
+        print(f"Generating structured {days}-day meal plan, daily calorie distribution: {daily_calorie_distribution}")
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_days) as executor:
+            futures = {
+                day_num: executor.submit(
+                    self._generate_structured_day, day_num, meal_types, daily_calorie_distribution,
+                    healthy, allergies, preferences, day_themes[day_num]
+                )
+                for day_num in range(1, days + 1)
+            }
+            all_days = [futures[day_num].result() for day_num in range(1, days + 1)]
+        
+        # Repair per meal: invalid or duplicate meals are regenerated one at a time
+        used_titles = set()
+        plan_days = []
+        for day_num, meals in enumerate(all_days, start=1):
+            for i, meal_type in enumerate(meal_types):
+                meal = meals[i]
+                if meal is None or meal["title"].lower() in used_titles:
+                    print(f"Day {day_num} {meal_type} invalid or duplicate, regenerating that meal")
+                    meal = (self._generate_structured_meal(meal_type, daily_calorie_distribution[i], healthy, allergies, preferences, day_themes[day_num], used_titles)
+                            or self._basic_structured_meal(day_num, meal_type, daily_calorie_distribution[i]))
+                    meals[i] = meal
+                used_titles.add(meal["title"].lower())
+            plan_days.append({
+                "day": day_num,
+                "meals": [dict(meal, meal_type=meal_type) for meal, meal_type in zip(meals, meal_types)]
+            })
+        
+        return {"days": plan_days}
+
+    def _assemble_meal_plan(self, days, meals_per_day, healthy, allergies, preferences, daily_calorie_distribution):
+        """Structured plan built from stored recipes, generating only the uncovered meals.
+
+        Returns None (so the caller generates the plan as before) when the
+        corpus is unavailable, a restriction cannot be checked against the
+        allergen flags, or too many slots would still need the LLM.
+        """
+        if self.meal_plan_solver is None or not self.corpus_serving:
+            return None
+        exclude_flags = self._meal_plan_exclude_flags(allergies, preferences)
+        if exclude_flags is None:
+            return None
+        
+        meal_types = ['Breakfast', 'Lunch', 'Dinner', 'Snack'][:meals_per_day]
+        try:
+            grid = self.meal_plan_solver.solve(days, meal_types, daily_calorie_distribution, exclude_flags, healthy, preferences)
+        except sqlite3.Error as e:
+            print(f"Meal plan assembly error: {str(e)}")
+            return None
+        
+        # Chosen meals are within the solver's tolerance; rescaling makes them hit their targets exactly
+        grid = [
+            [(scale_to_calories(meal, daily_calorie_distribution[i]) or meal) if meal else None for i, meal in enumerate(meals)]
+            for meals in grid
+        ]
+        missing = [(day_index, i) for day_index, meals in enumerate(grid) for i, meal in enumerate(meals) if meal is None]
+        if len(missing) > days * len(meal_types) * self.max_generated_share:
+            print(f"Stored recipes cover {days * len(meal_types) - len(missing)}/{days * len(meal_types)} meals, generating the plan")
+            return None
+        
+        used_titles = {meal["title"].lower() for meals in grid for meal in meals if meal}
+        if missing:
+            print(f"Generating {len(missing)} meal(s) the stored recipes don't cover")
+            with ThreadPoolExecutor(max_workers=self.max_concurrent_days) as executor:
+                futures = {
+                    slot: executor.submit(
+                        self._generate_structured_meal, meal_types[slot[1]], daily_calorie_distribution[slot[1]],
+                        healthy, allergies, preferences, random.choice(self.DAY_THEMES), frozenset(used_titles)
+                    )
+                    for slot in missing
+                }
+                for (day_index, i), future in futures.items():
+                    meal = future.result()
+                    if meal is None or meal["title"].lower() in used_titles:
+                        # Concurrent fills can collide; one sequential retry with the full exclusion list
+                        meal = self._generate_structured_meal(meal_types[i], daily_calorie_distribution[i], healthy, allergies, preferences, exclude_titles=used_titles)
+                    if meal is None:
+                        return None
+                    grid[day_index][i] = meal
+                    used_titles.add(meal["title"].lower())
+        
+        print(f"✅ Assembled {days}-day meal plan from stored recipes ({len(missing)} generated)")
+        return {
+            "days": [
+                {"day": day_index + 1, "meals": [dict(meal, meal_type=meal_type) for meal, meal_type in zip(meals, meal_types)]}
+                for day_index, meals in enumerate(grid)
+            ]
+        }
+
+    def _meal_plan_exclude_flags(self, allergies, preferences):
+        """Allergen flags stored meals must not have, or None if an allergy can't be checked against them"""
+        exclude_flags = restriction_mask(allergies or [])
+        if exclude_flags is None:
+            return None
+        # Diet-style preferences (vegetarian, dairy free, ...) are hard constraints as well
+        if isinstance(preferences, str):
+            preferences = [preferences]
+        for preference in preferences or []:
+            exclude_flags |= restriction_mask([preference]) or 0
+        return exclude_flags
+
+    def render_meal_plan_text(self, plan):
+        """Render a structured meal plan in the legacy "Day N" / "=====" text format"""
+        return "\n\n".join(
+            self._join_day_meals(f"Day {day['day']}", [render_meal_text(meal, meal["meal_type"]) for meal in day["meals"]])
+            for day in plan["days"]
+        )
+
+    def _structured_meal_prompt(self, meal_types, calorie_targets, healthy, allergies, preferences, theme=None, exclude_titles=None):
+        """User prompt shared by structured day and single meal generation"""
+        targets_text = ", ".join(f"{meal_type}: {cal} calories" for meal_type, cal in zip(meal_types, calorie_targets))
+        prompt = f"Generate {len(meal_types)} unique meal(s) in this order with these exact calorie targets: {targets_text}."
+        if theme:
+            prompt += f" Theme: {theme}."
+        if healthy:
+            prompt += " Make all meals healthy and nutritious while maintaining exact calorie targets."
+        if allergies:
+            allergies_list = ', '.join(allergies) if isinstance(allergies, list) else allergies
+            prompt += f" Avoid these allergens: {allergies_list}."
+        if preferences:
+            preferences_list = ', '.join(preferences) if isinstance(preferences, list) else preferences
+            prompt += f" Consider preferences: {preferences_list}."
+        if exclude_titles:
+            prompt += f" Never use these recipe titles or similar variations: {', '.join(list(exclude_titles)[:20])}."
+        return prompt
+
+    def _generate_structured_day(self, day_num, meal_types, daily_calorie_distribution, healthy, allergies, preferences, theme):
+        """One JSON call for a day's meals; returns a list aligned with meal_types, None where a meal is unusable"""
+        system_prompt = self._structured_system_prompt(
+            "meals", len(meal_types),
+            extra='Each item also has a "meal_type" field. Adjust portions so every meal hits its exact calorie target.'
+        )
+        prompt = self._structured_meal_prompt(meal_types, daily_calorie_distribution, healthy, allergies, preferences, theme)
+        try:
+            items = self._request_structured_items("mealplan.day.json", system_prompt, prompt, "meals", "meal_json", len(meal_types))
+        except Exception as e:
+            print(f"Day {day_num} structured generation error: {e}")
+            return [None] * len(meal_types)
+        
+        # Match meals to slots by their meal_type, falling back to response order
+        by_type = {}
+        for item in items:
+            meal_type = str(item.get("meal_type", "")).strip().lower()
+            by_type.setdefault(meal_type, item)
+        meals = []
+        for i, meal_type in enumerate(meal_types):
+            item = by_type.get(meal_type.lower()) or (items[i] if i < len(items) else None)
+            meals.append(repair_recipe(item, daily_calorie_distribution[i]) if item else None)
+        for meal_type, meal in zip(meal_types, meals):
+            if meal:
+                self._remember_recipes([meal], "mealplan.day.json", meal_type, healthy, allergies=allergies, preferences=preferences, theme=theme)
+        return meals
+
+    def _generate_structured_meal(self, meal_type, target_calories, healthy, allergies, preferences, theme=None, exclude_titles=None):
+        """Generate one replacement meal as a validated JSON object, or None"""
+        system_prompt = self._structured_system_prompt("meals", 1, extra=f"The meal is a {meal_type.lower()}.")
+        prompt = self._structured_meal_prompt([meal_type], [target_calories], healthy, allergies, preferences, theme, exclude_titles)
+        try:
+            items = self._request_structured_items("mealplan.meal.json", system_prompt, prompt, "meals", "meal_json", 1)
+        except Exception as e:
+            print(f"Error generating replacement {meal_type}: {e}")
+            return None
+        
+        meal = repair_recipe(items[0], target_calories) if items else None
+        if meal and exclude_titles and meal["title"].lower() in exclude_titles:
+            return None
+        if meal:
+            self._remember_recipes([meal], "mealplan.meal.json", meal_type, healthy, allergies=allergies, preferences=preferences, theme=theme)
+        return meal
+
+    def _basic_structured_meal(self, day_num, meal_type, target_calories):
+        """Structured counterpart of the fallback meals in _create_realistic_basic_day"""
+        return repair_recipe({
+            "title": f"Healthy {meal_type} #{day_num}",
+            "ingredients": [
+                f"High-quality protein source (portioned for {target_calories} calories)",
+                "Fresh seasonal vegetables",
+                "Healthy whole grains",
+                "Nutritious fats and oils",
+            ],
+            "instructions": [
+                "Prepare all ingredients according to preferences",
+                "Cook using healthy cooking methods",
+                "Season with herbs and spices",
+                "Serve fresh and enjoy",
+            ],
+        }, target_calories)
 
     def _generate_full_plan_realistic(self, days, meals_per_day, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, inspiration):
         """Generate complete meal plan with realistic calorie distribution"""
@@ -741,17 +1480,19 @@ class RecipeGenerator:
             prompt += f" Consider preferences: {preferences_list}."
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
+            return self._create_meal_plan_completion(
+                "mealplan.full",
+                [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.8,
-                max_tokens=4000,
-                timeout=120
+                days * meals_per_day,
+                timeout=120,
+                validator=MealPlanStreamValidator.for_plan(days, meals_per_day)
             )
-            return response.choices[0].message.content.strip()
+        except StreamRejected as e:
+            print(f"Full plan stream aborted early: {e.reason}")
+            return None
         except Exception as e:
             print(f"Full plan generation error: {e}")
             return None
@@ -769,38 +1510,347 @@ class RecipeGenerator:
         
         return "\n".join(result)
 
-    def _generate_day_by_day_realistic(self, days, meals_per_day, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, inspiration):
+    def _generate_day_by_day_realistic(self, days, meals_per_day, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, inspiration, parallel=False, plan_key=None):
         """Generate meal plan one day at a time with realistic calorie distribution"""
         
-        all_days = []
-        used_titles = set()
+        if parallel and days > 1:
+            return self._generate_days_parallel(days, meals_per_day, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, plan_key)
+        
+        all_days = [
+            day_text for _, day_text in
+            self._iter_days_realistic(days, meals_per_day, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, plan_key)
+        ]
+        return "\n\n".join(all_days)
+
+    def _iter_days_realistic(self, days, meals_per_day, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, plan_key=None):
+        """Yield (day_num, day_text) for each day in order as soon as it is generated or restored from the checkpoint"""
+        completed, used_titles = self._load_checkpoint(plan_key)
         meal_types = ['Breakfast', 'Lunch', 'Dinner', 'Snack'][:meals_per_day]
         
         for day_num in range(1, days + 1):
+            if day_num in completed:
+                print(f"Day {day_num} restored from checkpoint")
+                yield day_num, completed[day_num]
+                continue
+            
             print(f"Generating Day {day_num}...")
+            day_text = self._generate_day_with_retries(day_num, meal_types, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, used_titles, allow_fallback=False)
+            fallback = day_text is None
+            if fallback:
+                print(f"⚠️ Creating basic day {day_num} with realistic calories")
+                day_text = self._create_realistic_basic_day(day_num, meal_types, daily_calorie_distribution, used_titles)
             
-            for attempt in range(3):
-                try:
-                    # Create more specific themes for variety
-                    themes = [
-                        f"Mediterranean flavors", f"Asian fusion", f"Mexican cuisine",
-                        f"Italian classics", f"American comfort", f"Indian spices",
-                        f"Middle Eastern", f"Thai flavors", f"French bistro", f"Greek healthy"
-                    ]
-                    theme = random.choice(themes)
-                    
-                    # Build a stronger exclusion list
-                    exclusion_text = ""
-                    if used_titles:
-                        exclusion_text = f"NEVER use these recipe titles or similar variations: {', '.join(list(used_titles)[:10])}. "
-                    
-                    # Format calorie targets for this day
-                    calorie_targets_text = "\n".join([
-                        f"{meal_types[i]}: EXACTLY {daily_calorie_distribution[i]} calories"
-                        for i in range(meals_per_day)
-                    ])
+            # Add titles to used set so later days avoid them
+            used_titles.update(self._extract_titles_simple(day_text))
+            self._save_checkpoint_day(plan_key, day_num, day_text, used_titles, fallback)
+            yield day_num, day_text
+
+    def _open_checkpoint(self, plan_key, days, meals_per_day, healthy, allergies, preferences, calories_per_day):
+        """Register plan_key with its parameters and return its saved days (empty for a new plan, None without a key)"""
+        if not plan_key or self.plan_checkpoints is None:
+            return None
+        params = {
+            "days": days,
+            "meals_per_day": meals_per_day,
+            "healthy": bool(healthy),
+            "allergies": sorted(allergies or []),
+            "preferences": sorted(preferences or []),
+            "calories_per_day": calories_per_day,
+        }
+        try:
+            # Mismatched parameters raise ValueError: the key belongs to a different plan
+            self.plan_checkpoints.open(plan_key, params)
+            return self.plan_checkpoints.days(plan_key)
+        except sqlite3.Error as e:
+            print(f"Meal plan checkpoint unavailable for {plan_key}: {str(e)}")
+            return None
+
+    def _load_checkpoint(self, plan_key):
+        """(day_num -> text for every validated checkpointed day, titles those days used)"""
+        if not plan_key or self.plan_checkpoints is None:
+            return {}, set()
+        try:
+            saved_days = self.plan_checkpoints.days(plan_key)
+        except sqlite3.Error as e:
+            print(f"Could not read checkpoint {plan_key}: {str(e)}")
+            return {}, set()
+        completed = {}
+        used_titles = set()
+        for day_num, day in saved_days.items():
+            # Fallback days are generated again on resume
+            if not day["fallback"]:
+                completed[day_num] = day["text"]
+                used_titles.update(day["used_titles"])
+        return completed, used_titles
+
+    def _save_checkpoint_day(self, plan_key, day_num, day_text, used_titles, fallback=False):
+        if not plan_key or self.plan_checkpoints is None:
+            return
+        try:
+            self.plan_checkpoints.save_day(plan_key, day_num, day_text, used_titles, fallback)
+        except sqlite3.Error as e:
+            print(f"Could not checkpoint day {day_num} of {plan_key}: {str(e)}")
+
+    def _checkpoint_plan(self, plan_key, plan_text):
+        """Checkpoint every day of a plan produced in one piece"""
+        if not plan_key:
+            return
+        used_titles = set()
+        day_texts = [day_text.strip() for day_text in re.split(r'(?im)^(?=day\s+\d+\s*$)', plan_text) if day_text.strip()]
+        for day_num, day_text in enumerate(day_texts, start=1):
+            used_titles.update(self._extract_titles_simple(day_text))
+            self._save_checkpoint_day(plan_key, day_num, day_text, used_titles)
+
+    def regenerate_plan_day(self, plan_key, day_num):
+        """Generate one checkpointed day again (e.g. a fallback day), avoiding every other day's titles.
+        
+        Returns the updated full plan text.
+        """
+        params = self.plan_checkpoints.params(plan_key) if self.plan_checkpoints else None
+        if params is None:
+            raise KeyError(plan_key)
+        if not 1 <= day_num <= params["days"]:
+            raise ValueError(f"day must be between 1 and {params['days']}")
+        
+        saved_days = self.plan_checkpoints.days(plan_key)
+        used_titles = set()
+        for other_day, day in saved_days.items():
+            if other_day != day_num:
+                used_titles.update(self._extract_titles_simple(day["text"]))
+        
+        meal_types = ['Breakfast', 'Lunch', 'Dinner', 'Snack'][:params["meals_per_day"]]
+        daily_calorie_distribution = self._get_realistic_calorie_distribution(params["calories_per_day"], params["meals_per_day"])
+        day_text = self._generate_day_with_retries(
+            day_num, meal_types, params["healthy"], params["allergies"], params["preferences"],
+            params["calories_per_day"], daily_calorie_distribution, used_titles, allow_fallback=False
+        )
+        if day_text is None:
+            raise RuntimeError(f"Day {day_num} could not be generated")
+        
+        used_titles.update(self._extract_titles_simple(day_text))
+        self._save_checkpoint_day(plan_key, day_num, day_text, used_titles)
+        saved_days[day_num] = {"text": day_text, "fallback": False}
+        return "\n\n".join(saved_days[n]["text"] for n in sorted(saved_days))
+
+    def regenerate_plan_meal(self, day_num, meal, meal_plan=None, plan_key=None, calories_per_day=2000, healthy=False, allergies=None, preferences=None):
+        """Replace one meal of an existing plan, leaving every other meal as it is.
+        
+        meal is the 1-based slot number or its meal type ("lunch"). The plan is
+        either passed as text or loaded (with its parameters) from plan_key's
+        checkpoint, which is then updated. The replacement keeps the slot's
+        calorie target and avoids every title already in the plan; a stored
+        recipe is used when one fits, otherwise a single meal is generated.
+        
+        Returns (patched plan text, original plan text, new meal block).
+        """
+        saved_days = None
+        if meal_plan is None:
+            params = self.plan_checkpoints.params(plan_key) if plan_key and self.plan_checkpoints else None
+            if params is None:
+                raise KeyError(plan_key)
+            saved_days = self.plan_checkpoints.days(plan_key)
+            meal_plan = "\n\n".join(saved_days[n]["text"] for n in sorted(saved_days))
+            calories_per_day, healthy = params["calories_per_day"], params["healthy"]
+            allergies, preferences = params["allergies"], params["preferences"]
+        
+        # Splitting on a lookahead keeps every separator, so untouched days come back byte for byte
+        parts = re.split(r'(?im)^(?=day\s+\d+\s*$)', meal_plan)
+        day_index = next((i for i, part in enumerate(parts) if self._split_day_meals(part)[0].lower() == f"day {day_num}"), None)
+        if day_index is None:
+            raise ValueError(f"The meal plan has no Day {day_num}")
+        header, meal_blocks = self._split_day_meals(parts[day_index])
+        
+        meal_types = [block.split('\n', 1)[0].strip().rstrip(':') for block in meal_blocks]
+        if isinstance(meal, int) or str(meal).strip().isdigit():
+            slot = int(meal) - 1
+        else:
+            slot = next((i for i, meal_type in enumerate(meal_types) if meal_type.lower() == str(meal).strip().lower()), -1)
+        if not 0 <= slot < len(meal_blocks):
+            raise ValueError(f"meal must be 1-{len(meal_blocks)} or one of {', '.join(meal_types)}")
+        
+        meal_type = meal_types[slot]
+        target_calories = self._get_realistic_calorie_distribution(calories_per_day, len(meal_blocks))[slot]
+        used_titles = set(self._extract_titles_simple(meal_plan))
+        print(f"Replacing Day {day_num} {meal_type} ({target_calories} calories)")
+        
+        replacement = self._stored_plan_meal(meal_type, target_calories, healthy, allergies, preferences, used_titles)
+        if replacement is None:
+            replacement = self._generate_single_meal(
+                meal_type, target_calories, healthy, allergies, preferences, random.choice(self.DAY_THEMES), used_titles
+            )
+            new_titles = self._extract_titles_simple(replacement) if replacement else []
+            if new_titles and new_titles[0] in used_titles:
+                replacement = None
+        if replacement is None:
+            raise RuntimeError(f"No replacement {meal_type.lower()} could be generated for Day {day_num}")
+        
+        meal_blocks[slot] = replacement
+        day_text = self._join_day_meals(header, meal_blocks)
+        trailing = parts[day_index][len(parts[day_index].rstrip()):]
+        parts[day_index] = day_text + trailing
+        
+        if saved_days is not None:
+            used_titles.update(self._extract_titles_simple(replacement))
+            self._save_checkpoint_day(plan_key, day_num, day_text, used_titles, saved_days[day_num]["fallback"])
+        return "".join(parts), meal_plan, replacement
+
+    def _stored_plan_meal(self, meal_type, target_calories, healthy, allergies, preferences, exclude_titles):
+        """A stored recipe for one plan slot, rescaled and rendered as a meal block, or None"""
+        if self.meal_plan_solver is None or not self.corpus_serving:
+            return None
+        exclude_flags = self._meal_plan_exclude_flags(allergies, preferences)
+        if exclude_flags is None:
+            return None
+        try:
+            meal = self.meal_plan_solver.solve(1, [meal_type], [target_calories], exclude_flags, healthy, preferences, exclude_titles)[0][0]
+        except sqlite3.Error as e:
+            print(f"Stored meal lookup error: {str(e)}")
+            return None
+        if meal is None:
+            return None
+        return render_meal_text(scale_to_calories(meal, target_calories) or meal, meal_type)
+
+    def _generate_days_parallel(self, days, meals_per_day, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, plan_key=None):
+        """Generate all days concurrently with distinct themes, then repair duplicate meals"""
+        
+        meal_types = ['Breakfast', 'Lunch', 'Dinner', 'Snack'][:meals_per_day]
+        completed, _ = self._load_checkpoint(plan_key)
+        
+        # Pre-assign each day its own theme so parallel days don't converge on the same dishes
+        themes = random.sample(self.DAY_THEMES, len(self.DAY_THEMES))
+        day_themes = {day_num: themes[(day_num - 1) % len(themes)] for day_num in range(1, days + 1)}
+        
+        print(f"Generating {days} days in parallel (max {self.max_concurrent_days} at once)")
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_days) as executor:
+            futures = {
+                day_num: executor.submit(
+                    self._generate_day_with_retries, day_num, meal_types, healthy, allergies, preferences,
+                    calories_per_day, daily_calorie_distribution, set(), day_themes[day_num], plan_key is None
+                )
+                for day_num in range(1, days + 1) if day_num not in completed
+            }
+            all_days = [completed[day_num] if day_num in completed else futures[day_num].result() for day_num in range(1, days + 1)]
+        
+        fallback_days = set()
+        for day_num, day_text in enumerate(all_days, start=1):
+            if day_text is None:
+                print(f"⚠️ Creating basic day {day_num} with realistic calories")
+                all_days[day_num - 1] = self._create_realistic_basic_day(day_num, meal_types, daily_calorie_distribution)
+                fallback_days.add(day_num)
+        
+        all_days = self._reconcile_duplicate_meals(all_days, meal_types, healthy, allergies, preferences, daily_calorie_distribution, day_themes)
+        
+        used_titles = set()
+        for day_num, day_text in enumerate(all_days, start=1):
+            used_titles.update(self._extract_titles_simple(day_text))
+            self._save_checkpoint_day(plan_key, day_num, day_text, used_titles, day_num in fallback_days)
+        return "\n\n".join(all_days)
+
+    def _reconcile_duplicate_meals(self, all_days, meal_types, healthy, allergies, preferences, daily_calorie_distribution, day_themes):
+        """Regenerate only the meals whose titles already appeared on an earlier day"""
+        used_titles = set()
+        reconciled_days = []
+        
+        for day_num, day_text in enumerate(all_days, start=1):
+            header, meal_blocks = self._split_day_meals(day_text)
+            changed = False
+            
+            for i, block in enumerate(meal_blocks):
+                titles = self._extract_titles_simple(block)
+                title = titles[0] if titles else None
+                
+                if title and title in used_titles and i < len(meal_types):
+                    print(f"Day {day_num} {meal_types[i]} duplicates '{title}', regenerating that meal")
+                    target_calories = daily_calorie_distribution[i] if i < len(daily_calorie_distribution) else 400
+                    replacement = self._generate_single_meal(
+                        meal_types[i], target_calories, healthy, allergies, preferences,
+                        day_themes.get(day_num), used_titles
+                    )
+                    if replacement:
+                        meal_blocks[i] = replacement
+                        changed = True
+                        titles = self._extract_titles_simple(replacement)
+                        title = titles[0] if titles else title
+                
+                if title:
+                    used_titles.add(title)
+            
+            reconciled_days.append(self._join_day_meals(header, meal_blocks) if changed else day_text)
+        
+        return reconciled_days
+
+    def _remember_meal_plan(self, plan_text, source, healthy, **params):
+        """Record every meal block of a validated plan or day in the recipe corpus"""
+        for day_text in re.split(r'(?im)^(?=day\s+\d+\s*$)', plan_text):
+            if day_text.strip():
+                self._remember_recipes(self._split_day_meals(day_text)[1], source, healthy=healthy, **params)
+
+    def _split_day_meals(self, day_text):
+        """Split a day into its "Day X" header and individual meal blocks"""
+        header = ""
+        body = day_text.strip()
+        first_line = body.split('\n', 1)[0].strip()
+        if re.match(r'^day\s+\d+$', first_line, re.IGNORECASE):
+            header = first_line
+            body = body[len(first_line):]
+        
+        meal_blocks = [block.strip() for block in body.split("=====") if block.strip()]
+        return header, meal_blocks
+
+    def _join_day_meals(self, header, meal_blocks):
+        """Rebuild a day from its header and meal blocks"""
+        body = "\n\n=====\n\n".join(meal_blocks) + "\n\n====="
+        return f"{header}\n\n{body}" if header else body
+
+    def _generate_day_with_retries(self, day_num, meal_types, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, used_titles, theme=None, allow_fallback=True):
+        """Generate one validated day in up to three attempts, falling back to a basic day (or None without allow_fallback)"""
+        
+        for attempt in range(3):
+            try:
+                day_theme = theme or random.choice(self.DAY_THEMES)
+                day_content = self._generate_single_day(day_num, meal_types, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, day_theme, used_titles)
+                
+                # Extract and check for duplicate titles before accepting
+                new_titles = self._extract_titles_simple(day_content)
+                duplicate_found = any(title in used_titles for title in new_titles)
+                
+                # Quick validation
+                if self._validate_day_simple(day_content, meal_types) and not duplicate_found:
+                    print(f"✅ Day {day_num} generated successfully with realistic calorie distribution")
+                    self._remember_meal_plan(day_content, "mealplan.day", healthy, allergies=allergies, preferences=preferences, theme=day_theme)
+                    return f"Day {day_num}\n\n{day_content}"
+                
+                if duplicate_found:
+                    print(f"Day {day_num} attempt {attempt + 1} had duplicate recipes")
+                else:
+                    print(f"Day {day_num} attempt {attempt + 1} failed validation")
                     
-                    system_prompt = f"""Generate EXACTLY {meals_per_day} completely unique meals for one day.
+            except Exception as e:
+                print(f"Day {day_num} attempt {attempt + 1} error: {e}")
+        
+        if not allow_fallback:
+            return None
+        
+        # Create basic fallback day if all attempts fail
+        print(f"⚠️ Creating basic day {day_num} with realistic calories")
+        return self._create_realistic_basic_day(day_num, meal_types, daily_calorie_distribution, used_titles)
+
+    def _generate_single_day(self, day_num, meal_types, healthy, allergies, preferences, calories_per_day, daily_calorie_distribution, theme, used_titles):
+        """Make one API call for a single day's meals and return the raw day content"""
+        meals_per_day = len(meal_types)
+        
+        # Build a stronger exclusion list
+        exclusion_text = ""
+        if used_titles:
+            exclusion_text = f"NEVER use these recipe titles or similar variations: {', '.join(list(used_titles)[:10])}. "
+        
+        # Format calorie targets for this day
+        calorie_targets_text = "\n".join([
+            f"{meal_types[i]}: EXACTLY {daily_calorie_distribution[i]} calories"
+            for i in range(meals_per_day)
+        ])
+        
+        system_prompt = f"""Generate EXACTLY {meals_per_day} completely unique meals for one day.
 
         REQUIRED MEALS AND EXACT CALORIE TARGETS:
         {calorie_targets_text}
@@ -852,123 +1902,164 @@ class RecipeGenerator:
 
         CRITICAL: Generate ALL {meals_per_day} meals completely. Make each recipe title creative and unique. Hit EXACT calorie targets."""
 
-                    prompt = f"Generate {meals_per_day} UNIQUE meals for Day {day_num} with {theme} theme. Each recipe must hit its EXACT calorie target as specified above."
-                    
-                    if healthy:
-                        prompt += " Make all meals healthy and nutritious while maintaining exact calorie targets."
-                    if allergies:
-                        allergies_list = ', '.join(allergies) if isinstance(allergies, list) else allergies
-                        prompt += f" Avoid these allergens: {allergies_list}."
-                    if preferences:
-                        preferences_list = ', '.join(preferences) if isinstance(preferences, list) else preferences
-                        prompt += f" Consider preferences: {preferences_list}."
-                    
-                    prompt += f" IMPORTANT: Do not repeat any of these recipe concepts: {', '.join(list(used_titles)[:8]) if used_titles else 'None'}"
-
-                    response = self.client.chat.completions.create(
-                        model="gpt-3.5-turbo",
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": prompt}
-                        ],
-                        temperature=0.8,
-                        max_tokens=3000,
-                        timeout=90
-                    )
-                    
-                    day_content = response.choices[0].message.content.strip()
-                    
-                    # Extract and check for duplicate titles before accepting
-                    new_titles = self._extract_titles_simple(day_content)
-                    duplicate_found = any(title in used_titles for title in new_titles)
-                    
-                    # Quick validation
-                    if self._validate_day_simple(day_content, meal_types) and not duplicate_found:
-                        all_days.append(f"Day {day_num}\n\n{day_content}")
-                        
-                        # Add titles to used set
-                        used_titles.update(new_titles)
-                        
-                        print(f"✅ Day {day_num} generated successfully with realistic calorie distribution")
-                        break
-                    else:
-                        if duplicate_found:
-                            print(f"Day {day_num} attempt {attempt + 1} had duplicate recipes")
-                        else:
-                            print(f"Day {day_num} attempt {attempt + 1} failed validation")
-                        if attempt < 2:
-                            sleep(1)
-                            
-                except Exception as e:
-                    print(f"Day {day_num} attempt {attempt + 1} error: {e}")
-                    if attempt < 2:
-                        sleep(1)
-            else:
-                # Create basic fallback day if all attempts fail
-                print(f"⚠️ Creating basic day {day_num} with realistic calories")
-                fallback_day = self._create_realistic_basic_day(day_num, meal_types, daily_calorie_distribution, used_titles)
-                all_days.append(fallback_day)
-                
-                # Add fallback titles to used set
-                fallback_titles = self._extract_titles_simple(fallback_day)
-                used_titles.update(fallback_titles)
+        prompt = f"Generate {meals_per_day} UNIQUE meals for Day {day_num} with {theme} theme. Each recipe must hit its EXACT calorie target as specified above."
         
-        return "\n\n".join(all_days)
+        if healthy:
+            prompt += " Make all meals healthy and nutritious while maintaining exact calorie targets."
+        if allergies:
+            allergies_list = ', '.join(allergies) if isinstance(allergies, list) else allergies
+            prompt += f" Avoid these allergens: {allergies_list}."
+        if preferences:
+            preferences_list = ', '.join(preferences) if isinstance(preferences, list) else preferences
+            prompt += f" Consider preferences: {preferences_list}."
+        
+        prompt += f" IMPORTANT: Do not repeat any of these recipe concepts: {', '.join(list(used_titles)[:8]) if used_titles else 'None'}"
 
-    def _validate_plan_simple(self, plan_text, days, meals_per_day):
-        """Simple validation for full plans"""
-        if not plan_text or len(plan_text) < 1000:
-            return False
+        return self._create_meal_plan_completion(
+            "mealplan.day",
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            meals_per_day,
+            timeout=90,
+            validator=MealPlanStreamValidator.for_day(meal_types, used_titles)
+        )
+
+    def _create_meal_plan_completion(self, endpoint, messages, meals, timeout, validator):
+        """Run a meal plan completion, streamed through validator so bad output is cancelled early"""
+        request = dict(
+            model="gpt-3.5-turbo",
+            endpoint=endpoint,
+            messages=messages,
+            temperature=0.8,
+            cache=False,
+            hedge=True,
+            max_tokens=self.token_planner.max_tokens_for("meal", meals),
+            timeout=timeout
+        )
+        if not self.stream_validation:
+            response = self.client.chat.completions.create(**request)
+            self._observe_usage("meal", response, meals)
+            return response.choices[0].message.content.strip()
         
-        # Count basic elements
-        day_count = plan_text.lower().count('day ')
-        meal_types = ['breakfast', 'lunch', 'dinner', 'snack']
-        total_meals = sum(plan_text.lower().count(meal) for meal in meal_types[:meals_per_day])
-        ingredients_count = plan_text.count('•')
-        instructions_count = plan_text.count('1.')
+        stream = self.client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **request)
+        parts = []
+        usage = None
+        try:
+            for chunk in stream:
+                # With include_usage the final chunk carries usage and no choices
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content or ""
+                parts.append(text)
+                validator.feed(text)
+            validator.finish()
+        except StreamRejected:
+            self.client.record_event(endpoint, "stream_aborts")
+            raise
+        finally:
+            # Closing the stream cancels the upstream request, so a rejected completion stops costing tokens
+            if hasattr(stream, "close"):
+                stream.close()
         
-        expected_total = days * meals_per_day
+        if usage is not None:
+            self.token_planner.observe("meal", meals, usage.completion_tokens)
+        return "".join(parts).strip()
+
+    def _generate_single_meal(self, meal_type, target_calories, healthy, allergies, preferences, theme=None, exclude_titles=None):
+        """Generate one replacement meal block in the meal plan format"""
         
-        print(f"Validation: {total_meals}/{expected_total} meals, {ingredients_count} ingredients, {instructions_count} instructions")
+        exclusion_text = ""
+        if exclude_titles:
+            exclusion_text = f"NEVER use these recipe titles or similar variations: {', '.join(list(exclude_titles)[:20])}."
         
-        return (total_meals >= expected_total * 0.8 and
-                ingredients_count >= expected_total * 0.8 and
-                instructions_count >= expected_total * 0.8)
+        system_prompt = f"""Generate EXACTLY ONE {meal_type} recipe with EXACTLY {target_calories} calories.
+
+        {exclusion_text}
+
+        FORMAT:
+        {meal_type}
+
+        Unique Recipe Title Here
+
+        Preparation Time: 15 minutes
+        Cooking Time: 20 minutes
+        Servings: 1
+
+        • Ingredient 1 (calculated for exact calorie target)
+        • Ingredient 2 (precise amounts)
+
+        Instructions:
+        1. Step one with details
+        2. Step two with timing
+
+        Nutritional Information:
+        Calories: {target_calories}
+        Protein: [CALCULATED]g
+        Carbs: [CALCULATED]g
+        Fat: [CALCULATED]g
+
+        Never include any separator line (=====) in your response."""
+
+        prompt = f"Generate one unique {meal_type.lower()} recipe"
+        if theme:
+            prompt += f" with {theme} theme"
+        prompt += f". It must hit exactly {target_calories} calories."
+        if healthy:
+            prompt += " Make it healthy and nutritious while maintaining the exact calorie target."
+        if allergies:
+            allergies_list = ', '.join(allergies) if isinstance(allergies, list) else allergies
+            prompt += f" Avoid these allergens: {allergies_list}."
+        if preferences:
+            preferences_list = ', '.join(preferences) if isinstance(preferences, list) else preferences
+            prompt += f" Consider preferences: {preferences_list}."
+        
+        try:
+            response = self.client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                endpoint="mealplan.meal",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.8,
+                cache=False,
+                hedge=True,
+                max_tokens=self.token_planner.max_tokens_for("meal", 1),
+                timeout=60
+            )
+            
+            meal_content = response.choices[0].message.content.replace("=====", "").strip()
+            if not self._validate_day_simple(meal_content, [meal_type]):
+                print(f"Replacement {meal_type} failed validation")
+                return None
+            self._remember_recipes([meal_content], "mealplan.meal", meal_type, healthy, allergies=allergies, preferences=preferences, theme=theme)
+            return meal_content
+            
+        except Exception as e:
+            print(f"Error generating replacement {meal_type}: {e}")
+            return None
+
+    def _validate_plan_simple(self, plan_text, days, meals_per_day):
+        """Simple validation for full plans"""
+        if plan_text and len(plan_text) >= 1000:
+            total_meals, ingredients_count, instructions_count = plan_counts(plan_text, meals_per_day)
+            print(f"Validation: {total_meals}/{days * meals_per_day} meals, {ingredients_count} ingredients, {instructions_count} instructions")
+            problem = plan_structure_problem(plan_text, meals_per_day)
+            if problem:
+                print(f"Validation: {problem}")
+        return validate_plan_text(plan_text, days, meals_per_day)
 
     def _validate_day_simple(self, day_content, meal_types):
         """Simple validation for single days"""
-        content_lower = day_content.lower()
-        
-        # Check for meal types
-        found_meals = sum(1 for meal in meal_types if meal.lower() in content_lower)
-        
-        # Check for basic recipe components
-        has_ingredients = '•' in day_content
-        has_instructions = '1.' in day_content
-        has_calories = 'calories:' in content_lower
-        
-        return (found_meals >= len(meal_types) * 0.8 and
-                has_ingredients and has_instructions and has_calories)
+        return validate_day_text(day_content, meal_types)
 
     def _extract_titles_simple(self, content):
         """Extract recipe titles to avoid duplicates"""
-        lines = content.split('\n')
-        titles = []
-        meal_types = ['breakfast', 'lunch', 'dinner', 'snack']
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if any(meal.lower() in line.lower() for meal in meal_types):
-                # Look for title in next few lines
-                for j in range(i + 1, min(i + 4, len(lines))):
-                    next_line = lines[j].strip()
-                    if (next_line and len(next_line) > 3 and
-                        not next_line.startswith('Preparation') and
-                        not next_line.startswith('•') and ':' not in next_line):
-                        titles.append(next_line.lower())
-                        break
-        
-        return titles
+        return extract_titles(content)
 
     def _create_realistic_basic_day(self, day_num, meal_types, calorie_distribution, used_titles=None):
         """Create a basic fallback day with realistic calorie distribution"""
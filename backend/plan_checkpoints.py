@@ -0,0 +1,103 @@
+import json
+import re
+import time
+import uuid
+from typing import Any, Dict, Iterable, Optional
+
+from backend.recipe_db import RecipeDatabase
+
+_PLAN_KEY = re.compile(r'^[A-Za-z0-9_\-]{1,100}$')
+# Path segments other routes use under /api/mealplans/, which a plan key would shadow
+RESERVED_PLAN_KEYS = {"jobs", "meals"}
+
+
+def new_plan_key() -> str:
+    return uuid.uuid4().hex
+
+
+def validate_plan_key(plan_key: str) -> str:
+    if not isinstance(plan_key, str) or not _PLAN_KEY.match(plan_key):
+        raise ValueError("plan_key must be 1-100 letters, digits, '-' or '_'")
+    if plan_key.lower() in RESERVED_PLAN_KEYS:
+        raise ValueError(f"plan_key cannot be one of {', '.join(sorted(RESERVED_PLAN_KEYS))}")
+    return plan_key
+
+
+class PlanCheckpointStore:
+    """Validated meal plan days saved under a plan key as they are generated.
+
+    A retry or continuation with the same key reuses every finished day
+    (and the titles used so far) instead of regenerating the plan. Days
+    that fell back to the basic placeholder are kept but marked, so they
+    are generated again on resume or regenerated on their own.
+    """
+
+    def __init__(self, db: RecipeDatabase, retention: float = 7 * 24 * 3600):
+        self.db = db
+        self.retention = retention
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        with self.db.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS meal_plan_checkpoints (
+                    plan_key TEXT PRIMARY KEY,
+                    params TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS meal_plan_checkpoint_days (
+                    plan_key TEXT NOT NULL,
+                    day_num INTEGER NOT NULL,
+                    day_text TEXT NOT NULL,
+                    used_titles TEXT NOT NULL,
+                    fallback INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (plan_key, day_num)
+                )
+            ''')
+
+    def open(self, plan_key: str, params: Dict[str, Any]):
+        """Start a plan under plan_key, or check a resumed one was requested with the same parameters"""
+        now = time.time()
+        with self.db.transaction() as conn:
+            self._prune(conn, now)
+            row = conn.execute("SELECT params FROM meal_plan_checkpoints WHERE plan_key = ?", (plan_key,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO meal_plan_checkpoints (plan_key, params, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                    (plan_key, json.dumps(params, sort_keys=True), now, now)
+                )
+            elif json.loads(row[0]) != json.loads(json.dumps(params, sort_keys=True)):
+                raise ValueError(f"plan_key {plan_key} belongs to a meal plan with different parameters")
+
+    def _prune(self, conn, now: float):
+        expired = "SELECT plan_key FROM meal_plan_checkpoints WHERE updated_at < ?"
+        conn.execute(f"DELETE FROM meal_plan_checkpoint_days WHERE plan_key IN ({expired})", (now - self.retention,))
+        conn.execute("DELETE FROM meal_plan_checkpoints WHERE updated_at < ?", (now - self.retention,))
+
+    def params(self, plan_key: str) -> Optional[Dict[str, Any]]:
+        row = self.db.query_one("SELECT params FROM meal_plan_checkpoints WHERE plan_key = ?", (plan_key,))
+        return json.loads(row[0]) if row else None
+
+    def days(self, plan_key: str) -> Dict[int, Dict[str, Any]]:
+        """Saved days by day number: their text, whether they are a fallback, and the titles used through them"""
+        rows = self.db.query(
+            "SELECT day_num, day_text, fallback, used_titles FROM meal_plan_checkpoint_days WHERE plan_key = ? ORDER BY day_num",
+            (plan_key,)
+        )
+        return {
+            day_num: {"text": day_text, "fallback": bool(fallback), "used_titles": json.loads(used_titles)}
+            for day_num, day_text, fallback, used_titles in rows
+        }
+
+    def save_day(self, plan_key: str, day_num: int, day_text: str, used_titles: Iterable[str], fallback: bool = False):
+        now = time.time()
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO meal_plan_checkpoint_days (plan_key, day_num, day_text, used_titles, fallback, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (plan_key, day_num, day_text, json.dumps(sorted(used_titles)), int(fallback), now)
+            )
+            conn.execute("UPDATE meal_plan_checkpoints SET updated_at = ? WHERE plan_key = ?", (now, plan_key))
@@ -0,0 +1,117 @@
+import re
+from typing import Any, Dict, Optional
+
+from backend.grocery_generator import format_quantity, parse_quantity
+
+# Beyond these factors a rescaled recipe stops being a sensible portion; regenerate instead
+MIN_SCALE_FACTOR = 0.5
+MAX_SCALE_FACTOR = 2.0
+
+# Factors this close to 1 leave ingredient lines exactly as written
+UNCHANGED_FACTOR_TOLERANCE = 0.01
+
+UNICODE_FRACTIONS = {"½": "1/2", "⅓": "1/3", "⅔": "2/3", "¼": "1/4", "¾": "3/4", "⅛": "1/8"}
+
+_NUMBER = r'\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?'
+_LEADING_QUANTITY = re.compile(r'^(?P<amount>(?:%s)(?:\s*(?:-|to)\s*(?:%s))?)(?=\s|[a-zA-Z(]|$)' % (_NUMBER, _NUMBER))
+_RANGE_SEPARATOR = re.compile(r'\s*-\s*|\s+to\s+')
+# Measured units scale continuously (volumes to the nearest quarter); anything else is counted, in halves
+_VOLUME_UNIT = re.compile(r'^\s*(?:cups?|tbsp|tablespoons?|tsp|teaspoons?)\b', re.IGNORECASE)
+_WEIGHT_UNIT = re.compile(
+    r'^\s*(?:lbs?|pounds?|oz|ounces?|g|grams?|kg|kilograms?|ml|milliliters?|l|liters?|litres?)\b',
+    re.IGNORECASE
+)
+_FIRST_WORD = re.compile(r'^(\s*)([A-Za-z]+)')
+
+
+def _round_amount(value: float, rest: str) -> float:
+    """Round a scaled amount to what a cook can measure, never below the smallest step (1/4)"""
+    if _WEIGHT_UNIT.match(rest):
+        return value
+    step = 4 if _VOLUME_UNIT.match(rest) else 2
+    return max(0.25, round(value * step) / step)
+
+
+def _singular(rest: str) -> str:
+    """Singular first word ("eggs, beaten" -> "egg, beaten") for a count that dropped to one or less"""
+    match = _FIRST_WORD.match(rest)
+    if not match:
+        return rest
+    word = match.group(2)
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith(("ches", "shes", "xes", "oes")):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us")) and len(word) > 3:
+        word = word[:-1]
+    return match.group(1) + word + rest[match.end():]
+
+
+def scale_ingredient(line: str, factor: float) -> str:
+    """Rescale the leading quantity of one ingredient line; lines without one ("salt to taste") are unchanged.
+
+    Ranges keep both ends ("2-3 cloves" -> "3-4 1/2 cloves"), and a line whose
+    amount rounds back to what it was is returned exactly as written.
+    """
+    if abs(factor - 1) < UNCHANGED_FACTOR_TOLERANCE:
+        return line
+    normalized = line
+    for symbol, fraction in UNICODE_FRACTIONS.items():
+        normalized = re.sub(r'(\d)\s*' + symbol, r'\1 ' + fraction, normalized).replace(symbol, fraction)
+
+    match = _LEADING_QUANTITY.match(normalized)
+    if not match:
+        return line
+    values = [parse_quantity(end, default=None) for end in _RANGE_SEPARATOR.split(match.group("amount"))]
+    if None in values:
+        return line
+
+    rest = normalized[match.end():]
+    scaled = [_round_amount(value * factor, rest) for value in values]
+    if scaled == values:
+        return line
+    if max(scaled) <= 1 < max(values) and not (_VOLUME_UNIT.match(rest) or _WEIGHT_UNIT.match(rest)):
+        rest = _singular(rest)
+    if len(set(scaled)) == 1:
+        return format_quantity(scaled[0]) + rest
+    return "-".join(format_quantity(value) for value in scaled) + rest
+
+
+def scale_recipe(recipe: Dict[str, Any], factor: float, servings: Optional[int] = None) -> Dict[str, Any]:
+    """Copy of a structured recipe with ingredient quantities multiplied by factor.
+
+    With servings, the factor covers the change in servings and per-serving
+    nutrition stays the same; otherwise the portion itself changes and the
+    per-serving nutrition scales with it.
+    """
+    nutrition = dict(recipe.get("nutrition") or {})
+    if servings is None:
+        nutrition = {
+            field: int(round(value * factor)) if isinstance(value, (int, float)) else value
+            for field, value in nutrition.items()
+        }
+
+    scaled = dict(recipe)
+    scaled["ingredients"] = [scale_ingredient(line, factor) for line in recipe["ingredients"]]
+    scaled["nutrition"] = nutrition
+    scaled["servings"] = servings or recipe.get("servings") or 1
+    return scaled
+
+
+def scale_to_calories(recipe: Dict[str, Any], target_calories: int) -> Optional[Dict[str, Any]]:
+    """Rescale a recipe's portion to hit target_calories per serving, or None if that needs too big a change"""
+    calories = (recipe.get("nutrition") or {}).get("calories")
+    if not calories or not target_calories:
+        return None
+    factor = target_calories / calories
+    if not MIN_SCALE_FACTOR <= factor <= MAX_SCALE_FACTOR:
+        return None
+
+    scaled = scale_recipe(recipe, factor)
+    scaled["nutrition"]["calories"] = int(target_calories)
+    return scaled
+
+
+def scale_to_servings(recipe: Dict[str, Any], servings: int) -> Dict[str, Any]:
+    """Rescale ingredient quantities to feed a different number of servings"""
+    return scale_recipe(recipe, servings / (recipe.get("servings") or 1), servings=servings)
@@ -0,0 +1,170 @@
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate_per_second"""
+
+    def __init__(self, capacity: float, rate_per_second: float):
+        self.capacity = capacity
+        self.rate_per_second = rate_per_second
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_second)
+        self._updated_at = now
+
+    def reserve(self, amount: float, scale: float = 1.0) -> float:
+        """Take amount tokens now (possibly going negative) and return seconds to wait before using them"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / (self.rate_per_second * scale)
+
+    def refund(self, amount: float):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class AdaptiveRateLimiter:
+    """Request- and token-per-minute limiter shared by every OpenAI call in the process.
+
+    Limits are split evenly across gunicorn workers (WEB_CONCURRENCY) so the
+    whole deployment stays under the account limits without cross-process
+    coordination. A 429 halves the effective rate and pauses all callers for
+    the server's Retry-After; successes restore the rate gradually.
+    """
+
+    def __init__(self, requests_per_minute: int = 500, tokens_per_minute: int = 200000, workers: int = 1):
+        workers = max(1, workers)
+        self.requests = TokenBucket(max(1, requests_per_minute // workers), requests_per_minute / workers / 60.0)
+        self.tokens = TokenBucket(max(1, tokens_per_minute // workers), tokens_per_minute / workers / 60.0)
+
+        self._lock = threading.Lock()
+        self._scale = 1.0
+        self._paused_until = 0.0
+        self._counters = {"throttled": 0, "rate_limited": 0, "wait_seconds": 0.0}
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveRateLimiter":
+        return cls(
+            requests_per_minute=int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", 500)),
+            tokens_per_minute=int(os.getenv("OPENAI_TOKENS_PER_MINUTE", 200000)),
+            workers=int(os.getenv("WEB_CONCURRENCY", 1)),
+        )
+
+    def acquire(self, estimated_tokens: int) -> float:
+        """Block until a request of estimated_tokens may be sent; returns the time waited"""
+        with self._lock:
+            scale = self._scale
+            pause = max(0.0, self._paused_until - time.monotonic())
+
+        wait = max(pause, self.requests.reserve(1, scale), self.tokens.reserve(estimated_tokens, scale))
+        if wait > 0:
+            with self._lock:
+                self._counters["throttled"] += 1
+                self._counters["wait_seconds"] += wait
+            time.sleep(wait)
+        return wait
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Give back tokens that were reserved but not used"""
+        if actual_tokens is not None and actual_tokens < estimated_tokens:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+
+    def on_success(self):
+        with self._lock:
+            self._scale = min(1.0, self._scale + 0.05)
+
+    def on_rate_limited(self, retry_after: Optional[float]):
+        with self._lock:
+            self._counters["rate_limited"] += 1
+            self._scale = max(0.1, self._scale / 2)
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        logger.warning(f"OpenAI rate limit hit; scaling rate to {self._scale:.2f}, retry after {retry_after}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["rate_scale"] = round(self._scale, 2)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 2)
+        return stats
+
+
+class RetryBudget:
+    """Caps retries to a fraction of recent requests so outages don't multiply load"""
+
+    def __init__(self, ratio: float = 0.2, min_balance: float = 3.0, max_balance: float = 20.0):
+        self.ratio = ratio
+        self.max_balance = max_balance
+        self._balance = min_balance
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._balance >= 1:
+                self._balance -= 1
+                return True
+            return False
+
+
+class RetryPolicy:
+    """Jittered exponential backoff that never retries sooner than the server asked"""
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after:
+            return max(retry_after, backoff)
+        return backoff
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read Retry-After (or retry-after-ms) from an OpenAI API error, if present"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_shared_rate_limiter() -> AdaptiveRateLimiter:
+    """Process-wide limiter shared by every client wrapper"""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = AdaptiveRateLimiter.from_env()
+        return _shared_limiter
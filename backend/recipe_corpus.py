@@ -0,0 +1,252 @@
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend.allergens import allergen_mask
+from backend.recipe_db import RecipeDatabase
+from backend.recipe_schema import render_recipe_text
+
+logger = logging.getLogger(__name__)
+
+# Calorie window (as a share of the target) a stored recipe may be served for
+DEFAULT_CALORIE_TOLERANCE = 0.15
+
+_SELECT_COLUMNS = (
+    "id", "title", "category", "ingredients", "steps", "prep_time_minutes", "cook_time_minutes",
+    "servings", "calories", "protein_g", "carbs_g", "fat_g", "allergen_flags",
+)
+
+
+def normalize_title(title: str) -> str:
+    """Case, punctuation and whitespace insensitive key used to dedupe titles"""
+    return re.sub(r'\s+', ' ', re.sub(r'[^a-z0-9 ]', ' ', title.lower())).strip()
+
+
+class StoredRecipeText(str):
+    """Recipe text rendered from a stored recipe (possibly rescaled) rather than produced by the model"""
+
+
+class RecipeCorpus:
+    """Every successfully generated recipe, kept in the state database (generated.db) for reuse.
+
+    Rows hold the structured recipe (see recipe_schema) plus its category,
+    macros, allergen flags and the parameters it was generated with, indexed
+    on (category, calories) so later requests can be answered from stored
+    content. Writes go through a background thread so recording a recipe
+    never adds database latency to the request that produced it.
+    """
+
+    def __init__(self, db: RecipeDatabase, batch_size: int = 50):
+        self.db = db
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._counters = {"submitted": 0, "stored": 0, "duplicates": 0, "served": 0, "write_errors": 0}
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        with self.db.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS generated_recipes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    normalized_title TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    ingredients TEXT NOT NULL,
+                    steps TEXT NOT NULL,
+                    prep_time_minutes INTEGER,
+                    cook_time_minutes INTEGER,
+                    servings INTEGER,
+                    calories INTEGER,
+                    protein_g INTEGER,
+                    carbs_g INTEGER,
+                    fat_g INTEGER,
+                    allergen_flags INTEGER NOT NULL DEFAULT 0,
+                    healthy INTEGER NOT NULL DEFAULT 0,
+                    params TEXT,
+                    source TEXT,
+                    created_at REAL NOT NULL,
+                    UNIQUE (normalized_title, category, calories)
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_generated_recipes_category_calories ON generated_recipes (category, calories)")
+
+    def add(self, recipe: Dict[str, Any], category: str, healthy: bool = False,
+            params: Optional[Dict[str, Any]] = None, source: Optional[str] = None):
+        """Queue one structured recipe for storage"""
+        self.add_many([recipe], category, healthy, params, source)
+
+    def add_many(self, recipes: Iterable[Dict[str, Any]], category: str, healthy: bool = False,
+                 params: Optional[Dict[str, Any]] = None, source: Optional[str] = None):
+        # SQLite treats NULLs as distinct, so rows without calories would slip past the UNIQUE dedupe
+        rows = [
+            self._row(recipe, category, healthy, params, source)
+            for recipe in recipes if recipe and (recipe.get("nutrition") or {}).get("calories")
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._counters["submitted"] += len(rows)
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="recipe-corpus-writer", daemon=True)
+                self._writer.start()
+        for row in rows:
+            self._queue.put(row)
+
+    def _row(self, recipe, category, healthy, params, source) -> tuple:
+        nutrition = recipe.get("nutrition") or {}
+        return (
+            recipe["title"],
+            normalize_title(recipe["title"]),
+            category.lower(),
+            json.dumps(recipe["ingredients"]),
+            json.dumps(recipe["instructions"]),
+            recipe.get("prep_time_minutes"),
+            recipe.get("cook_time_minutes"),
+            recipe.get("servings"),
+            nutrition.get("calories"),
+            nutrition.get("protein_g"),
+            nutrition.get("carbs_g"),
+            nutrition.get("fat_g"),
+            allergen_mask([recipe["title"], *recipe["ingredients"]]),
+            int(bool(healthy)),
+            json.dumps(params, default=str) if params else None,
+            source,
+            time.time(),
+        )
+
+    def _write_loop(self):
+        while True:
+            rows = [self._queue.get()]
+            # Drain whatever else is waiting so bursts are stored in one transaction
+            while len(rows) < self.batch_size:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._insert(rows)
+            except Exception as e:
+                logger.warning(f"Could not store {len(rows)} generated recipe(s): {e}")
+                with self._lock:
+                    self._counters["write_errors"] += len(rows)
+            finally:
+                for _ in rows:
+                    self._queue.task_done()
+
+    def _insert(self, rows: List[tuple]):
+        with self.db.transaction() as conn:
+            before = conn.total_changes
+            conn.executemany('''
+                INSERT OR IGNORE INTO generated_recipes (
+                    title, normalized_title, category, ingredients, steps,
+                    prep_time_minutes, cook_time_minutes, servings,
+                    calories, protein_g, carbs_g, fat_g,
+                    allergen_flags, healthy, params, source, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            stored = conn.total_changes - before
+        with self._lock:
+            self._counters["stored"] += stored
+            self._counters["duplicates"] += len(rows) - stored
+
+    def flush(self):
+        """Block until every queued recipe has been written"""
+        self._queue.join()
+
+    def find(self, category: str, count: int, calories: Optional[int] = None,
+             tolerance: float = DEFAULT_CALORIE_TOLERANCE, exclude_flags: int = 0,
+             healthy: Optional[bool] = None, exclude_titles: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """Random stored recipes for a category, optionally near a calorie target and free of allergen flags"""
+        sql = f"SELECT {', '.join(_SELECT_COLUMNS)} FROM generated_recipes WHERE category = ?"
+        params: List[Any] = [category.lower()]
+        if calories is not None:
+            sql += " AND calories BETWEEN ? AND ?"
+            params += [int(calories * (1 - tolerance)), int(calories * (1 + tolerance))]
+        if exclude_flags:
+            sql += " AND (allergen_flags & ?) = 0"
+            params.append(exclude_flags)
+        if healthy:
+            sql += " AND healthy = 1"
+        excluded = sorted({normalize_title(title) for title in exclude_titles})
+        if excluded:
+            sql += f" AND normalized_title NOT IN ({', '.join('?' * len(excluded))})"
+            params += excluded
+        sql += " ORDER BY RANDOM() LIMIT ?"
+        params.append(count)
+
+        recipes = [self._recipe_from_row(dict(zip(_SELECT_COLUMNS, row))) for row in self.db.query(sql, params)]
+        with self._lock:
+            self._counters["served"] += len(recipes)
+        return recipes
+
+    def find_by_titles(self, titles: Iterable[str], healthy: bool = False, exclude_flags: int = 0) -> Dict[str, Dict[str, Any]]:
+        """One stored recipe per title (any category or calorie level), keyed by normalized title"""
+        normalized = sorted({normalize_title(title) for title in titles})
+        if not normalized:
+            return {}
+        sql = f"SELECT {', '.join(_SELECT_COLUMNS)}, normalized_title FROM generated_recipes WHERE normalized_title IN ({', '.join('?' * len(normalized))})"
+        params: List[Any] = list(normalized)
+        if exclude_flags:
+            sql += " AND (allergen_flags & ?) = 0"
+            params.append(exclude_flags)
+        if healthy:
+            sql += " AND healthy = 1"
+        found = {}
+        for row in self.db.query(sql, params):
+            found.setdefault(row[-1], self._recipe_from_row(dict(zip(_SELECT_COLUMNS, row))))
+        with self._lock:
+            self._counters["served"] += len(found)
+        return found
+
+    def find_by_ids(self, recipe_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Stored recipes by id, in the order given"""
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return []
+        rows = self.db.query(
+            f"SELECT {', '.join(_SELECT_COLUMNS)} FROM generated_recipes WHERE id IN ({', '.join('?' * len(recipe_ids))})",
+            recipe_ids
+        )
+        by_id = {row[0]: self._recipe_from_row(dict(zip(_SELECT_COLUMNS, row))) for row in rows}
+        with self._lock:
+            self._counters["served"] += len(by_id)
+        return [by_id[recipe_id] for recipe_id in recipe_ids if recipe_id in by_id]
+
+    @staticmethod
+    def _recipe_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "category": row["category"],
+            "prep_time_minutes": row["prep_time_minutes"],
+            "cook_time_minutes": row["cook_time_minutes"],
+            "servings": row["servings"],
+            "ingredients": json.loads(row["ingredients"]),
+            "instructions": json.loads(row["steps"]),
+            "nutrition": {
+                "calories": row["calories"],
+                "protein_g": row["protein_g"],
+                "carbs_g": row["carbs_g"],
+                "fat_g": row["fat_g"],
+            },
+            "allergen_flags": row["allergen_flags"],
+        }
+
+    def find_text(self, category: str, count: int, **filters) -> List[str]:
+        """Same as find, rendered in the legacy recipe-ideas text format"""
+        return [StoredRecipeText(render_recipe_text(recipe)) for recipe in self.find(category, count, **filters)]
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.db.query("SELECT category, COUNT(*) FROM generated_recipes GROUP BY category ORDER BY category"))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+        stats["pending"] = self._queue.unfinished_tasks
+        return stats
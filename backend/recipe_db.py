@@ -0,0 +1,169 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+BUNDLED_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "recipes.db")
+
+# Relative locations checked (in order) when no path is configured
+DB_PATH_CANDIDATES = [
+    'recipes.db',              # Current directory
+    'data/recipes.db',         # Data subdirectory
+    'backend/data/recipes.db', # Backend/data subdirectory
+    '../data/recipes.db',      # Parent's data subdirectory
+]
+
+# Runtime-written state (generated recipes, recipe pool, plan checkpoints) lives outside recipes.db
+STATE_DB_NAME = "generated.db"
+
+QueryHook = Callable[[str, float], None]
+
+
+def resolve_db_path(db_path: Optional[str] = None) -> str:
+    """Pick the recipes database: explicit path, RECIPES_DB_PATH, the usual relative spots, then the bundled file"""
+    if db_path:
+        return db_path
+    if os.getenv("RECIPES_DB_PATH"):
+        return os.getenv("RECIPES_DB_PATH")
+    for path in DB_PATH_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    return BUNDLED_DB_PATH
+
+
+def resolve_state_db_path(db_path: Optional[str] = None, titles_db_path: Optional[str] = None) -> str:
+    """Pick the database for runtime-written state: explicit path, GENERATED_DB_PATH, then generated.db next to the titles"""
+    if db_path:
+        return db_path
+    if os.getenv("GENERATED_DB_PATH"):
+        return os.getenv("GENERATED_DB_PATH")
+    return os.path.join(os.path.dirname(os.path.abspath(titles_db_path or BUNDLED_DB_PATH)), STATE_DB_NAME)
+
+
+class RecipeDatabase:
+    """Per-thread SQLite connections to the recipe corpus, reused across requests.
+
+    Each thread keeps one connection (reopened after a fork or ``reset()``),
+    so repeated queries reuse SQLite's prepared statement cache instead of
+    paying connection setup and SQL parsing every time. Read-only handles
+    open the file with ``mode=ro`` and leave its journal mode alone;
+    writable handles switch it to WAL (unless ``wal=False``) so readers are
+    never blocked by the recipe pool's writes. Query times are
+    passed to registered hooks, and slow ones are logged.
+    """
+
+    def __init__(self, db_path: str, read_only: bool = False, wal: bool = True,
+                 mmap_size: int = 256 * 1024 * 1024, cached_statements: int = 256,
+                 slow_query_ms: float = 100.0):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.wal = wal and not read_only
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.slow_query_ms = slow_query_ms
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._hooks: List[QueryHook] = []
+        self._counters = {"connections": 0, "queries": 0, "slow_queries": 0, "total_ms": 0.0}
+
+    def _uri(self) -> str:
+        mode = "ro" if self.read_only else "rwc"
+        return f"file:{quote(os.path.abspath(self.db_path))}?mode={mode}"
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use"""
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is not None and local.pid == os.getpid() and local.generation == self._generation:
+            return conn
+        if conn is not None and local.pid == os.getpid():
+            conn.close()
+
+        conn = sqlite3.connect(self._uri(), uri=True, timeout=10, cached_statements=self.cached_statements)
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        if self.wal:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+
+        local.conn = conn
+        local.pid = os.getpid()
+        local.generation = self._generation
+        with self._lock:
+            self._counters["connections"] += 1
+        return conn
+
+    def reset(self):
+        """Make every thread reopen its connection, e.g. after the database file was replaced"""
+        with self._lock:
+            self._generation += 1
+
+    def close(self):
+        """Close the calling thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            if self._local.pid == os.getpid():
+                conn.close()
+
+    def add_query_hook(self, hook: QueryHook):
+        """Call hook(sql, seconds) after every query"""
+        self._hooks.append(hook)
+
+    def _record(self, sql: str, seconds: float):
+        elapsed_ms = seconds * 1000
+        slow = elapsed_ms >= self.slow_query_ms
+        with self._lock:
+            self._counters["queries"] += 1
+            self._counters["total_ms"] += elapsed_ms
+            if slow:
+                self._counters["slow_queries"] += 1
+        if slow:
+            logger.warning(f"Slow recipe query ({elapsed_ms:.0f}ms): {' '.join(sql.split())[:200]}")
+        for hook in self._hooks:
+            hook(sql, seconds)
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        """Run a SELECT and return all rows"""
+        started = time.perf_counter()
+        rows = self.connection().execute(sql, params).fetchall()
+        self._record(sql, time.perf_counter() - started)
+        return rows
+
+    def query_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        started = time.perf_counter()
+        row = self.connection().execute(sql, params).fetchone()
+        self._record(sql, time.perf_counter() - started)
+        return row
+
+    def write(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Run one statement in its own transaction and return the affected row count"""
+        started = time.perf_counter()
+        with self.transaction() as conn:
+            rowcount = conn.execute(sql, params).rowcount
+        self._record(sql, time.perf_counter() - started)
+        return rowcount
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """This thread's connection, committed on success and rolled back on error"""
+        conn = self.connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+        stats["total_ms"] = round(stats["total_ms"], 1)
+        return stats
@@ -0,0 +1,137 @@
+import argparse
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from backend.recipe_db import RecipeDatabase
+
+logger = logging.getLogger(__name__)
+
+# Calorie levels the pool is filled at; requests snap to the nearest one
+STANDARD_CALORIE_TARGETS = [300, 500, 700]
+
+POOL_CATEGORIES = ["breakfast", "lunch", "dinner", "snack", "dessert"]
+
+
+class RecipePool:
+    """Fully generated recipes for recipes.db titles, stored in the state database (``db``)"""
+
+    def __init__(self, db: RecipeDatabase, titles_db: Optional[RecipeDatabase] = None):
+        self.db = db
+        self.titles_db = titles_db or db
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        with self.db.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS recipe_pool (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    calories INTEGER NOT NULL,
+                    healthy INTEGER NOT NULL DEFAULT 0,
+                    recipe_text TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    UNIQUE (title, category, calories, healthy)
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_recipe_pool_lookup ON recipe_pool (category, calories, healthy)")
+
+    @staticmethod
+    def nearest_target(calories: int) -> int:
+        return min(STANDARD_CALORIE_TARGETS, key=lambda target: abs(target - calories))
+
+    def sample(self, category: str, count: int, calories: int = 500, healthy: bool = False) -> List[str]:
+        """Return up to count random pooled recipes for a category and calorie level"""
+        rows = self.db.query(
+            "SELECT recipe_text FROM recipe_pool WHERE category = ? AND calories = ? AND healthy = ? ORDER BY RANDOM() LIMIT ?",
+            (category, self.nearest_target(calories), int(healthy), count)
+        )
+        return [row[0] for row in rows]
+
+    def add(self, title: str, category: str, calories: int, recipe_text: str, healthy: bool = False):
+        self.db.write(
+            "INSERT OR IGNORE INTO recipe_pool (title, category, calories, healthy, recipe_text, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (title, category, calories, int(healthy), recipe_text, time.time())
+        )
+
+    def missing_titles(self, category: str, calories: int, limit: int, healthy: bool = False) -> List[str]:
+        """Titles in the category that have no pooled recipe at this calorie level yet"""
+        pooled = {row[0] for row in self.db.query(
+            "SELECT title FROM recipe_pool WHERE category = ? AND calories = ? AND healthy = ?",
+            (category, calories, int(healthy))
+        )}
+        titles = self.titles_db.query("SELECT title FROM recipes WHERE category = ? ORDER BY id", (category,))
+        return [title for title, in titles if title not in pooled][:limit]
+
+    def counts(self) -> Dict[str, int]:
+        rows = self.db.query("SELECT category, calories, COUNT(*) FROM recipe_pool GROUP BY category, calories")
+        return {f"{category}@{calories}": count for category, calories, count in rows}
+
+
+class RecipePoolWorker(threading.Thread):
+    """Background thread that walks recipes.db titles and fills the recipe pool"""
+
+    def __init__(self, generator, pool: RecipePool, calorie_targets: Optional[List[int]] = None,
+                 categories: Optional[List[str]] = None, healthy: bool = False,
+                 batch_size: int = 5, pause_seconds: float = 1.0):
+        super().__init__(name="recipe-pool-worker", daemon=True)
+        self.generator = generator
+        self.pool = pool
+        self.calorie_targets = calorie_targets or STANDARD_CALORIE_TARGETS
+        self.categories = categories or POOL_CATEGORIES
+        self.healthy = healthy
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        logger.info(f"Recipe pool worker started for {self.categories} at {self.calorie_targets} calories")
+        for calories in self.calorie_targets:
+            for category in self.categories:
+                while not self._stop_event.is_set():
+                    titles = self.pool.missing_titles(category, calories, self.batch_size, self.healthy)
+                    if not titles:
+                        break
+                    self._fill_batch(titles, category, calories)
+                    self._stop_event.wait(self.pause_seconds)
+        logger.info("Recipe pool worker finished")
+
+    def _fill_batch(self, titles: List[str], category: str, calories: int):
+        try:
+            recipes = self.generator._generate_multiple_recipes_from_titles(
+                titles, self.healthy, [calories] * len(titles)
+            )
+        except Exception as e:
+            logger.warning(f"Pool batch failed for {category}@{calories}: {e}")
+            return
+
+        # Recipes come back in title order; anything else can't be matched to its title safely
+        if len(recipes) != len(titles):
+            logger.warning(f"Pool batch for {category}@{calories} returned {len(recipes)}/{len(titles)} recipes, skipping")
+            return
+
+        for title, recipe_text in zip(titles, recipes):
+            self.pool.add(title, category, calories, recipe_text, self.healthy)
+        logger.info(f"Pooled {len(recipes)} {category} recipes at {calories} calories")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate full recipes for recipes.db titles")
+    parser.add_argument("--db", help="Path to recipes.db (defaults to the generator's lookup)")
+    parser.add_argument("--calories", type=int, nargs="+", default=STANDARD_CALORIE_TARGETS)
+    parser.add_argument("--categories", nargs="+", default=POOL_CATEGORIES)
+    parser.add_argument("--healthy", action="store_true", help="Generate the healthy variant of each recipe")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from backend.openai_handler import RecipeGenerator
+    generator = RecipeGenerator(db_path=args.db)
+    worker = RecipePoolWorker(generator, generator.recipe_pool, args.calories, args.categories, args.healthy)
+    worker.run()
+    print(f"Pool contents: {worker.pool.counts()}")
@@ -0,0 +1,244 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# Shape the model is asked to return for every recipe or meal in structured mode
+RECIPE_JSON_SCHEMA = {
+    "title": "string",
+    "prep_time_minutes": "integer",
+    "cook_time_minutes": "integer",
+    "servings": "integer",
+    "ingredients": ["string with amount, e.g. '2 cups rolled oats'"],
+    "instructions": ["string, one detailed step per entry"],
+    "nutrition": {"calories": "integer", "protein_g": "integer", "carbs_g": "integer", "fat_g": "integer"},
+}
+
+RECIPE_JSON_FORMAT = json.dumps(RECIPE_JSON_SCHEMA, indent=2)
+
+# Macro split used when the model leaves macros out (same as the fallback meal plan days)
+FALLBACK_MACRO_SPLIT = {"protein_g": (0.25, 4), "carbs_g": (0.45, 4), "fat_g": (0.30, 9)}
+
+DEFAULT_PREP_MINUTES = 15
+DEFAULT_COOK_MINUTES = 20
+
+_LIST_MARKER = re.compile(r'^\s*(?:[•*\-–]|\d+[.)])\s*')
+_BULLET = re.compile(r'^\s*[•*\-–]\s*')
+_STEP = re.compile(r'^\s*(?:step\s*)?\d+[.):]\s+', re.IGNORECASE)
+_MEAL_HEADER = re.compile(r'^(breakfast|lunch|dinner|snack|dessert)s?:?$', re.IGNORECASE)
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+
+def parse_items(content: str, key: str) -> List[Dict[str, Any]]:
+    """Pull the list of item objects stored under key out of a JSON completion.
+
+    Truncated or otherwise broken JSON still yields every object that was
+    complete before the damage, so one bad item never costs the whole batch.
+    """
+    if not content:
+        return []
+    content = content.strip()
+    if content.startswith("```"):
+        content = re.sub(r'^```(?:json)?\s*|\s*```$', '', content)
+
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return _salvage_items(content, key)
+
+    if isinstance(data, dict):
+        items = data.get(key)
+        if items is None and "title" in data:
+            items = [data]
+    else:
+        items = data
+    if not isinstance(items, list):
+        return []
+    return [item for item in items if isinstance(item, dict)]
+
+
+def _salvage_items(content: str, key: str) -> List[Dict[str, Any]]:
+    """Decode complete objects one by one from a damaged "key": [...] array"""
+    match = re.search(r'"%s"\s*:\s*\[' % re.escape(key), content)
+    position = match.end() if match else content.find("[") + 1
+    if position <= 0:
+        return []
+
+    decoder = json.JSONDecoder()
+    items = []
+    while position < len(content):
+        while position < len(content) and content[position] in " \t\r\n,":
+            position += 1
+        if position >= len(content) or content[position] != "{":
+            break
+        try:
+            item, position = decoder.raw_decode(content, position)
+        except ValueError:
+            break
+        if isinstance(item, dict):
+            items.append(item)
+    return items
+
+
+def _to_int(value) -> Optional[int]:
+    """Read an integer out of values like 20, "20", "20 minutes" or "about 20g" """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(round(value))
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        if match:
+            return int(round(float(match.group())))
+    return None
+
+
+def _to_lines(value) -> List[str]:
+    """Normalize a list (or newline separated string) of ingredients or steps"""
+    if isinstance(value, str):
+        value = value.split("\n")
+    if not isinstance(value, list):
+        return []
+
+    lines = []
+    for entry in value:
+        if isinstance(entry, dict):
+            # {"quantity": "2 cups", "name": "oats"} style ingredients
+            entry = " ".join(str(part) for part in entry.values() if part not in (None, ""))
+        if not isinstance(entry, (str, int, float)):
+            continue
+        line = _LIST_MARKER.sub("", str(entry)).strip()
+        if line:
+            lines.append(line)
+    return lines
+
+
+def repair_recipe(item: Dict[str, Any], target_calories: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Validate one recipe object, fixing what can be fixed locally.
+
+    Returns the normalized recipe, or None when it lacks a title, ingredients
+    or instructions and has to be regenerated.
+    """
+    if not isinstance(item, dict):
+        return None
+
+    title = item.get("title") or item.get("name")
+    if not isinstance(title, str):
+        return None
+    title = re.sub(r'^(?:recipe\s*)?title\s*:\s*', '', title.strip(' *#="'), flags=re.IGNORECASE).strip()
+
+    ingredients = _to_lines(item.get("ingredients"))
+    instructions = _to_lines(item.get("instructions") or item.get("steps"))
+    if not title or not ingredients or not instructions:
+        return None
+
+    nutrition = item.get("nutrition") if isinstance(item.get("nutrition"), dict) else {}
+    calories = _to_int(nutrition.get("calories", item.get("calories")))
+    if calories is None:
+        calories = target_calories
+
+    macros = {}
+    for field, (share, calories_per_gram) in FALLBACK_MACRO_SPLIT.items():
+        grams = _to_int(nutrition.get(field, nutrition.get(field[:-2], item.get(field))))
+        if grams is None and calories is not None:
+            grams = int(calories * share / calories_per_gram)
+        macros[field] = grams
+
+    prep_time = _to_int(item.get("prep_time_minutes", item.get("prep_time")))
+    cook_time = _to_int(item.get("cook_time_minutes", item.get("cook_time")))
+    servings = _to_int(item.get("servings"))
+
+    return {
+        "title": title,
+        "prep_time_minutes": prep_time if prep_time is not None else DEFAULT_PREP_MINUTES,
+        "cook_time_minutes": cook_time if cook_time is not None else DEFAULT_COOK_MINUTES,
+        "servings": servings if servings else 1,
+        "ingredients": ingredients,
+        "instructions": instructions,
+        "nutrition": {"calories": calories, **macros},
+    }
+
+
+def _labelled_value(text: str, *labels: str) -> Optional[int]:
+    for label in labels:
+        match = re.search(r'^\W*%s\W*:\s*([^\n]+)' % label, text, re.IGNORECASE | re.MULTILINE)
+        if match:
+            return _to_int(match.group(1))
+    return None
+
+
+def parse_recipe_text(text: str, target_calories: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Read a legacy text recipe (or meal plan meal block) back into the structured shape.
+
+    Meal blocks keep their leading meal type under "meal_type". Returns None
+    when the text has no recognizable title, ingredients or steps.
+    """
+    lines = [line.strip() for line in text.strip().split("\n") if line.strip()]
+    meal_type = None
+    while lines and (re.match(r'^day\s+\d+$', lines[0], re.IGNORECASE) or _MEAL_HEADER.match(lines[0])):
+        header = _MEAL_HEADER.match(lines[0])
+        if header:
+            meal_type = header.group(1).capitalize()
+        lines.pop(0)
+    if not lines:
+        return None
+
+    recipe = repair_recipe({
+        "title": lines[0],
+        "ingredients": [line for line in lines[1:] if _BULLET.match(line)],
+        "instructions": [_STEP.sub("", line) for line in lines[1:] if _STEP.match(line)],
+        "nutrition": {
+            "calories": _labelled_value(text, "calories"),
+            "protein_g": _labelled_value(text, "protein"),
+            "carbs_g": _labelled_value(text, "carbs", "carbohydrates"),
+            "fat_g": _labelled_value(text, "fat", "total fat"),
+        },
+        "prep_time_minutes": _labelled_value(text, "preparation time", "prep time"),
+        "cook_time_minutes": _labelled_value(text, "cooking time", "cook time"),
+        "servings": _labelled_value(text, "servings"),
+    }, target_calories)
+    if recipe is not None and meal_type:
+        recipe["meal_type"] = meal_type
+    return recipe
+
+
+def _nutrition_lines(recipe: Dict[str, Any]) -> List[str]:
+    nutrition = recipe["nutrition"]
+    lines = ["Nutritional Information:"]
+    if nutrition.get("calories") is not None:
+        lines.append(f"Calories: {nutrition['calories']}")
+    for label, field in (("Protein", "protein_g"), ("Carbs", "carbs_g"), ("Fat", "fat_g")):
+        if nutrition.get(field) is not None:
+            lines.append(f"{label}: {nutrition[field]}g")
+    return lines
+
+
+def _time_lines(recipe: Dict[str, Any]) -> List[str]:
+    return [
+        f"Preparation Time: {recipe['prep_time_minutes']} minutes",
+        f"Cooking Time: {recipe['cook_time_minutes']} minutes",
+        f"Servings: {recipe['servings']}",
+    ]
+
+
+def _ingredient_and_step_sections(recipe: Dict[str, Any]) -> List[str]:
+    return [
+        "\n".join(f"• {ingredient}" for ingredient in recipe["ingredients"]),
+        "Instructions:\n" + "\n".join(f"{i}. {step}" for i, step in enumerate(recipe["instructions"], start=1)),
+    ]
+
+
+def render_recipe_text(recipe: Dict[str, Any]) -> str:
+    """Render a structured recipe in the legacy recipe-ideas text format"""
+    sections = [recipe["title"]]
+    sections.extend(_ingredient_and_step_sections(recipe))
+    sections.append("\n".join(_nutrition_lines(recipe)))
+    sections.append("\n".join(_time_lines(recipe)))
+    return "\n\n".join(sections)
+
+
+def render_meal_text(recipe: Dict[str, Any], meal_type: str) -> str:
+    """Render a structured meal as one "=====" separated block of a legacy meal plan day"""
+    sections = [meal_type, recipe["title"], "\n".join(_time_lines(recipe))]
+    sections.extend(_ingredient_and_step_sections(recipe))
+    sections.append("\n".join(_nutrition_lines(recipe)))
+    return "\n\n".join(sections)
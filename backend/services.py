@@ -0,0 +1,152 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """Process-wide services built on first use instead of at import time.
+
+    Route modules hold ``proxy(name)`` objects, so importing the app stays
+    cheap (and safe to do in a gunicorn master with preload_app). Each
+    service is built once per process: on its first request, or up front
+    by ``warm_up()`` in a worker's post_fork hook.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._build_seconds: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            self._factories[name] = factory
+            self._locks[name] = threading.Lock()
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        # One lock per service so building a slow service doesn't block the others
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                started = time.perf_counter()
+                instance = self._factories[name]()
+                self._build_seconds[name] = time.perf_counter() - started
+                self._instances[name] = instance
+                logger.info(f"Built service {name} in {self._build_seconds[name]:.2f}s")
+        return instance
+
+    def proxy(self, name: str) -> "ServiceProxy":
+        return ServiceProxy(self, name)
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Build the named services (default: all) now and return how long each took"""
+        for name in names or list(self._factories):
+            self.get(name)
+        return {name: round(seconds, 3) for name, seconds in self._build_seconds.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "built": sorted(self._instances),
+            "build_seconds": {name: round(seconds, 3) for name, seconds in self._build_seconds.items()},
+        }
+
+
+class ServiceProxy:
+    """Stand-in for a registered service that builds it on first attribute access"""
+
+    def __init__(self, registry: ServiceRegistry, name: str):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attribute):
+        return getattr(self._registry.get(self._name), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._registry.get(self._name), attribute, value)
+
+
+# Lock file held for the life of the process that runs the recipe pool worker
+_pool_worker_lock = None
+
+
+def _claim_pool_worker(state_db_path: str) -> bool:
+    """True for the one process per state database allowed to fill the recipe pool"""
+    global _pool_worker_lock
+    if _pool_worker_lock is not None:
+        return True
+    try:
+        import fcntl
+    except ImportError:
+        # No flock (Windows): a single dev server process
+        return True
+
+    lock_file = open(f"{state_db_path}.pool-worker.lock", "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    # Released by the OS when this process exits, so a respawned worker can take over
+    _pool_worker_lock = lock_file
+    return True
+
+
+def _build_recipe_generator():
+    from backend.openai_handler import RecipeGenerator
+    from backend.recipe_pool import RecipePoolWorker
+
+    generator = RecipeGenerator()
+    # Optionally fill the recipe pool in the background; with several gunicorn workers only the
+    # one holding the pool worker lock runs it
+    if os.getenv('RECIPE_POOL_WORKER', 'false').lower() in ('1', 'true', 'yes') and generator.recipe_pool:
+        if _claim_pool_worker(generator.state_db_path):
+            RecipePoolWorker(generator, generator.recipe_pool).start()
+        else:
+            logger.info("Recipe pool worker already running in another process")
+    return generator
+
+
+def _build_food_analyzer():
+    from backend.food_scanner import FoodHealthAnalyzer
+    return FoodHealthAnalyzer()
+
+
+def _build_grocery_generator():
+    from backend.grocery_generator import EnhancedGroceryListGenerator
+    return EnhancedGroceryListGenerator()
+
+
+def _build_meal_plan_jobs():
+    from backend.jobs import JobRunner
+    return JobRunner.from_env()
+
+
+def _build_food_log_service():
+    from backend.food_log import FoodLogService
+    # Shares the recipe generator (and its OpenAI client) instead of building a second one
+    return FoodLogService(registry.get("recipe_generator"))
+
+
+registry = ServiceRegistry()
+registry.register("recipe_generator", _build_recipe_generator)
+registry.register("food_analyzer", _build_food_analyzer)
+registry.register("grocery_generator", _build_grocery_generator)
+registry.register("food_log_service", _build_food_log_service)
+registry.register("meal_plan_jobs", _build_meal_plan_jobs)
+
+
+def proxy(name: str) -> ServiceProxy:
+    return registry.proxy(name)
+
+
+def warm_up(names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    return registry.warm_up(names)
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; cross-process coalescing is skipped there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# How often (seconds) a process sweeps lock_dir for expired results and abandoned lock files
+SWEEP_INTERVAL = 60.0
+
+
+class _Call:
+    """One in-flight (or recently finished) computation shared by every caller with its key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+
+class SingleFlight:
+    """Coalesce concurrent identical requests into a single computation.
+
+    Callers with the same key wait on the first caller's computation and share
+    its result. A finished result keeps being shared for ``window`` seconds so
+    quick retries also coalesce. When ``lock_dir`` is set, gunicorn workers
+    coordinate through a lock file per key and share JSON results on disk.
+    The leader unlinks its key's lock file when it finishes (waiters on the
+    old file notice and reopen), and expired results and lock files left by
+    crashed processes are swept every ``SWEEP_INTERVAL`` seconds, so the
+    directory doesn't grow with every distinct key.
+    """
+
+    def __init__(self, window: float = 2.0, lock_dir: Optional[str] = None):
+        self.window = window
+        self.lock_dir = lock_dir if fcntl is not None else None
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._counters = {"executions": 0, "coalesced": 0, "shared_store_hits": 0}
+        self._swept_at = 0.0
+
+    @classmethod
+    def from_env(cls) -> "SingleFlight":
+        return cls(
+            window=float(os.getenv("SINGLE_FLIGHT_WINDOW", 2)),
+            lock_dir=os.getenv("SINGLE_FLIGHT_LOCK_DIR") or None,
+        )
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Stable key from already-normalized request fields"""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def do(self, key: str, fn: Callable, *args, **kwargs):
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self._counters["coalesced"] += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._execute(key, fn, args, kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            call.finished_at = time.time()
+            call.done.set()
+            with self._lock:
+                # Failures are never reused by later callers
+                if call.error is not None or self.window <= 0:
+                    self._calls.pop(key, None)
+
+    def _prune(self, now: float):
+        expired = [
+            key for key, call in self._calls.items()
+            if call.done.is_set() and call.finished_at + self.window <= now
+        ]
+        for key in expired:
+            del self._calls[key]
+
+    def _execute(self, key: str, fn: Callable, args, kwargs):
+        if not self.lock_dir:
+            with self._lock:
+                self._counters["executions"] += 1
+            return fn(*args, **kwargs)
+
+        self._sweep_if_due()
+        base_path = os.path.join(self.lock_dir, key)
+        lock_path = base_path + ".lock"
+        lock_file = self._open_locked(lock_path)
+        try:
+            shared = self._read_shared(base_path + ".json")
+            if shared is not None:
+                with self._lock:
+                    self._counters["shared_store_hits"] += 1
+                return shared
+
+            with self._lock:
+                self._counters["executions"] += 1
+            result = fn(*args, **kwargs)
+            self._write_shared(base_path + ".json", result)
+            return result
+        finally:
+            # Unlinked while still held; the shared result file outlives it for the window
+            try:
+                os.unlink(lock_path)
+            except OSError:
+                pass
+            lock_file.close()
+
+    @staticmethod
+    def _open_locked(lock_path: str):
+        """Open and flock a key's lock file, reopening if it was unlinked while we waited for it"""
+        while True:
+            lock_file = open(lock_path, "a")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if os.fstat(lock_file.fileno()).st_ino == os.stat(lock_path).st_ino:
+                    return lock_file
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+
+    def _sweep_if_due(self):
+        now = time.time()
+        with self._lock:
+            if now - self._swept_at < SWEEP_INTERVAL:
+                return
+            self._swept_at = now
+
+        try:
+            names = os.listdir(self.lock_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.lock_dir, name)
+            try:
+                if name.endswith(".lock"):
+                    self._remove_abandoned_lock(path)
+                elif (name.endswith(".json") and os.path.getmtime(path) + self.window <= now) or \
+                        (name.endswith(".tmp") and os.path.getmtime(path) + SWEEP_INTERVAL <= now):
+                    os.unlink(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _remove_abandoned_lock(path: str):
+        """Unlink a lock file nobody holds (its leader died before cleaning up)"""
+        with open(path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return
+            if os.fstat(lock_file.fileno()).st_ino == os.stat(path).st_ino:
+                os.unlink(path)
+
+    def _read_shared(self, path: str):
+        try:
+            if os.path.getmtime(path) + self.window <= time.time():
+                os.unlink(path)
+                return None
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_shared(self, path: str, result):
+        if self.window <= 0 or not result:
+            return
+        try:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not share single-flight result: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = sum(1 for call in self._calls.values() if not call.done.is_set())
+        return stats
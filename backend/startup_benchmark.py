@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _measure(mode: str) -> dict:
+    """Runs in a fresh interpreter: time importing the app, optional warm-up and the first request"""
+    started = time.perf_counter()
+    from backend.app import app
+    timings = {"import": time.perf_counter() - started}
+
+    if mode == "warm":
+        from backend import services
+        mark = time.perf_counter()
+        services.warm_up()
+        timings["warm_up"] = time.perf_counter() - mark
+
+    client = app.test_client()
+    mark = time.perf_counter()
+    response = client.get("/api/llm/stats")
+    timings["first_request"] = time.perf_counter() - mark
+    timings["import_to_first_response"] = time.perf_counter() - started
+    timings["status"] = response.status_code
+    return timings
+
+
+def _run_child(mode: str) -> dict:
+    env = dict(os.environ)
+    # The benchmark never calls OpenAI; the client only needs a key to be constructed
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    output = subprocess.run(
+        [sys.executable, "-m", "backend.startup_benchmark", "--child", mode],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure app import-to-first-request latency")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", choices=["lazy", "warm"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_measure(args.child)))
+        sys.exit(0)
+
+    for mode in ("lazy", "warm"):
+        runs = [_run_child(mode) for _ in range(args.runs)]
+        summary = {
+            key: round(statistics.median(run[key] for run in runs) * 1000, 1)
+            for key in runs[0] if key != "status"
+        }
+        print(f"{mode:>5} (median of {args.runs}, ms): {summary}")
@@ -0,0 +1,213 @@
+import re
+from typing import Callable, Iterable, List, Optional, Tuple
+
+# Meal words the plan checks and title extraction look for, in plan order
+PLAN_MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
+
+_MEAL_HEADER = re.compile(r'^[#*_\s]*(breakfast|lunch|dinner|snack)\b(.*)$', re.IGNORECASE)
+_DAY_HEADER = re.compile(r'^[#*_\s]*day\s+(\d+)\b', re.IGNORECASE)
+# Words a meal header may carry besides the meal itself, e.g. "Lunch (Day 2, 600 calories)"
+_HEADER_FILLER = {'calorie', 'calories', 'kcal', 'cal', 'day', 'approx', 'approximately', 'about', 'target'}
+
+
+class StreamRejected(Exception):
+    """Raised when a streamed meal plan can no longer pass validation"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def plan_counts(plan_text: str, meals_per_day: int) -> Tuple[int, int, int]:
+    """Meal mentions, ingredient bullets and first instruction steps in a full plan"""
+    text_lower = plan_text.lower()
+    total_meals = sum(text_lower.count(meal) for meal in PLAN_MEAL_TYPES[:meals_per_day])
+    return total_meals, plan_text.count('•'), plan_text.count('1.')
+
+
+def validate_plan_text(plan_text: str, days: int, meals_per_day: int) -> bool:
+    """Full plans need enough text, a sound day/meal structure and ~80% of the expected meals, ingredient lists and instructions"""
+    if not plan_text or len(plan_text) < 1000:
+        return False
+    if plan_structure_problem(plan_text, meals_per_day):
+        return False
+    total_meals, ingredients_count, instructions_count = plan_counts(plan_text, meals_per_day)
+    expected_total = days * meals_per_day
+    return (total_meals >= expected_total * 0.8 and
+            ingredients_count >= expected_total * 0.8 and
+            instructions_count >= expected_total * 0.8)
+
+
+def validate_day_text(day_content: str, meal_types: List[str]) -> bool:
+    """Single days need ~80% of their meal types plus ingredients, instructions and calories somewhere"""
+    content_lower = day_content.lower()
+    found_meals = sum(1 for meal in meal_types if meal.lower() in content_lower)
+    return (found_meals >= len(meal_types) * 0.8 and
+            '•' in day_content and '1.' in day_content and 'calories:' in content_lower)
+
+
+def _mentions_meal(line: str) -> bool:
+    line = line.strip().lower()
+    return any(meal in line for meal in PLAN_MEAL_TYPES)
+
+
+def _title_line(line: str) -> Optional[str]:
+    line = line.strip()
+    if len(line) > 3 and not line.startswith('Preparation') and not line.startswith('•') and ':' not in line:
+        return line.lower()
+    return None
+
+
+def _title_after(lines: List[str], i: int) -> Optional[str]:
+    """First title-like line among the three after a meal line"""
+    for line in lines[i + 1:i + 4]:
+        title = _title_line(line)
+        if title:
+            return title
+    return None
+
+
+def _meal_header(line: str) -> bool:
+    """A line that is just a meal type, optionally with markdown or a calorie/day note"""
+    match = _MEAL_HEADER.match(line)
+    return bool(match) and set(re.findall(r'[a-z]+', match.group(2).lower())) <= _HEADER_FILLER
+
+
+class PlanStructure:
+    """Line-by-line structure check for a full plan.
+
+    Flags a recipe title repeated under a second meal header, and a new day
+    header that arrives before the previous day has its meals_per_day meal
+    headers. Meals are only recognised by their header lines, so a plan
+    without meal headers is judged on the counts in validate_plan_text alone.
+    """
+
+    def __init__(self, meals_per_day: int):
+        self.meals_per_day = meals_per_day
+        self.titles = set()
+        self.day: Optional[int] = None
+        self.meals = 0
+        self._title_window = 0
+
+    def add_line(self, line: str) -> Optional[str]:
+        """Consume one complete line, returning the problem it reveals (if any)"""
+        day_match = _DAY_HEADER.match(line)
+        if day_match:
+            self._title_window = 0
+            day = int(day_match.group(1))
+            if day == self.day:
+                return None
+            if (self.day is not None or self.meals) and self.meals < self.meals_per_day:
+                return f"Day {day} started after {self.meals}/{self.meals_per_day} meals of the previous day"
+            self.day, self.meals = day, 0
+            return None
+        if _meal_header(line):
+            self.meals += 1
+            self._title_window = 3
+            return None
+        if self._title_window:
+            self._title_window -= 1
+            title = _title_line(line)
+            if title:
+                self._title_window = 0
+                if title in self.titles:
+                    return f"repeated title '{title}'"
+                self.titles.add(title)
+        return None
+
+
+def plan_structure_problem(plan_text: str, meals_per_day: int) -> Optional[str]:
+    """The first structural problem PlanStructure finds in a complete plan, or None"""
+    structure = PlanStructure(meals_per_day)
+    for line in plan_text.split('\n'):
+        problem = structure.add_line(line)
+        if problem:
+            return problem
+    return None
+
+
+def extract_titles(content: str) -> List[str]:
+    """Lowercased recipe titles: the first title-like line within three lines of a meal word"""
+    lines = content.split('\n')
+    titles = []
+    for i, line in enumerate(lines):
+        if _mentions_meal(line):
+            title = _title_after(lines, i)
+            if title:
+                titles.append(title)
+    return titles
+
+
+class MealPlanStreamValidator:
+    """Checks a meal plan completion incrementally while it streams in.
+
+    It applies exactly the post-hoc checks: the repeated-title check against
+    ``used_titles`` (on the titles extract_titles finds) and, for full plans,
+    the PlanStructure check as soon as each line is complete, and
+    ``final_check`` (validate_day_text or validate_plan_text) once the stream
+    ends. Preambles, headers and meals with details left out are judged the
+    same way as after the fact, so a completion that would pass validation is
+    never cancelled. Missing ingredients, instructions or calories are only
+    counted by ``final_check``, so they cannot cut a stream short.
+    """
+
+    def __init__(self, final_check: Callable[[str], bool], used_titles: Optional[Iterable[str]] = None,
+                 structure: Optional[PlanStructure] = None):
+        self.final_check = final_check
+        self.used_titles = {title.lower() for title in (used_titles or ())}
+        self.structure = structure
+
+        self._parts: List[str] = []
+        self._lines: List[str] = []
+        self._partial = ""
+        self._next_line = 0
+
+    @classmethod
+    def for_day(cls, meal_types: List[str], used_titles: Optional[Iterable[str]] = None) -> "MealPlanStreamValidator":
+        return cls(lambda text: validate_day_text(text, meal_types), used_titles)
+
+    @classmethod
+    def for_plan(cls, days: int, meals_per_day: int) -> "MealPlanStreamValidator":
+        return cls(lambda text: validate_plan_text(text, days, meals_per_day), structure=PlanStructure(meals_per_day))
+
+    def feed(self, text: str):
+        """Consume the next piece of streamed text, raising StreamRejected as soon as it cannot pass"""
+        self._parts.append(text)
+        if not self.used_titles and self.structure is None:
+            return
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        if lines:
+            self._add_lines(lines, complete=False)
+
+    def finish(self):
+        """Run the final check once the stream has ended"""
+        if self.used_titles or self.structure is not None:
+            # Post-hoc checks see the stripped completion, so its trailing line is judged the same way
+            self._add_lines([self._partial.rstrip()], complete=True)
+            self._partial = ""
+        if not self.final_check("".join(self._parts).strip()):
+            raise StreamRejected("completion failed validation")
+
+    def _add_lines(self, lines: List[str], complete: bool):
+        if self.structure is not None:
+            for line in lines:
+                problem = self.structure.add_line(line)
+                if problem:
+                    raise StreamRejected(problem)
+        if self.used_titles:
+            self._lines.extend(lines)
+            self._scan_titles(complete)
+
+    def _scan_titles(self, complete: bool):
+        """Check titles whose lookahead window has fully arrived (or every title once complete)"""
+        while self._next_line < len(self._lines):
+            i = self._next_line
+            if _mentions_meal(self._lines[i]):
+                title = _title_after(self._lines, i)
+                if title is None and not complete and len(self._lines) < i + 4:
+                    # The title may still be on its way
+                    return
+                if title and title in self.used_titles:
+                    raise StreamRejected(f"repeated title '{title}'")
+            self._next_line += 1
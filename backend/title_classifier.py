@@ -0,0 +1,194 @@
+import re
+from collections import defaultdict, deque
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+
+def _normalize_token(word: str) -> str:
+    """Fold simple plurals so "pancakes" matches "pancake" and "brownies" matches "brownie" """
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("ie") and len(word) > 3:
+        return word[:-2] + "y"
+    if word.endswith(("ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us")) and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_normalize_token(word) for word in re.findall(r"[a-z0-9]+", text.lower())]
+
+
+def _weighted(keywords: Iterable[str], weight: float = 1.0) -> Dict[str, float]:
+    return dict.fromkeys(keywords, weight)
+
+
+# Keyword weights per recipes.db category. Dish words weigh 1; a category's own name and
+# meal-time words ("brunch", "late night", "post workout") weigh MEAL_TIME_WEIGHT or more,
+# so they win over the dishes in a title and let free-form meal types map to a category.
+CATEGORY_KEYWORDS: Dict[str, Dict[str, float]] = {
+    "breakfast": {
+        **_weighted([
+            "pancake", "toast", "omelet", "waffle", "bagel", "muffin", "granola", "cereal", "smoothie", "bacon",
+            "egg", "hash", "frittata", "quiche", "scramble", "sausage", "avocado", "oatmeal", "french toast",
+            "breakfast burrito", "crepe", "overnight oat",
+        ]),
+        **_weighted(["breakfast", "morning", "sunrise"], 3.0),
+        "brunch": 2.0,
+    },
+    "lunch": {
+        **_weighted([
+            "sandwich", "wrap", "salad", "burger", "soup", "grilled", "panini", "bowl", "quesadilla", "gyro",
+            "club", "sub", "pita", "slider", "chili", "noodle", "taco", "bento", "chicken salad", "rice bowl",
+        ]),
+        **_weighted(["lunch", "lunchbox", "midday", "meal prep"], 3.0),
+        "brunch": 1.0,
+    },
+    "dinner": {
+        **_weighted([
+            "chicken", "beef", "pasta", "steak", "rice", "curry", "lasagna", "meatloaf", "pot roast", "fish",
+            "shrimp", "enchilada", "casserole", "stuffed", "stew", "ravioli", "gnocchi", "kebab", "ziti",
+            "macaroni", "spaghetti", "roast", "meatball", "chop",
+        ]),
+        **_weighted(["dinner", "supper", "evening", "entree", "main course", "date night", "family meal"], 3.0),
+    },
+    "dessert": {
+        **_weighted([
+            "cake", "cookie", "brownie", "ice cream", "pudding", "pie", "cheesecake", "tart", "mousse", "cobbler",
+            "cupcake", "sundae", "banana bread", "macaron", "eclair", "donut", "truffle", "brittle", "fudge",
+            "sorbet", "parfait",
+        ]),
+        # "sweet" alone would pull in "Sweet and Sour Chicken" and "Sweet Potato Hash"
+        **_weighted(["dessert", "treat", "baking", "sweet tooth", "something sweet", "sweet treat"], 3.0),
+    },
+    "snack": {
+        **_weighted([
+            "nut", "granola", "bar", "popcorn", "trail mix", "cracker", "cheese", "chip", "dip", "fruit", "yogurt",
+            "smoothie", "energy ball", "hummus", "pretzel", "protein ball", "protein bar",
+        ]),
+        **_weighted([
+            "snack", "late night", "midnight", "post workout", "pre workout", "workout", "appetizer", "party",
+            "game day", "afternoon", "on the go", "movie night",
+        ], 3.0),
+    },
+}
+
+
+MEAL_TIME_WEIGHT = 2.0
+
+# Words a free-form meal type may add around its meal-time keywords ("ideas for brunch")
+MEAL_TYPE_FILLER = {"a", "an", "the", "for", "and", "or", "my", "some", "idea", "recipe", "meal", "food", "time"}
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over word tokens: one pass over a title finds every keyword phrase in it.
+
+    Matching whole tokens (not substrings) keeps "egg" out of "eggplant" and
+    "pie" out of "piece", and the scan costs O(tokens + matches) no matter
+    how many keywords are loaded.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (label, weight, phrase length in tokens) for every keyword ending at a node
+        self._outputs: List[List[Tuple[str, float, int]]] = [[]]
+
+    def add(self, phrase: str, label: str, weight: float = 1.0):
+        node = 0
+        depth = 0
+        for depth, token in enumerate(tokenize(phrase), start=1):
+            child = self._goto[node].get(token)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][token] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = child
+        if node:
+            self._outputs[node].append((label, weight, depth))
+
+    def compile(self) -> "KeywordAutomaton":
+        """Link every node to its longest proper suffix in the trie (breadth first)"""
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for token, child in self._goto[node].items():
+                pending.append(child)
+                fallback = self._fail[node]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                suffix = self._goto[fallback].get(token, 0)
+                self._fail[child] = suffix if suffix != child else 0
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+        return self
+
+    def scan(self, tokens: Iterable[str]) -> Iterator[Tuple[str, float]]:
+        """(label, weight) for every keyword occurrence in the token stream"""
+        for label, weight, _, _ in self.spans(tokens):
+            yield label, weight
+
+    def spans(self, tokens: Iterable[str]) -> Iterator[Tuple[str, float, int, int]]:
+        """(label, weight, start, end) token positions for every keyword occurrence"""
+        node = 0
+        for end, token in enumerate(tokens, start=1):
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            for label, weight, length in self._outputs[node]:
+                yield label, weight, end - length, end
+
+
+class TitleClassifier:
+    """Weighted keyword classifier for recipe titles and free-form meal types"""
+
+    def __init__(self, keywords: Mapping[str, Mapping[str, float]]):
+        self.labels = list(keywords)
+        self._automaton = KeywordAutomaton()
+        for label, phrases in keywords.items():
+            for phrase, weight in phrases.items():
+                self._automaton.add(phrase, label, weight)
+        self._automaton.compile()
+
+    def scores(self, text: str) -> Dict[str, float]:
+        scores: Dict[str, float] = defaultdict(float)
+        for label, weight in self._automaton.scan(tokenize(text)):
+            scores[label] += weight
+        return dict(scores)
+
+    def classify(self, text: str, min_score: float = 1.0) -> Optional[str]:
+        """Highest scoring label (ties go to the label listed first), or None below min_score"""
+        scores = self.scores(text)
+        best = max(self.labels, key=lambda label: scores.get(label, 0.0))
+        return best if scores.get(best, 0.0) >= min_score else None
+
+    def classify_meal_type(self, text: str, min_weight: float = MEAL_TIME_WEIGHT) -> Optional[str]:
+        """Label for a free-form meal type only if meal-time keywords (weight >= min_weight) cover all of it.
+
+        "late night snack" and "brunch" map; "high protein chicken" and
+        "quick breakfast" return None, since mapping them would drop the rest
+        of what was asked for.
+        """
+        tokens = tokenize(text)
+        scores: Dict[str, float] = defaultdict(float)
+        covered = [token in MEAL_TYPE_FILLER for token in tokens]
+        for label, weight, start, end in self._automaton.spans(tokens):
+            if weight >= min_weight:
+                scores[label] += weight
+                covered[start:end] = [True] * (end - start)
+        if not scores or not all(covered):
+            return None
+        return max(self.labels, key=lambda label: scores.get(label, 0.0))
+
+    def matches(self, text: str, label: str) -> bool:
+        """True if any of the label's keywords appear in text"""
+        return any(found == label for found, _ in self._automaton.scan(tokenize(text)))
+
+
+@lru_cache(maxsize=1)
+def category_classifier() -> TitleClassifier:
+    """Shared classifier over CATEGORY_KEYWORDS, compiled on first use"""
+    return TitleClassifier(CATEGORY_KEYWORDS)
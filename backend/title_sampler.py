@@ -0,0 +1,167 @@
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from backend.allergens import CLASSIFIER_VERSION, title_allergen_mask
+from backend.recipe_db import RecipeDatabase
+
+logger = logging.getLogger(__name__)
+
+# Distinct (category, restriction mask) candidate lists kept between reloads
+MAX_FILTERED_LISTS = 256
+
+
+class TitleSampler:
+    """recipes.db titles held in memory for O(k) random sampling per category.
+
+    Titles are stored in one list grouped by category, with each category's
+    (start, end) range kept alongside, so sampling k titles picks k random
+    indices instead of sorting the table. The file's mtime is checked at most
+    every ``check_interval`` seconds; when it moved, the titles are reloaded
+    only if the recipes table (or the current allergen flags) actually
+    changed, so writes to other tables in the same file don't trigger a
+    reload.
+
+    Each title also carries its allergen flags from the ``recipe_allergens``
+    index, so requests with allergies only sample titles whose flags miss
+    their restriction mask. The allowed indices for each (category, mask)
+    are computed on first use and kept until the next reload, so a
+    filtered sample is O(k) too. Titles the stored index doesn't cover yet
+    are classified in memory on load.
+    """
+
+    def __init__(self, db: RecipeDatabase, check_interval: float = 5.0):
+        self.db = db
+        self.db_path = db.db_path
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._titles: List[str] = []
+        self._flags: List[int] = []
+        self._ranges: Dict[str, Tuple[int, int]] = {}
+        self._filtered: Dict[Tuple[str, int], List[int]] = {}
+        self._signature: Optional[Tuple[float, ...]] = None
+        self._fingerprint: Optional[Tuple] = None
+        self._checked_at = 0.0
+
+        self.reload()
+
+    def _file_signature(self) -> Optional[Tuple[float, ...]]:
+        """inode, mtime and size of the database and its WAL file, or None if the database is missing"""
+        try:
+            db_stat = os.stat(self.db_path)
+        except OSError:
+            return None
+        try:
+            wal_stat = os.stat(self.db_path + "-wal")
+            wal = (wal_stat.st_mtime, wal_stat.st_size)
+        except OSError:
+            wal = (0.0, 0)
+        return (db_stat.st_ino, db_stat.st_mtime, db_stat.st_size) + wal
+
+    def _titles_fingerprint(self) -> Tuple:
+        """Row count and highest id of the titles, plus how many titles carry current allergen flags"""
+        count, max_id = self.db.query_one("SELECT COUNT(*), MAX(id) FROM recipes")
+        try:
+            flagged = self.db.query_one("SELECT COUNT(*) FROM recipe_allergens WHERE version = ?", (CLASSIFIER_VERSION,))[0]
+        except sqlite3.OperationalError:
+            flagged = None
+        return count, max_id, flagged
+
+    def reload(self):
+        """Load every title from the database, replacing the current arrays on success"""
+        signature = self._file_signature()
+        if self._signature is not None and signature and signature[0] != self._signature[0]:
+            # The file was replaced; open connections still point at the old one
+            self.db.reset()
+        fingerprint = self._titles_fingerprint()
+        try:
+            rows = self.db.query('''
+                SELECT r.category, r.title, a.flags FROM recipes r
+                LEFT JOIN recipe_allergens a ON a.recipe_id = r.id AND a.version = ?
+                ORDER BY r.category
+            ''', (CLASSIFIER_VERSION,))
+        except sqlite3.OperationalError:
+            # This database has no allergen index yet
+            rows = [(category, title, None) for category, title in self.db.query("SELECT category, title FROM recipes ORDER BY category")]
+
+        titles = []
+        flags = []
+        ranges = {}
+        unindexed = 0
+        for category, title, title_flags in rows:
+            start, _ = ranges.get(category, (len(titles), 0))
+            if title_flags is None:
+                title_flags = title_allergen_mask(title)
+                unindexed += 1
+            titles.append(title)
+            flags.append(title_flags)
+            ranges[category] = (start, len(titles))
+        if unindexed:
+            logger.info(f"Classified {unindexed} titles missing from the allergen index (python -m backend.allergen_index stores them)")
+
+        with self._lock:
+            self._titles = titles
+            self._flags = flags
+            self._ranges = ranges
+            self._filtered = {}
+            self._signature = signature
+            self._fingerprint = fingerprint
+            self._checked_at = time.monotonic()
+        logger.info(f"Loaded {len(titles)} recipe titles from {self.db_path}")
+
+    def _reload_if_changed(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            known = self._signature
+
+        signature = self._file_signature()
+        if signature is None or signature == known:
+            return
+        try:
+            if known is not None and signature[0] == known[0] and self._titles_fingerprint() == self._fingerprint:
+                # Something else in the file changed; the titles are as loaded
+                with self._lock:
+                    self._signature = signature
+                return
+            self.reload()
+        except sqlite3.Error as e:
+            # Keep serving the previous titles; the next check retries
+            logger.warning(f"Could not reload recipe titles from {self.db_path}: {e}")
+
+    def sample(self, category: str, count: int, exclude_flags: int = 0) -> List[str]:
+        """Up to count distinct random titles from a category (or all titles for "any"), none with exclude_flags"""
+        self._reload_if_changed()
+        with self._lock:
+            titles = self._titles
+            start, end = (0, len(titles)) if category == "any" else self._ranges.get(category, (0, 0))
+            candidates: Sequence[int] = range(start, end)
+            if exclude_flags:
+                candidates = self._allowed_indices(category, exclude_flags, candidates)
+
+        count = min(count, len(candidates))
+        if count <= 0:
+            return []
+        return [titles[i] for i in random.sample(candidates, count)]
+
+    def _allowed_indices(self, category: str, exclude_flags: int, candidates: range) -> List[int]:
+        """Indices in candidates whose flags miss exclude_flags, built once per (category, mask); call with the lock held"""
+        key = (category, exclude_flags)
+        allowed = self._filtered.get(key)
+        if allowed is None:
+            if len(self._filtered) >= MAX_FILTERED_LISTS:
+                self._filtered.clear()
+            flags = self._flags
+            allowed = self._filtered[key] = [i for i in candidates if not flags[i] & exclude_flags]
+        return allowed
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {category: end - start for category, (start, end) in self._ranges.items()}
@@ -0,0 +1,78 @@
+import math
+import os
+import threading
+from typing import Dict, List
+
+
+class TokenBudgetPlanner:
+    """Sizes max_tokens from observed output per item and splits requests that would not fit.
+
+    An "item" is one unit of generated content of a given kind, e.g. one
+    recipe or one meal plan meal. Output size per item is tracked as an
+    exponentially weighted average of completion_tokens reported by the API.
+    """
+
+    # Starting estimates until real usage has been observed
+    DEFAULT_TOKENS_PER_ITEM = {
+        "recipe": 450,
+        "meal": 500,
+        # JSON output spends extra tokens on keys and quoting
+        "recipe_json": 520,
+        "meal_json": 570,
+    }
+
+    def __init__(self, max_tokens_per_call: int = 4000, safety_margin: float = 1.3,
+                 overhead_tokens: int = 100, smoothing: float = 0.2):
+        self.max_tokens_per_call = max_tokens_per_call
+        self.safety_margin = safety_margin
+        self.overhead_tokens = overhead_tokens
+        self.smoothing = smoothing
+
+        self._tokens_per_item: Dict[str, float] = dict(self.DEFAULT_TOKENS_PER_ITEM)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "TokenBudgetPlanner":
+        return cls(max_tokens_per_call=int(os.getenv("OPENAI_MAX_COMPLETION_TOKENS", 4000)))
+
+    def observe(self, kind: str, items: int, completion_tokens) -> None:
+        """Fold one response's token usage into the per-item estimate"""
+        if not items or not completion_tokens:
+            return
+        per_item = completion_tokens / items
+        with self._lock:
+            current = self._tokens_per_item.get(kind, per_item)
+            self._tokens_per_item[kind] = current + self.smoothing * (per_item - current)
+
+    def tokens_per_item(self, kind: str) -> float:
+        with self._lock:
+            return self._tokens_per_item.get(kind, 500)
+
+    def max_items_per_call(self, kind: str) -> int:
+        budget = self.max_tokens_per_call - self.overhead_tokens
+        return max(1, int(budget // (self.tokens_per_item(kind) * self.safety_margin)))
+
+    def max_tokens_for(self, kind: str, items: int) -> int:
+        """max_tokens for a call producing items of kind, with headroom and capped per call"""
+        needed = self.overhead_tokens + math.ceil(items * self.tokens_per_item(kind) * self.safety_margin)
+        return min(self.max_tokens_per_call, needed)
+
+    def split(self, kind: str, items: int) -> List[int]:
+        """Split items into the fewest evenly sized chunks that each fit in one call"""
+        if items <= 0:
+            return []
+        per_call = self.max_items_per_call(kind)
+        chunks = math.ceil(items / per_call)
+        base, extra = divmod(items, chunks)
+        return [base + (1 if i < extra else 0) for i in range(chunks)]
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            kinds = list(self._tokens_per_item)
+        return {
+            kind: {
+                "tokens_per_item": round(self.tokens_per_item(kind), 1),
+                "max_items_per_call": self.max_items_per_call(kind),
+            }
+            for kind in kinds
+        }
@@ -0,0 +1,24 @@
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# Tests import the backend package from the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+RECIPES_DB = Path(__file__).resolve().parent.parent / "backend" / "data" / "recipes.db"
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    """RecipeGenerator on a copy of the bundled titles, with its state and caches under tmp_path"""
+    from backend.openai_handler import RecipeGenerator
+
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    monkeypatch.setenv("RECIPE_CORPUS_SERVE", "false")
+    monkeypatch.setenv("JOBS_DB_PATH", str(tmp_path / "jobs.db"))
+    db_path = tmp_path / "recipes.db"
+    shutil.copy(RECIPES_DB, db_path)
+    return RecipeGenerator(api_key="test", db_path=str(db_path))
@@ -0,0 +1,103 @@
+import re
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from openai.types.chat import ChatCompletion
+
+from backend.openai_handler import GenerationContext
+
+RECIPE = """{title}
+
+Preparation Time: 10 minutes
+Cooking Time: 20 minutes
+Servings: 1
+
+• 1 cup rice
+• 1 chicken breast
+
+Instructions:
+1. Cook the rice.
+2. Grill the chicken.
+
+Calories: {calories}
+Protein: 30g
+Carbs: 50g
+Fat: 12g"""
+
+# "1. "Title" - MUST be exactly 640 calories" (title batches) and "Recipe 1: 640 calories" (open prompts)
+TITLE_TARGET = re.compile(r'^\d+\. "([^"]+)" - MUST be exactly (\d+) calories', re.MULTILINE)
+OPEN_TARGET = re.compile(r'^\s*Recipe \d+: (\d+) calories', re.MULTILINE)
+
+
+class EchoCompletions:
+    """Answers each request with recipes at exactly the calorie targets its own prompt asked for.
+
+    Responses are delayed so many requests are in flight at once; a target that
+    leaked from another request would show up in the returned calories.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        system, user = kwargs["messages"][0]["content"], kwargs["messages"][-1]["content"]
+        targets = [(title, int(calories)) for title, calories in TITLE_TARGET.findall(user)]
+        if not targets:
+            targets = [(f"Open Recipe {call}-{i}", int(calories)) for i, calories in enumerate(OPEN_TARGET.findall(system))]
+        time.sleep(0.02)
+        text = "\n\n=====\n\n".join(RECIPE.format(title=title, calories=calories) for title, calories in targets)
+        return ChatCompletion.model_validate({
+            "id": f"call-{call}", "object": "chat.completion", "created": 0, "model": kwargs["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+            "usage": {"completion_tokens": len(text) // 4, "prompt_tokens": 100, "total_tokens": len(text) // 4 + 100},
+        })
+
+
+@pytest.fixture
+def echo_generator(generator):
+    generator.client._client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=EchoCompletions()))
+    return generator
+
+
+def served_calories(recipes):
+    return sorted(int(re.search(r'Calories: (\d+)', recipe).group(1)) for recipe in recipes)
+
+
+@pytest.mark.parametrize("meal_type", ["dinner", "kiwi picnic"])
+def test_concurrent_requests_keep_their_own_calorie_targets(echo_generator, meal_type):
+    requests = 32
+    count = 3
+    contexts = [GenerationContext(calories_per_day=1500 + 45 * i, meals_per_day=count) for i in range(requests)]
+    start = threading.Barrier(requests)
+
+    def run(context):
+        start.wait()
+        return echo_generator.get_recipe_ideas(meal_type, False, [], count, context)
+
+    with ThreadPoolExecutor(max_workers=requests) as executor:
+        results = list(executor.map(run, contexts))
+
+    for context, recipes in zip(contexts, results):
+        expected = sorted(echo_generator._get_realistic_calorie_distribution(context.calories_per_day, count))
+        assert served_calories(recipes) == expected
+
+
+def test_default_context_is_untouched_by_concurrent_targets(echo_generator):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        busy = [
+            executor.submit(echo_generator.get_recipe_ideas, "dinner", False, [], 2,
+                            GenerationContext(calories_per_day=3000 + i, meals_per_day=2))
+            for i in range(8)
+        ]
+        defaults = echo_generator.get_recipe_ideas("dinner", False, [], 2)
+        for future in busy:
+            future.result()
+
+    assert served_calories(defaults) == [500, 500]
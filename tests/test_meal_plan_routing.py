@@ -0,0 +1,32 @@
+import pytest
+
+
+@pytest.fixture
+def routes(generator, monkeypatch):
+    """Record whether generate_meal_plan tried one full-plan call or went day by day"""
+    taken = []
+    monkeypatch.setattr(generator, "_assemble_meal_plan", lambda *args, **kwargs: None)
+    monkeypatch.setattr(generator, "_generate_full_plan_realistic", lambda *args, **kwargs: taken.append("full") or "x" * 2000)
+    monkeypatch.setattr(generator, "_validate_plan_simple", lambda *args: True)
+    monkeypatch.setattr(generator, "_generate_day_by_day_realistic", lambda *args, **kwargs: taken.append("day_by_day") or "plan")
+    return taken
+
+
+@pytest.mark.parametrize("days,meals,route", [
+    (1, 3, "full"),
+    (3, 3, "full"),
+    (2, 4, "full"),
+    (3, 4, "day_by_day"),
+    (4, 1, "day_by_day"),
+    (5, 3, "day_by_day"),
+])
+def test_plans_route_like_the_baseline_with_default_estimates(generator, routes, days, meals, route):
+    generator.generate_meal_plan(days, meals)
+    assert routes == [route]
+
+
+def test_token_budget_with_room_can_raise_the_meal_limit(generator, routes):
+    generator.token_planner.max_tokens_per_call = 16000
+    generator.generate_meal_plan(3, 4)
+    generator.generate_meal_plan(4, 2)
+    assert routes == ["full", "day_by_day"]
@@ -0,0 +1,44 @@
+import types
+
+import pytest
+from flask import Flask
+
+from backend import services
+from backend.generate_routes import recipe_routes
+from backend.plan_checkpoints import new_plan_key, validate_plan_key
+
+
+@pytest.mark.parametrize("plan_key", ["jobs", "meals", "Jobs"])
+def test_route_words_are_not_plan_keys(plan_key):
+    with pytest.raises(ValueError):
+        validate_plan_key(plan_key)
+
+
+def test_generated_and_client_keys_are_valid():
+    for plan_key in [new_plan_key(), "family-week_2", "jobs2"]:
+        assert validate_plan_key(plan_key) == plan_key
+
+
+@pytest.fixture
+def client(monkeypatch):
+    looked_up = []
+    checkpoints = types.SimpleNamespace(
+        params=lambda plan_key: looked_up.append(plan_key) or {"days": 1},
+        days=lambda plan_key: {1: {"text": "Day 1", "fallback": False}},
+    )
+    monkeypatch.setitem(services.registry._instances, "recipe_generator", types.SimpleNamespace(plan_checkpoints=checkpoints))
+    app = Flask(__name__)
+    app.register_blueprint(recipe_routes)
+    client = app.test_client()
+    client.looked_up = looked_up
+    return client
+
+
+def test_get_on_the_jobs_path_is_not_a_checkpoint_lookup(client):
+    assert client.get("/api/mealplans/jobs").status_code == 404
+    assert client.get("/api/mealplans/meals").status_code == 404
+    assert client.looked_up == []
+
+    response = client.get("/api/mealplans/family-week")
+    assert response.status_code == 200 and response.get_json()["completed_days"] == [1]
+    assert client.looked_up == ["family-week"]
@@ -0,0 +1,48 @@
+import pytest
+
+from backend.portion_scaler import scale_ingredient, scale_to_calories
+
+
+@pytest.mark.parametrize("line", ["1/2 onion, diced", "½ lemon", "2-3 cloves garlic", "2 eggs", "1 cup rice", "200 g chicken"])
+def test_factor_of_one_leaves_lines_as_written(line):
+    assert scale_ingredient(line, 1.0) == line
+    assert scale_ingredient(line, 1.005) == line
+
+
+@pytest.mark.parametrize("line,factor,expected", [
+    ("1/2 onion, diced", 1.3, "1/2 onion, diced"),
+    ("½ lemon", 1.2, "½ lemon"),
+    ("1/2 avocado", 1.2, "1/2 avocado"),
+    ("1/2 avocado", 1.6, "1 avocado"),
+    ("1/2 onion", 0.3, "1/4 onion"),
+    ("3 eggs", 1.5, "4 1/2 eggs"),
+    ("2 eggs", 0.55, "1 egg"),
+    ("2 eggs", 0.3, "1/2 egg"),
+    ("2-3 cloves garlic", 1.5, "3-4 1/2 cloves garlic"),
+    ("2 to 3 tomatoes", 0.4, "1 tomato"),
+])
+def test_counted_items_scale_in_halves(line, factor, expected):
+    assert scale_ingredient(line, factor) == expected
+
+
+@pytest.mark.parametrize("line,factor,expected", [
+    ("1 cup rice", 1.3, "1 1/4 cup rice"),
+    ("1½ cups flour", 2, "3 cups flour"),
+    ("1/4 tsp salt", 0.5, "1/4 tsp salt"),
+    ("200 g chicken breast", 1.3, "260 g chicken breast"),
+    ("salt to taste", 2, "salt to taste"),
+])
+def test_measured_amounts_scale_to_their_units(line, factor, expected):
+    assert scale_ingredient(line, factor) == expected
+
+
+def test_scaling_to_calories_keeps_the_ingredients_proportional():
+    recipe = {
+        "title": "Chicken Rice Bowl",
+        "ingredients": ["1 cup rice", "200 g chicken breast", "1 avocado", "2 eggs"],
+        "nutrition": {"calories": 500, "protein_g": 40, "carbs_g": 50, "fat_g": 10},
+    }
+    scaled = scale_to_calories(recipe, 750)
+    assert scaled["ingredients"] == ["1 1/2 cup rice", "300 g chicken breast", "1 1/2 avocado", "3 eggs"]
+    assert scaled["nutrition"] == {"calories": 750, "protein_g": 60, "carbs_g": 75, "fat_g": 15}
+    assert scale_to_calories(recipe, 2000) is None
@@ -0,0 +1,40 @@
+from backend.recipe_corpus import StoredRecipeText
+from backend.recipe_schema import render_recipe_text
+
+
+def recipe(title, calories=500):
+    return {
+        "title": title,
+        "prep_time_minutes": 10,
+        "cook_time_minutes": 20,
+        "servings": 1,
+        "ingredients": ["1 cup rice", "200 g chicken breast"],
+        "instructions": ["Cook the rice.", "Grill the chicken."],
+        "nutrition": {"calories": calories, "protein_g": 40, "carbs_g": 50, "fat_g": 10},
+    }
+
+
+def stored_rows(corpus):
+    corpus.flush()
+    return corpus.db.query("SELECT title, calories FROM generated_recipes ORDER BY title, calories")
+
+
+def test_recipes_without_calories_are_not_stored(generator):
+    corpus = generator.recipe_corpus
+    no_calories = recipe("Lemon Rice Bowl", calories=None)
+    corpus.add_many([no_calories, no_calories, recipe("Lemon Rice Bowl"), recipe("Lemon Rice Bowl")], "dinner")
+    assert stored_rows(corpus) == [("Lemon Rice Bowl", 500)]
+
+
+def test_rescaled_stored_recipes_are_not_written_back(generator):
+    generator.corpus_serving = True
+    corpus = generator.recipe_corpus
+    corpus.add(recipe("Garlic Chicken Rice"), "dinner")
+    corpus.flush()
+
+    rescaled, remaining, _ = generator._scale_stored_titles(["Garlic Chicken Rice", "Tofu Stir Fry"], False, [650, 650])
+    assert remaining == ["Tofu Stir Fry"] and all(isinstance(text, StoredRecipeText) for text in rescaled)
+
+    fresh = render_recipe_text(recipe("Tofu Stir Fry", calories=650))
+    generator._remember_recipes(rescaled + [fresh], "recipes.ideas", "dinner")
+    assert stored_rows(corpus) == [("Garlic Chicken Rice", 500), ("Tofu Stir Fry", 650)]
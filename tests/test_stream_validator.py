@@ -0,0 +1,161 @@
+import pytest
+
+from backend.stream_validator import (
+    MealPlanStreamValidator, StreamRejected, extract_titles, plan_structure_problem, validate_day_text,
+    validate_plan_text
+)
+
+MEAL_TYPES = ["Breakfast", "Lunch", "Dinner"]
+
+
+def meal(meal_type, title, calories=True):
+    text = (
+        f"{meal_type}\n\n{title}\n\nPreparation Time: 10 minutes\nCooking Time: 15 minutes\nServings: 1\n\n"
+        "• 1 cup rolled oats\n• 1 banana, sliced\n• 2 tbsp peanut butter\n\n"
+        "Instructions:\n1. Combine the ingredients in a bowl.\n2. Cook until warmed through.\n3. Serve.\n"
+    )
+    if calories:
+        text += "\nNutritional Information:\nCalories: 520\nProtein: 20g\nCarbs: 60g\nFat: 18g\n"
+    return text
+
+
+# Completions as the model actually returns them: a chatty preamble, a themed day header,
+# and only some meals carrying their own nutrition block
+DAY_WITH_PREAMBLE = (
+    "Here is your meal plan for Day 1:\n\n"
+    "Day 1 - Mediterranean\n\n"
+    + meal("Breakfast", "Greek Yogurt Honey Parfait")
+    + "\n=====\n\n"
+    + meal("Lunch", "Lemon Herb Chickpea Salad", calories=False)
+    + "\n=====\n\n"
+    + meal("Dinner", "Baked Cod with Olive Tapenade", calories=False)
+    + "\n====="
+)
+
+PLAN_WITH_PREAMBLE = "Sure! Below is a 2-day plan built around your targets.\n\n" + "\n=====\n\n".join(
+    f"Day {day}\n\n" + "\n=====\n\n".join(meal(meal_type, f"{meal_type} Bowl Number {day}") for meal_type in MEAL_TYPES)
+    for day in (1, 2)
+)
+
+
+
+def plan(*days):
+    """A full plan from per-day lists of (meal type, title)"""
+    return "\n=====\n\n".join(
+        f"Day {day}\n\n" + "\n=====\n\n".join(meal(meal_type, title) for meal_type, title in meals)
+        for day, meals in enumerate(days, start=1)
+    )
+
+
+def replay(validator, completion, chunk_size=7):
+    """Feed a completion in small chunks, the way a stream delivers it"""
+    for start in range(0, len(completion), chunk_size):
+        validator.feed(completion[start:start + chunk_size])
+    validator.finish()
+
+
+def test_day_with_preamble_and_header_streams_through():
+    assert validate_day_text(DAY_WITH_PREAMBLE.strip(), MEAL_TYPES)
+    replay(MealPlanStreamValidator.for_day(MEAL_TYPES, used_titles={"overnight oats"}), DAY_WITH_PREAMBLE)
+
+
+def test_full_plan_with_preamble_streams_through():
+    assert validate_plan_text(PLAN_WITH_PREAMBLE.strip(), 2, 3)
+    replay(MealPlanStreamValidator.for_plan(2, 3), PLAN_WITH_PREAMBLE)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 10000])
+def test_repeated_title_is_rejected_before_the_stream_ends(chunk_size):
+    validator = MealPlanStreamValidator.for_day(MEAL_TYPES, used_titles={"Lemon Herb Chickpea Salad"})
+    with pytest.raises(StreamRejected) as rejected:
+        for start in range(0, len(DAY_WITH_PREAMBLE), chunk_size):
+            validator.feed(DAY_WITH_PREAMBLE[start:start + chunk_size])
+            if chunk_size < len(DAY_WITH_PREAMBLE):
+                assert start < DAY_WITH_PREAMBLE.index("Baked Cod"), "rejection came too late"
+        validator.finish()
+    assert "lemon herb chickpea salad" in rejected.value.reason
+
+
+def test_title_split_across_chunks_is_checked_once_complete():
+    validator = MealPlanStreamValidator.for_day(["Dinner"], used_titles={"Baked Cod with Olive Tapenade"})
+    validator.feed("Dinner\n\nBaked Cod")
+    validator.feed(" with Olive")
+    with pytest.raises(StreamRejected):
+        validator.feed(" Tapenade\n\nPreparation Time: 20 minutes\n")
+
+
+@pytest.mark.parametrize("completion,meal_types,used_titles", [
+    (DAY_WITH_PREAMBLE, MEAL_TYPES, set()),
+    (DAY_WITH_PREAMBLE, MEAL_TYPES, {"greek yogurt honey parfait"}),
+    (DAY_WITH_PREAMBLE.replace("•", "-"), MEAL_TYPES, set()),
+    (DAY_WITH_PREAMBLE.replace("Calories:", "Energy"), MEAL_TYPES, set()),
+    (meal("Breakfast", "Green Shakshuka"), MEAL_TYPES, set()),
+    ("I'm sorry, I can't help with that.", MEAL_TYPES, set()),
+    ("Snack\nDay 1 Lunch Plate\n" + meal("Snack", "Trail Mix Cups"), ["Snack"], {"day 1 lunch plate"}),
+])
+def test_stream_verdict_matches_post_hoc_validation(completion, meal_types, used_titles):
+    content = completion.strip()
+    post_hoc = validate_day_text(content, meal_types) and not any(
+        title in used_titles for title in extract_titles(content)
+    )
+    validator = MealPlanStreamValidator.for_day(meal_types, used_titles)
+    try:
+        replay(validator, completion)
+        streamed = True
+    except StreamRejected:
+        streamed = False
+    assert streamed == post_hoc
+
+
+def rejected_at(validator, completion, chunk_size=7):
+    """Offset of the chunk the validator rejected, or None if the whole completion passed"""
+    for start in range(0, len(completion), chunk_size):
+        try:
+            validator.feed(completion[start:start + chunk_size])
+        except StreamRejected:
+            return start
+    try:
+        validator.finish()
+    except StreamRejected:
+        return len(completion)
+    return None
+
+
+def test_plan_repeating_a_title_is_rejected_when_the_repeat_arrives():
+    completion = plan(
+        [("Breakfast", "Spiced Apple Oatmeal"), ("Lunch", "Tuna Nicoise Salad"), ("Dinner", "Chicken Tikka Masala")],
+        [("Breakfast", "Spiced Apple Oatmeal"), ("Lunch", "Black Bean Burrito"), ("Dinner", "Miso Glazed Salmon")],
+    )
+    offset = rejected_at(MealPlanStreamValidator.for_plan(2, 3), completion)
+    repeat = completion.index("Spiced Apple Oatmeal", completion.index("Day 2"))
+    assert offset is not None and repeat <= offset < completion.index("Black Bean Burrito")
+    assert plan_structure_problem(completion, 3) == "repeated title 'spiced apple oatmeal'"
+
+
+def test_plan_starting_a_day_early_is_rejected_at_the_day_header():
+    completion = plan(
+        [("Breakfast", "Spiced Apple Oatmeal"), ("Lunch", "Tuna Nicoise Salad")],
+        [("Breakfast", "Veggie Egg Scramble"), ("Lunch", "Black Bean Burrito"), ("Dinner", "Miso Glazed Salmon")],
+    )
+    offset = rejected_at(MealPlanStreamValidator.for_plan(2, 3), completion)
+    assert offset is not None and offset < completion.index("Veggie Egg Scramble")
+    assert "Day 2 started after 2/3 meals" in plan_structure_problem(completion, 3)
+
+
+@pytest.mark.parametrize("header", ["Lunch", "**Lunch:**", "### Lunch (600 calories)", "Lunch - Day 1"])
+def test_decorated_meal_headers_count_toward_the_day(header):
+    completion = PLAN_WITH_PREAMBLE.replace("Lunch\n\nLunch Bowl", f"{header}\n\nLunch Bowl")
+    assert plan_structure_problem(completion, 3) is None
+    assert rejected_at(MealPlanStreamValidator.for_plan(2, 3), completion) is None
+
+
+@pytest.mark.parametrize("completion", [
+    PLAN_WITH_PREAMBLE,
+    "Days 1-2 follow.\n\nDay 1 and Day 2 share a Mediterranean theme.\n\n" + PLAN_WITH_PREAMBLE,
+    PLAN_WITH_PREAMBLE.replace("Dinner Bowl Number 2", "Dinner Bowl Number 1"),
+    PLAN_WITH_PREAMBLE.replace("Dinner\n\nDinner Bowl Number 1", "Dinner Bowl Number 1"),
+    PLAN_WITH_PREAMBLE.replace("Day 2", "Day 1"),
+])
+def test_plan_stream_verdict_matches_post_hoc_validation(completion):
+    post_hoc = validate_plan_text(completion.strip(), 2, 3)
+    assert (rejected_at(MealPlanStreamValidator.for_plan(2, 3), completion, chunk_size=1) is None) == post_hoc
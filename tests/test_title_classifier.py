@@ -0,0 +1,44 @@
+import pytest
+
+from backend.title_classifier import category_classifier
+
+
+@pytest.mark.parametrize("title,category", [
+    ("Sweet and Sour Chicken", "dinner"),
+    ("Sweet Potato Hash", "breakfast"),
+    ("Sweet Potato Pie", "dessert"),
+    ("Eggplant Parmesan Pieces", None),
+    ("Fluffy Buttermilk Pancakes", "breakfast"),
+    ("Chicken Caesar Salad Wrap", "lunch"),
+    ("Late Night Nachos", "snack"),
+])
+def test_titles_classify_by_weighted_keywords(title, category):
+    assert category_classifier().classify(title) == category
+
+
+@pytest.mark.parametrize("meal_type,category", [
+    ("brunch", "breakfast"),
+    ("ideas for brunch", "breakfast"),
+    ("Late-Night Snacks", "snack"),
+    ("post workout", "snack"),
+    ("date night", "dinner"),
+    ("something sweet", "dessert"),
+    ("high protein chicken", None),
+    ("low carb rice", None),
+    ("sweet potato", None),
+    ("quick breakfast", None),
+])
+def test_meal_types_map_only_on_meal_time_keywords(meal_type, category):
+    assert category_classifier().classify_meal_type(meal_type) == category
+
+
+@pytest.mark.parametrize("meal_type,category", [
+    ("dinner", "dinner"),
+    ("brunch", "breakfast"),
+    ("supper", "dinner"),
+    ("high protein chicken", None),
+    ("sweet potato", None),
+])
+def test_generator_keeps_free_form_meal_types_it_cannot_map(generator, meal_type, category):
+    assert generator._meal_category(meal_type) == category
+    assert generator._uses_open_generation(meal_type, []) == (category is None)